@@ -12,6 +12,17 @@ class MockMonitor(tuned.monitors.base.Monitor):
 			cls._load.setdefault(device, 0)
 			cls._load[device] += 1
 
+class HistoryMonitor(tuned.monitors.base.Monitor):
+	@classmethod
+	def _init_available_devices(cls):
+		cls._available_devices = set(["a", "b"])
+
+	@classmethod
+	def update(cls):
+		for device in cls._updating_devices:
+			load = cls._load.get(device, 0) + 1
+			cls._store_sample(device, load, [load])
+
 class MonitorBaseClassTestCase(unittest.TestCase):
 	def test_fail_base_class_init(self):
 		with self.assertRaises(NotImplementedError):
@@ -96,3 +107,13 @@ class MonitorBaseClassTestCase(unittest.TestCase):
 		self.assertSetEqual(set(["a", "b"]), MockMonitor._updating_devices)
 		monitor2.cleanup()
 		self.assertSetEqual(set(), MockMonitor._updating_devices)
+
+	def test_device_history(self):
+		monitor = HistoryMonitor(["a"])
+		monitor.update()
+		self.assertEqual(monitor.get_device_load("a"), 2)
+		history = monitor.get_device_history("a")
+		self.assertEqual(len(history), 2)
+		self.assertEqual(history.delta(), [1])
+		self.assertIsNone(monitor.get_device_history("b"))
+		monitor.cleanup()
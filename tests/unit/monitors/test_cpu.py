@@ -0,0 +1,48 @@
+import unittest
+import tempfile
+import shutil
+import os
+from tuned.monitors.monitor_cpu import CpuMonitor
+
+STAT = """cpu  %(total)s
+cpu0 %(cpu0)s
+cpu1 100 0 100 800 0 0 0 0 0 0
+intr 12345 0 0
+ctxt 100
+"""
+
+class CpuMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		self._stat = os.path.join(self._tmp_dir, "stat")
+		self._write("100 0 100 800 0 0 0 0 0 0")
+
+		class TestCpuMonitor(CpuMonitor):
+			_stat_file = self._stat
+		self._monitor_class = TestCpuMonitor
+
+	def tearDown(self):
+		self._monitor_class._reader.close_prefix(self._tmp_dir)
+		shutil.rmtree(self._tmp_dir)
+
+	def _write(self, cpu0):
+		with open(self._stat, "w") as f:
+			f.write(STAT % {"total": "1 2 3 4 5 6 7 8 9 10", "cpu0": cpu0})
+
+	def test_available_devices(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.devices, set(["cpu0", "cpu1"]))
+		monitor.cleanup()
+
+	def test_utilization(self):
+		monitor = self._monitor_class(["cpu0"])
+		self.assertEqual(monitor.get_device_load("cpu0"), [200, 800, 0, 0])
+		self.assertIsNone(monitor.utilization("cpu0"))
+		# 50 user, 10 irq, 20 softirq, 10 idle, 10 iowait
+		self._write("150 0 100 810 10 10 20 0 0 0")
+		monitor.update()
+		self.assertEqual(monitor.get_device_load("cpu0"), [280, 820, 10, 20])
+		self.assertEqual(monitor.utilization("cpu0"),
+				{"busy": 0.8, "idle": 0.2, "irq": 0.1, "softirq": 0.2})
+		self.assertIsNone(monitor.get_device_load("cpu1"))
+		monitor.cleanup()
@@ -0,0 +1,70 @@
+import unittest
+import tempfile
+import shutil
+import os
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
+from tuned.monitors.monitor_disk import DiskMonitor
+
+DISKSTATS = """   8       0 sda 1 2 3 4 5 6 7 8 9 10 11
+   8       1 sda1 1 1 1 1 1 1 1 1 1 1 1
+ 259       0 nvme0n1 10 20 30 40 50 60 70 80 90 100 110 120 130 140 150 160 170
+ 253       0 dm-0 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15
+   7       0 loop0 1 2 3 4 5 6 7 8 9 10 11
+"""
+
+class DiskMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		block_dir = os.path.join(self._tmp_dir, "block")
+		drivers_dir = os.path.join(self._tmp_dir, "drivers")
+		for driver in ["sd", "sr"]:
+			os.makedirs(os.path.join(drivers_dir, driver))
+		for dev in ["sda", "sdb", "sdc", "sr0", "nvme0n1", "dm-0", "loop0"]:
+			os.makedirs(os.path.join(block_dir, dev, "device"))
+		for (dev, vendor, driver, removable) in [("sda", "ATA", "sd", "0"),
+				("sdb", "SEAGATE", "sd", "0"), ("sdc", "SanDisk", "sd", "1"),
+				("sr0", "HL-DT-ST", "sr", "1")]:
+			with open(os.path.join(block_dir, dev, "device", "vendor"), "w") as f:
+				f.write(vendor + "\n")
+			with open(os.path.join(block_dir, dev, "removable"), "w") as f:
+				f.write(removable + "\n")
+			os.symlink(os.path.join(drivers_dir, driver),
+					os.path.join(block_dir, dev, "device", "driver"))
+		diskstats = os.path.join(self._tmp_dir, "diskstats")
+		with open(diskstats, "w") as f:
+			f.write(DISKSTATS)
+
+		class TestDiskMonitor(DiskMonitor):
+			_sys_block_dir = block_dir
+			_diskstats_file = diskstats
+		self._monitor_class = TestDiskMonitor
+
+	def tearDown(self):
+		self._monitor_class._reader.close_prefix(self._tmp_dir)
+		shutil.rmtree(self._tmp_dir)
+
+	def test_device_classes(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.devices, set(["sda", "sdb", "nvme0n1", "dm-0"]))
+		monitor.cleanup()
+
+		config = Mock()
+		config.get.return_value = "nvme ata"
+		self._monitor_class._configure(config)
+		self._monitor_class._update_available_devices()
+		self.assertEqual(self._monitor_class.get_available_devices(), set(["sda", "nvme0n1"]))
+
+	def test_update(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.get_device_load("sda"), list(range(1, 12)) + [0] * 6)
+		self.assertEqual(monitor.get_device_load("nvme0n1"), list(range(10, 171, 10)))
+		self.assertEqual(monitor.get_device_load("dm-0"), list(range(1, 16)) + [0] * 2)
+		# no statistics in diskstats
+		self.assertEqual(monitor.get_device_load("sdb"), [0] * 17)
+		self.assertIsNone(monitor.get_device_history("sdb"))
+		self.assertEqual(len(monitor.get_device_history("sda")), 1)
+		self.assertIsNone(monitor.get_device_load("sda1"))
+		monitor.cleanup()
@@ -0,0 +1,45 @@
+import unittest
+from tuned.monitors.history import History
+
+class HistoryTestCase(unittest.TestCase):
+	def _history(self, samples, size = 4):
+		history = History(2, size, "q")
+		for (i, sample) in enumerate(samples):
+			history.append(sample, float(i))
+		return history
+
+	def test_invalid_sample(self):
+		history = History(2, 4)
+		with self.assertRaises(ValueError):
+			history.append([1, 2, 3])
+
+	def test_ring_buffer(self):
+		history = self._history([[0, 0], [10, 1], [30, 2], [60, 3], [100, 4], [150, 5]])
+		self.assertEqual(len(history), 4)
+		self.assertEqual(history.sample(), [150, 5])
+		self.assertEqual(history.sample(3), [30, 2])
+		self.assertEqual(history.timestamp(), 5.0)
+		with self.assertRaises(IndexError):
+			history.sample(4)
+
+	def test_deltas(self):
+		history = self._history([[0, 0], [10, 1], [30, 2], [60, 3], [100, 4], [150, 5]])
+		self.assertEqual(history.delta(), [50, 1])
+		self.assertEqual(history.delta(1), [40, 1])
+		self.assertEqual(history.column_deltas(0), [30, 40, 50])
+		self.assertEqual(history.column_deltas(0, 2), [40, 50])
+		self.assertEqual(history.rate(0), 50.0)
+		self.assertEqual(history.peak(), [50, 1])
+
+	def test_peak_survives_overwrite(self):
+		history = self._history([[0, 0], [100, 0], [101, 0], [102, 0], [103, 0], [104, 0]])
+		self.assertEqual(history.column_deltas(0), [1, 1, 1])
+		self.assertEqual(history.peak(), [100, 0])
+
+	def test_statistics(self):
+		history = self._history([[0, 0], [10, 0], [30, 0], [60, 0], [100, 0]], size = 8)
+		self.assertEqual(history.percentile(0, 50), 20)
+		self.assertEqual(history.percentile(0, 100), 40)
+		self.assertEqual(history.percentile(0, 0), 10)
+		self.assertAlmostEqual(history.ewma(0, 0.5), 31.25)
+		self.assertEqual(History(1, 2).ewma(0, 0.5), 0.0)
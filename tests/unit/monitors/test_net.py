@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import shutil
+import os
+from tuned.monitors.monitor_net import NetMonitor
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:     100       2    0    0    0     0          0         0      100       2    0    0    0     0       0          0
+  eth0:12345678901   20    0    0    0     0          0         0     3000      30    0    0    0     0       0          0
+"""
+
+class NetMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		devices_dir = os.path.join(self._tmp_dir, "devices")
+		class_dir = os.path.join(self._tmp_dir, "class")
+		os.mkdir(class_dir)
+		for (dev, path) in [("lo", "virtual/net/lo"), ("eth0", "pci0000:00/net/eth0"),
+				("eth1", "pci0000:00/net/eth1")]:
+			os.makedirs(os.path.join(devices_dir, path, "statistics"))
+			os.symlink(os.path.join(devices_dir, path), os.path.join(class_dir, dev))
+		for (f, value) in [("rx_bytes", 1), ("rx_packets", 2), ("tx_bytes", 3), ("tx_packets", 4)]:
+			with open(os.path.join(devices_dir, "pci0000:00/net/eth1/statistics", f), "w") as stat:
+				stat.write("%d\n" % value)
+		net_dev = os.path.join(self._tmp_dir, "net_dev")
+		with open(net_dev, "w") as f:
+			f.write(NET_DEV)
+
+		class TestNetMonitor(NetMonitor):
+			_net_class_dir = class_dir
+			_net_dev_file = net_dev
+		self._monitor_class = TestNetMonitor
+
+	def tearDown(self):
+		self._monitor_class._reader.close_prefix(self._tmp_dir)
+		shutil.rmtree(self._tmp_dir)
+
+	def test_available_devices(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.devices, set(["eth0", "eth1"]))
+		monitor.cleanup()
+
+	def test_update(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.get_device_load("eth0"), [12345678901, 20, 3000, 30])
+		# not in /proc/net/dev, read from sysfs
+		self.assertEqual(monitor.get_device_load("eth1"), [1, 2, 3, 4])
+		self.assertIsNone(monitor.get_device_load("lo"))
+		monitor.cleanup()
+
+	def test_add_device(self):
+		monitor = self._monitor_class([])
+		monitor.add_device("lo")
+		monitor.add_device("eth0")
+		self.assertEqual(monitor.devices, set(["eth0"]))
+		monitor.cleanup()
@@ -0,0 +1,51 @@
+import unittest
+import tempfile
+import shutil
+import os
+from tuned.monitors.monitor_pressure import PressureMonitor
+
+class PressureMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		for resource in ["cpu", "io"]:
+			self._write(resource, 1000)
+
+		class TestPressureMonitor(PressureMonitor):
+			_pressure_dir = self._tmp_dir
+		self._monitor_class = TestPressureMonitor
+
+	def tearDown(self):
+		self._monitor_class._reader.close_prefix(self._tmp_dir)
+		shutil.rmtree(self._tmp_dir)
+
+	def _write(self, resource, total):
+		with open(os.path.join(self._tmp_dir, resource), "w") as f:
+			f.write("some avg10=1.50 avg60=0.50 avg300=0.10 total=%d\n" % total)
+			f.write("full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+
+	def test_available_devices(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.devices, set(["cpu", "io"]))
+		monitor.cleanup()
+
+	def test_load(self):
+		monitor = self._monitor_class(["cpu"])
+		load = monitor.get_device_load("cpu")
+		self.assertEqual(load["some"], {"avg10": 1.5, "avg60": 0.5, "avg300": 0.1, "total": 1000})
+		self.assertEqual(load["full"]["total"], 0)
+		self.assertIsNone(monitor.get_device_load("io"))
+		monitor.cleanup()
+
+	def test_stall_percent(self):
+		monitor = self._monitor_class(["cpu"])
+		# only one sample, avg10 is used
+		self.assertEqual(monitor.stall_percent("cpu"), 1.5)
+		self._write("cpu", 101000)
+		history = monitor.get_device_history("cpu")
+		monitor._store_sample("cpu", monitor._read_pressure("cpu"), [101000, 0],
+				history.timestamp() + 0.5)
+		self.assertAlmostEqual(monitor.stall_percent("cpu"), 20.0)
+		self.assertEqual(monitor.stall_percent("cpu", "full"), 0.0)
+		self.assertIsNone(monitor.stall_percent("memory"))
+		self.assertEqual(monitor.poll_triggers(), set())
+		monitor.cleanup()
@@ -54,6 +54,18 @@ class PluginBaseTestCase(unittest.TestCase):
 			{'default_option1':'default_value2'})
 		self.assertIsNotNone(instance)
 
+	def test_instance_update_interval(self):
+		instance = self._plugin.create_instance(\
+			'first_instance','test','test','test','test',\
+			{'default_option1':'default_value2','update_interval':'2.5'})
+		self.assertEqual(instance.update_interval, 2.5)
+		self.assertNotIn('update_interval', instance.options)
+
+		instance = self._plugin.create_instance(\
+			'second_instance','test','test','test','test',\
+			{'update_interval':'-1'})
+		self.assertIsNone(instance.update_interval)
+
 	def test_destroy_instance(self):
 		instance = self._plugin.create_instance(\
 			'first_instance','test','test','test','test',\
@@ -124,6 +136,25 @@ class PluginBaseTestCase(unittest.TestCase):
 		self.assertEqual(device1.setting,'010')
 		self.assertEqual(device2.setting,'010')
 
+	def test_instance_update_options(self):
+		instance = self._commands_plugin.create_instance(\
+			'update_instance','test',None,None,None,{'size':'L'})
+		instance._has_static_tuning = True
+		self._commands_plugin._execute_all_non_device_commands(instance)
+		old_options = self._commands_plugin.expand_options(instance.options)
+
+		self.assertTrue(self._commands_plugin.instance_update_options(\
+			instance,{'size':'XL'},old_options))
+		self.assertEqual(self._commands_plugin._size,'XL')
+		self.assertEqual(instance.options['size'],'XL')
+		self.assertEqual(self._commands_plugin._storage_get(\
+			instance,self._commands_plugin._commands['size']),'S')
+
+		instance._script_pre = 'test'
+		self.assertFalse(self._commands_plugin.instance_update_options(\
+			instance,{'size':'M'},{'size':'XL','device_setting':'101'}))
+		self.assertEqual(self._commands_plugin._size,'XL')
+
 	def test_process_assignment_modifiers(self):
 		self.assertEqual(self._plugin._process_assignment_modifiers('100',None)\
 			,'100')
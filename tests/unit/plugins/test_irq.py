@@ -0,0 +1,124 @@
+import unittest
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
+import tempfile
+import shutil
+import os
+
+import tuned.hardware as hardware
+import tuned.monitors as monitors
+import tuned.plugins as plugins
+import tuned.profiles as profiles
+from tuned import storage
+from tuned.plugins.plugin_irq import IrqPlugin
+from tuned.utils.irq_placement import IrqPlacement
+
+INTERRUPTS = """           CPU0       CPU1       CPU2       CPU3
+  0:         22          0          0          0   IO-APIC   2-edge      timer
+ 24:          1          0          0          0   PCI-MSI 524288-edge      mlx5_comp0@pci:0000:3b:00.0
+ 25:          0          1          0          0   PCI-MSI 524289-edge      mlx5_comp1@pci:0000:3b:00.0
+ 40:          0          0          5          0   PCI-MSI 1048576-edge      nvme0q1
+"""
+
+class IrqPluginTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		self._proc_dir = os.path.join(self._tmp_dir, "proc")
+		sys_dir = os.path.join(self._tmp_dir, "sys")
+		self._write(os.path.join(self._proc_dir, "interrupts"), INTERRUPTS)
+		for irq in [0, 24, 25, 40]:
+			self._set_affinity(irq, "0-3")
+		devices = os.path.join(sys_dir, "bus", "pci", "devices")
+		drivers = os.path.join(sys_dir, "bus", "pci", "drivers")
+		for (device, driver, irqs) in [("0000:3b:00.0", "mlx5_core", [24, 25]),
+				("0000:5e:00.0", "nvme", [40])]:
+			for irq in irqs:
+				self._write(os.path.join(devices, device, "msi_irqs", str(irq)), "msix\n")
+			os.makedirs(os.path.join(drivers, driver))
+			os.symlink(os.path.join(drivers, driver), os.path.join(devices, device, "driver"))
+
+		storage_factory = storage.Factory(storage.PickleProvider(
+				os.path.join(self._tmp_dir, "save.pickle")))
+		self._plugin = IrqPlugin(monitors.Repository(), storage_factory,
+				Mock(), hardware.DeviceMatcher(), hardware.DeviceMatcherUdev(),
+				plugins.instance.Factory(), {}, profiles.variables.Variables())
+		self._plugin._irq_reader = IrqPlacement(self._proc_dir, sys_dir)
+		self._plugin.init_devices()
+
+	def tearDown(self):
+		shutil.rmtree(self._tmp_dir)
+
+	def _write(self, path, data):
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(data)
+
+	# the kernel keeps the smp_affinity and smp_affinity_list files in sync
+	def _set_affinity(self, irq, cpus):
+		self._write(os.path.join(self._proc_dir, "irq", str(irq), "smp_affinity_list"), cpus + "\n")
+
+	def _sync_affinity(self, irq):
+		with open(os.path.join(self._proc_dir, "irq", str(irq), "smp_affinity")) as f:
+			mask = int(f.read().replace(",", ""), 16)
+		self._set_affinity(irq, ",".join(str(cpu) for cpu in range(mask.bit_length()) if mask >> cpu & 1))
+
+	def _create_instance(self, options):
+		instance = self._plugin.create_instance("irq_test", "*", None, None, None, options)
+		self._plugin.assign_free_devices(instance)
+		self._plugin.initialize_instance(instance)
+		return instance
+
+	def test_devices(self):
+		self.assertEqual(self._plugin._free_devices, set(["irq0", "irq24", "irq25", "irq40"]))
+
+	def test_match_irq_name(self):
+		instance = self._create_instance({"irq_name": "mlx5_comp", "affinity": "2"})
+		self.assertEqual(instance.assigned_devices, set(["irq24", "irq25"]))
+
+	def test_match_irq_driver(self):
+		instance = self._create_instance({"irq_driver": "^nvme$", "affinity": "2"})
+		self.assertEqual(instance.assigned_devices, set(["irq40"]))
+
+	def test_invalid_regex(self):
+		instance = self._create_instance({"irq_name": "(", "affinity": "2"})
+		self.assertFalse(instance.active)
+
+	def test_apply_restore(self):
+		instance = self._create_instance({"irq_name": "nvme", "affinity": "2-3"})
+		self._plugin.instance_apply_tuning(instance)
+		self._sync_affinity(40)
+		self.assertEqual(self._plugin._get_affinity("irq40"), "2-3")
+		self.assertTrue(self._plugin._verify_device_command(
+				self._plugin._commands["affinity"], "irq40", "2-3", False))
+		self._plugin.instance_unapply_tuning(instance)
+		self._sync_affinity(40)
+		self.assertEqual(self._plugin._get_affinity("irq40"), "0-3")
+
+	def test_new_vectors(self):
+		instance = self._create_instance({"irq_name": "mlx5_comp", "affinity": "3"})
+		self._plugin.instance_apply_tuning(instance)
+		with open(os.path.join(self._proc_dir, "interrupts"), "a") as f:
+			f.write(" 26:          0          0          0          0   PCI-MSI 524290-edge      mlx5_comp2@pci:0000:3b:00.0\n")
+		self._set_affinity(26, "0-3")
+		self._plugin._rescan_irqs()
+		self.assertIn("irq26", instance.processed_devices)
+		self._sync_affinity(26)
+		self.assertEqual(self._plugin._get_affinity("irq26"), "3")
+
+	def test_reused_vector(self):
+		instance = self._create_instance({"irq_name": "mlx5_comp", "affinity": "3"})
+		self._plugin.instance_apply_tuning(instance)
+		# the driver freed irq24 and allocated it again for another queue
+		with open(os.path.join(self._proc_dir, "interrupts"), "w") as f:
+			f.write(INTERRUPTS.replace("mlx5_comp0@", "mlx5_comp5@"))
+		self._set_affinity(24, "0-1")
+		self._plugin._rescan_irqs()
+		self.assertIn("irq24", instance.processed_devices)
+		self._sync_affinity(24)
+		self.assertEqual(self._plugin._get_affinity("irq24"), "3")
+		self._plugin.instance_unapply_tuning(instance)
+		self._sync_affinity(24)
+		self.assertEqual(self._plugin._get_affinity("irq24"), "0-1")
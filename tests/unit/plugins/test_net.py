@@ -0,0 +1,141 @@
+import unittest
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
+import tempfile
+import shutil
+import os
+
+import tuned.hardware as hardware
+import tuned.monitors as monitors
+import tuned.plugins as plugins
+import tuned.profiles as profiles
+from tuned import storage
+from tuned.plugins.plugin_net import NetTuningPlugin
+from tuned.utils.cpuset import CpuSet
+
+class NetPluginTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		for (attr, value) in [("tx_queue_len", "1000\n"), ("mtu", "1500\n"),
+				("device/local_cpulist", "4-7\n")]:
+			self._write("eth0", attr, value)
+		for queue in range(2):
+			self._write("eth0", "queues/rx-%d/rps_cpus" % queue, "00\n")
+			self._write("eth0", "queues/rx-%d/rps_flow_cnt" % queue, "0\n")
+			self._write("eth0", "queues/tx-%d/xps_cpus" % queue, "00\n")
+		self._write("cpu", "online", "0-7\n")
+		self._write("core", "rps_sock_flow_entries", "0\n")
+		storage_factory = storage.Factory(storage.PickleProvider(
+				os.path.join(self._tmp_dir, "save.pickle")))
+		self._plugin = NetTuningPlugin(monitors.Repository(), storage_factory,
+				Mock(), hardware.DeviceMatcher(), hardware.DeviceMatcherUdev(),
+				plugins.instance.Factory(), {}, profiles.variables.Variables())
+		self._plugin._net_sysfs_path = lambda device, attr: \
+				os.path.join(self._tmp_dir, device, attr)
+		self._plugin._cpus_online_path = lambda: os.path.join(self._tmp_dir, "cpu", "online")
+		self._plugin._rps_sock_flow_entries_path = lambda: \
+				os.path.join(self._tmp_dir, "core", "rps_sock_flow_entries")
+
+	def tearDown(self):
+		shutil.rmtree(self._tmp_dir)
+
+	def _write(self, device, attr, value):
+		path = os.path.join(self._tmp_dir, device, attr)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(value)
+
+	def _read(self, device, attr):
+		with open(os.path.join(self._tmp_dir, device, attr)) as f:
+			return f.read()
+
+	def test_txqueuelen(self):
+		self.assertEqual(self._plugin._get_txqueuelen("eth0"), "1000")
+		self.assertEqual(self._plugin._set_txqueuelen("5000", "eth0", False), "5000")
+		self.assertEqual(self._read("eth0", "tx_queue_len"), "5000")
+		self.assertIsNone(self._plugin._set_txqueuelen("x", "eth0", False))
+
+	def test_mtu(self):
+		self.assertEqual(self._plugin._get_mtu("eth0"), "1500")
+		self.assertEqual(self._plugin._set_mtu("9000", "eth0", True), "9000")
+		self.assertEqual(self._read("eth0", "mtu"), "1500\n")
+		self.assertEqual(self._plugin._set_mtu("9000", "eth0", False), "9000")
+		self.assertEqual(self._plugin._get_mtu("eth0"), "9000")
+
+	def test_missing_device(self):
+		self.assertIsNone(self._plugin._get_mtu("eth1", ignore_missing=True))
+
+	def test_spread_cpus(self):
+		self.assertEqual(NetTuningPlugin._spread_cpus([0, 1, 2, 3, 4, 5], 4),
+				[CpuSet([0]), CpuSet([1, 2]), CpuSet([3]), CpuSet([4, 5])])
+		self.assertEqual(NetTuningPlugin._spread_cpus([2, 3], 3),
+				[CpuSet(), CpuSet(), CpuSet()])
+		self.assertEqual(NetTuningPlugin._spread_cpus([2, 3], 2),
+				[CpuSet(), CpuSet()])
+		self.assertEqual(NetTuningPlugin._spread_cpus([], 3), [])
+
+	def test_rps_cpus(self):
+		self.assertIsNone(self._plugin._rps_cpus(True, "1-2", "eth0", False, False))
+		self.assertEqual(self._read("eth0", "queues/rx-1/rps_cpus"), "00000006")
+		self._write("eth0", "queues/rx-0/rps_cpus", "00000006\n")
+		self._write("eth0", "queues/rx-1/rps_cpus", "00000006\n")
+		self.assertTrue(self._plugin._rps_cpus(True, "1-2", "eth0", True, False))
+		self.assertFalse(self._plugin._rps_cpus(True, "1", "eth0", True, False))
+		self._plugin._rps_cpus(False, "1-2", "eth0", False, False)
+		self.assertEqual(self._read("eth0", "queues/rx-0/rps_cpus"), "00")
+
+	def test_rps_cpus_auto(self):
+		self._plugin._variables.add_variable("isolated_cores", "7")
+		self._plugin._rps_cpus(True, "auto", "eth0", False, False)
+		self.assertEqual(self._read("eth0", "queues/rx-0/rps_cpus"), "00000010")
+		self.assertEqual(self._read("eth0", "queues/rx-1/rps_cpus"), "00000060")
+
+	def test_steering_auto_queue_per_cpu(self):
+		self._plugin._variables.add_variable("isolated_cores", "6-7")
+		self._write("eth0", "queues/rx-0/rps_cpus", "00000010\n")
+		self._write("eth0", "queues/tx-0/xps_cpus", "00000010\n")
+		self.assertIsNone(self._plugin._rps_cpus(True, "auto", "eth0", False, False))
+		self.assertIsNone(self._plugin._xps_cpus(True, "auto", "eth0", False, False))
+		self.assertEqual(self._read("eth0", "queues/rx-0/rps_cpus"), "00000000")
+		self.assertEqual(self._read("eth0", "queues/tx-0/xps_cpus"), "00000010\n")
+		self.assertTrue(self._plugin._rps_cpus(True, "auto", "eth0", True, False))
+		self.assertTrue(self._plugin._xps_cpus(True, "auto", "eth0", True, False))
+
+	def test_xps_cpus_auto_no_local_cpus(self):
+		self._write("eth0", "device/local_cpulist", "\n")
+		self._plugin._xps_cpus(True, "auto", "eth0", False, False)
+		self.assertEqual(self._read("eth0", "queues/tx-0/xps_cpus"), "0000000f")
+		self.assertEqual(self._read("eth0", "queues/tx-1/xps_cpus"), "000000f0")
+
+	def test_rfs(self):
+		self.assertEqual(self._plugin._set_rps_sock_flow_entries("32768", False), 32768)
+		self._plugin._rps_flow_cnt(True, "auto", "eth0", False, False)
+		self.assertEqual(self._read("eth0", "queues/rx-1/rps_flow_cnt"), "16384")
+		self.assertTrue(self._plugin._rps_flow_cnt(True, "16384", "eth0", True, False))
+
+	def test_rfs_queues_not_power_of_two(self):
+		self._write("eth0", "queues/rx-2/rps_flow_cnt", "0\n")
+		self._plugin._set_rps_sock_flow_entries("32768", False)
+		self._plugin._rps_flow_cnt(True, "auto", "eth0", False, False)
+		self.assertEqual(self._read("eth0", "queues/rx-2/rps_flow_cnt"), "8192")
+		self.assertTrue(self._plugin._rps_flow_cnt(True, "auto", "eth0", True, False))
+		# the kernel reads back 10922 as 16384
+		for queue in range(3):
+			self._write("eth0", "queues/rx-%d/rps_flow_cnt" % queue, "16384\n")
+		self.assertTrue(self._plugin._rps_flow_cnt(True, "10922", "eth0", True, False))
+		self.assertFalse(self._plugin._rps_flow_cnt(True, "8192", "eth0", True, False))
+
+	def test_update_options_auto(self):
+		options = {"dynamic": "0", "rps_cpus": "auto", "mtu": "9000"}
+		instance = self._plugin.create_instance("net_test", "*", None, None, None, options)
+		instance._has_static_tuning = True
+		old_options = self._plugin.expand_options(instance.options)
+		self.assertFalse(self._plugin.instance_update_options(instance, options, old_options))
+
+		options = {"dynamic": "0", "rps_cpus": "4-5", "mtu": "9000"}
+		instance = self._plugin.create_instance("net_test_cpus", "*", None, None, None, options)
+		old_options = self._plugin.expand_options(instance.options)
+		self.assertTrue(self._plugin.instance_update_options(instance, options, old_options))
@@ -0,0 +1,48 @@
+import unittest
+import pickle
+from tuned.plugins.scheduler_rollback import SchedulerParams, SchedulerRollback
+
+class SchedulerRollbackTestCase(unittest.TestCase):
+	def test_params(self):
+		params = SchedulerParams(cmdline = "worker -v", affinity = [0, 3, 4], starttime = 100)
+		self.assertEqual(params.affinity, [0, 3, 4])
+		self.assertEqual(params._affinity, 0b11001)
+		self.assertIsNone(params.scheduler)
+		self.assertFalse(hasattr(params, "__dict__"))
+
+	def test_cmdline_interned(self):
+		first = SchedulerParams(cmdline = "".join(["worker", " -v"]))
+		second = SchedulerParams(cmdline = "".join(["worker -", "v"]))
+		self.assertIs(first.cmdline, second.cmdline)
+
+	def test_pickle(self):
+		rollback = SchedulerRollback()
+		rollback[10] = SchedulerParams(cmdline = "a", scheduler = 1, priority = 5,
+				affinity = [1], starttime = 100)
+		rollback[11] = SchedulerParams(cgroup = "group")
+		loaded = pickle.loads(pickle.dumps(rollback))
+		self.assertIsInstance(loaded, SchedulerRollback)
+		self.assertEqual(sorted(loaded), [10, 11])
+		params = loaded[10]
+		self.assertEqual((params.cmdline, params.scheduler, params.priority, params.affinity, params.starttime),
+				("a", 1, 5, [1], 100))
+		self.assertEqual(loaded[11].cgroup, "group")
+
+	def test_old_state(self):
+		params = SchedulerParams.__new__(SchedulerParams)
+		params.__setstate__({"_cmd": object(), "cmdline": "a", "scheduler": None,
+				"priority": None, "_affinity": 6, "cgroup": None})
+		self.assertEqual(params.cmdline, "a")
+		self.assertEqual(params.affinity, [1, 2])
+		self.assertIsNone(params.starttime)
+
+	def test_cleanup(self):
+		rollback = SchedulerRollback()
+		rollback[10] = SchedulerParams(starttime = 100)
+		rollback[11] = SchedulerParams(starttime = 100)
+		rollback[12] = SchedulerParams()
+		rollback[13] = SchedulerParams()
+		running = {10: 100, 11: 200, 12: 300}
+		self.assertEqual(rollback.cleanup(running.get), 2)
+		self.assertEqual(sorted(rollback), [10, 12])
+		self.assertEqual(rollback.cleanup(running.get), 0)
@@ -112,6 +112,32 @@ class LoaderTestCase(unittest.TestCase):
 		self.assertEqual(config.units['test_unit'].devices,\
 			'/dev/net,/dev/cpu')
 
+	def test_cached_profile_not_shared(self):
+		merged_profile = self._loader.load(['dummy3'])
+		merged_profile.units['test_unit'].options['test_option'] = 'changed'
+		del merged_profile.units['test_unit'].options['new_option']
+		merged_profile = self._loader.load(['dummy3'])
+		self.assertEqual(merged_profile.units['test_unit'].\
+			options['test_option'],'bye bye')
+		self.assertEqual(merged_profile.units['test_unit'].\
+			options['new_option'],'add this')
+
+	def test_changed_include_reloaded(self):
+		profile_dir = self._profiles_dir + '/dummy5'
+		os.mkdir(profile_dir)
+		with open(profile_dir + '/tuned.conf','w') as f:
+			f.write('[main]\ninclude=dummy\n')
+		merged_profile = self._loader.load(['dummy5'])
+		self.assertEqual(merged_profile.units['test_unit'].\
+			options['test_option'],'hello')
+
+		with open(profile_dir + '/tuned.conf','w') as f:
+			f.write('[main]\ninclude=dummy2\n')
+		merged_profile = self._loader.load(['dummy5'])
+		self.assertEqual(merged_profile.units['test_unit'].\
+			options['test_option'],'hello world')
+		self.assertNotIn('random_option', merged_profile.units['test_unit'].options)
+
 	@classmethod
 	def tearDownClass(cls):
 		shutil.rmtree(cls._test_dir)
@@ -1,6 +1,10 @@
 import unittest
 import tempfile
 import shutil
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
 from tuned.profiles import variables, profile
 
 class VariablesTestCase(unittest.TestCase):
@@ -27,6 +31,37 @@ class VariablesTestCase(unittest.TestCase):
 
 		self.assertEqual("This is var1 and this is var2", v.expand("This is ${variable1} and this is ${variable2}"))
 
+	def test_escape_and_undefined(self):
+		v = variables.Variables()
+		v.add_variable("a", "1")
+		self.assertEqual("1 ${a} ${b}", v.expand("${a} \\${a} ${b}"))
+
+	def test_redefinition(self):
+		v = variables.Variables()
+		v.add_variable("a", "1")
+		self.assertEqual("a=1", v.expand("a=${a}"))
+		v.add_variable("a", "2")
+		self.assertEqual("a=2", v.expand("a=${a}"))
+		v.add_variable("b", "${a}3")
+		self.assertEqual("23", v.expand("${b}"))
+
+	def test_functions(self):
+		v = variables.Variables()
+		v.add_variable("cpus", "1,2,3,5")
+		self.assertEqual("1-3,5", v.expand("${f:cpulist_pack:${cpus}}"))
+		self.assertEqual("8", v.expand("${f:kb2s:${f:strip: 4 }}"))
+		self.assertEqual("${f:kb2s:4}", v.expand("\\${f:kb2s:4}"))
+		self.assertEqual("${f:kb2s:4", v.expand("${f:kb2s:4"))
+		self.assertEqual("${f:kb2s:x}", v.expand("${f:kb2s:x}"))
+
+	def test_pure_function_results_cached(self):
+		v = variables.Variables()
+		f = v._functions._repository.load_func("kb2s")
+		self.assertEqual("8", v.expand("${f:kb2s:4}"))
+		f.execute = Mock(return_value = "0")
+		self.assertEqual("8", v.expand("${f:kb2s:4}"))
+		self.assertEqual("0", v.expand("${f:kb2s:5}"))
+
 	@classmethod
 	def tearDownClass(cls):
 		shutil.rmtree(cls.test_dir)
@@ -0,0 +1,112 @@
+import unittest
+import os
+import tempfile
+
+import tuned.storage
+
+class StorageJournalProviderTestCase(unittest.TestCase):
+	def setUp(self):
+		(handle, filename) = tempfile.mkstemp()
+		os.close(handle)
+		os.unlink(filename)
+		self._temp_filename = filename
+
+	def tearDown(self):
+		if os.path.exists(self._temp_filename):
+			os.unlink(self._temp_filename)
+
+	def _reload(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 60)
+		provider.load()
+		return provider
+
+	def test_replay(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 60)
+		provider.load()
+		provider.set("ns1", "opt1", "value1")
+		provider.set("ns1", "opt2", "value2")
+		provider.set("ns2", "opt1", {1: "a", 2: "b"})
+		provider.unset("ns1", "opt2")
+		provider.save()
+
+		provider = self._reload()
+		self.assertEqual("value1", provider.get("ns1", "opt1"))
+		self.assertIsNone(provider.get("ns1", "opt2"))
+		self.assertEqual({1: "a", 2: "b"}, provider.get("ns2", "opt1"))
+
+		provider.clear()
+		self.assertFalse(os.path.exists(self._temp_filename))
+		self.assertIsNone(self._reload().get("ns1", "opt1"))
+
+	def test_dictionary_deltas(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 60)
+		pids = tuned.storage.TrackedDict((pid, "cmd%d" % pid) for pid in range(1000))
+		provider.set("ns", "pids", pids)
+		provider.save()
+		size = os.path.getsize(self._temp_filename)
+
+		pids[1000] = "cmd1000"
+		del pids[0]
+		provider.set("ns", "pids", pids)
+		provider.save()
+		self.assertLess(os.path.getsize(self._temp_filename) - size, 200)
+
+		provider = self._reload()
+		self.assertEqual(pids, provider.get("ns", "pids"))
+
+	def test_values_modified_in_place(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 60)
+		params = tuned.storage.TrackedDict((pid, {"affinity": [0, 1]}) for pid in range(1000))
+		provider.set("ns", "params", params)
+		provider.save()
+		size = os.path.getsize(self._temp_filename)
+
+		with params.lock:
+			params[3]["affinity"] = [2]
+			params[3] = params[3]
+		provider.set("ns", "params", params)
+		provider.save()
+		self.assertLess(os.path.getsize(self._temp_filename) - size, 200)
+
+		provider = self._reload()
+		self.assertEqual([2], provider.get("ns", "params")[3]["affinity"])
+		self.assertEqual([0, 1], provider.get("ns", "params")[4]["affinity"])
+
+	def test_new_dictionary_written_whole(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 60)
+		provider.set("ns", "pids", tuned.storage.TrackedDict({1: "a", 2: "b"}))
+		provider.save()
+		pids = tuned.storage.TrackedDict({3: "c"})
+		provider.set("ns", "pids", pids)
+		provider.save()
+		pids[4] = "d"
+		provider.set("ns", "plain", {5: "e"})
+		provider.set("ns", "pids", pids)
+		provider.save()
+		provider = self._reload()
+		self.assertEqual({3: "c", 4: "d"}, provider.get("ns", "pids"))
+		self.assertEqual({5: "e"}, provider.get("ns", "plain"))
+
+	def test_truncated_journal(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 60)
+		provider.set("ns", "opt1", "value1")
+		provider.save()
+		provider.set("ns", "opt2", "value2")
+		provider.save()
+		with open(self._temp_filename, "r+b") as f:
+			f.truncate(os.path.getsize(self._temp_filename) - 1)
+
+		provider = self._reload()
+		self.assertEqual("value1", provider.get("ns", "opt1"))
+		self.assertIsNone(provider.get("ns", "opt2"))
+		provider.set("ns", "opt3", "value3")
+		provider.save()
+		self.assertEqual("value3", self._reload().get("ns", "opt3"))
+
+	def test_compaction(self):
+		provider = tuned.storage.JournalProvider(self._temp_filename, 0)
+		for i in range(3000):
+			provider.set("ns", "opt", i)
+		provider.save()
+		self.assertLess(provider._records, 1100)
+		self.assertEqual(2999, self._reload().get("ns", "opt"))
@@ -0,0 +1,32 @@
+import unittest
+import pickle
+
+from tuned.storage import TrackedDict
+
+class TrackedDictTestCase(unittest.TestCase):
+	def test_changes(self):
+		values = TrackedDict({1: "a", 2: "b"})
+		# nothing is recorded before the first take
+		values[3] = "c"
+		self.assertEqual(values.take_changes(), (True, set()))
+
+		values[4] = "d"
+		del values[1]
+		values.pop(2)
+		values.pop(10, None)
+		values.setdefault(3, "x")
+		values.setdefault(5, "e")
+		values.update({6: "f"})
+		self.assertEqual(values.take_changes(), (False, set([1, 2, 4, 5, 6, 10])))
+		self.assertEqual(values.take_changes(), (False, set()))
+
+		values.clear()
+		self.assertEqual(values.take_changes(), (True, set()))
+
+	def test_pickle(self):
+		values = TrackedDict({1: "a"})
+		values.take_changes()
+		loaded = pickle.loads(pickle.dumps(values))
+		self.assertIsInstance(loaded, TrackedDict)
+		self.assertEqual(loaded, {1: "a"})
+		self.assertEqual(loaded.take_changes(), (True, set()))
@@ -0,0 +1,114 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import tuned.storage
+
+class StorageWriteBehindProviderTestCase(unittest.TestCase):
+	def setUp(self):
+		self._temp_dir = tempfile.mkdtemp()
+		self._path = os.path.join(self._temp_dir, "storage")
+
+	def tearDown(self):
+		shutil.rmtree(self._temp_dir)
+
+	def _files(self):
+		if not os.path.isdir(self._path):
+			return []
+		return sorted(os.listdir(self._path))
+
+	def test_memory_persistence(self):
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+
+		self.assertEqual("default", provider.get("ns1", "opt1", "default"))
+		provider.set("ns1", "opt1", "value1")
+		provider.set("ns2", "opt1", "value2")
+		self.assertEqual("value1", provider.get("ns1", "opt1"))
+		self.assertEqual("value2", provider.get("ns2", "opt1"))
+		provider.unset("ns1", "opt1")
+		self.assertIsNone(provider.get("ns1", "opt1"))
+		# nothing is written before the flush
+		self.assertEqual(self._files(), [])
+		provider.clear()
+		self.assertIsNone(provider.get("ns2", "opt1"))
+
+	def test_save_writes_dirty_namespaces(self):
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		provider.set("ns1", "opt1", {1: "value1"})
+		provider.set("ns2", "opt1", "value2")
+		provider.save()
+		self.assertEqual(self._files(), ["ns1.pickle", "ns2.pickle"])
+
+		os.utime(os.path.join(self._path, "ns2.pickle"), ns = (0, 0))
+		provider.set("ns1", "opt2", "value3")
+		provider.unset("ns2", "opt2")
+		provider.save()
+		self.assertEqual(os.stat(os.path.join(self._path, "ns2.pickle")).st_mtime_ns, 0)
+
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		provider.load()
+		self.assertEqual({1: "value1"}, provider.get("ns1", "opt1"))
+		self.assertEqual("value3", provider.get("ns1", "opt2"))
+		self.assertEqual("value2", provider.get("ns2", "opt1"))
+
+		provider.unset("ns2", "opt1")
+		provider.save()
+		self.assertEqual(self._files(), ["ns1.pickle"])
+		provider.clear()
+		self.assertEqual(self._files(), [])
+
+	def test_timer_flush(self):
+		provider = tuned.storage.WriteBehindProvider(self._path, 0.05)
+		provider.set("ns1", "opt1", "value1")
+		for i in range(100):
+			if self._files():
+				break
+			time.sleep(0.02)
+		self.assertEqual(self._files(), ["ns1.pickle"])
+
+	def test_write_through(self):
+		provider = tuned.storage.WriteBehindProvider(self._path, 0)
+		provider.set("ns1", "opt1", "value1")
+		self.assertEqual(self._files(), ["ns1.pickle"])
+
+	def test_namespace_file_names(self):
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		provider.set("a/b", "opt1", "value1")
+		provider.set("a_b", "opt1", "value2")
+		provider.set("50%", "opt1", "value3")
+		provider.save()
+		self.assertEqual(len(self._files()), 3)
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		provider.load()
+		self.assertEqual("value1", provider.get("a/b", "opt1"))
+		self.assertEqual("value2", provider.get("a_b", "opt1"))
+		self.assertEqual("value3", provider.get("50%", "opt1"))
+
+	def test_shutdown_saves(self):
+		self.assertTrue(tuned.storage.WriteBehindProvider.persistent)
+		self.assertFalse(tuned.storage.PickleProvider.persistent)
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		provider.set("ns1", "opt1", "value1")
+		provider.shutdown()
+		self.assertEqual(self._files(), ["ns1.pickle"])
+
+	def test_tracked_snapshot(self):
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		params = tuned.storage.TrackedDict({1: {"cmdline": "a", "starttime": 1}})
+		provider.set("ns1", "params", params)
+		# the owner modifies the value in place with the lock held
+		with params.lock:
+			thread = threading.Thread(target=provider.save)
+			thread.start()
+			params[1]["cmdline"] = "b"
+			time.sleep(0.1)
+			self.assertEqual(self._files(), [])
+			params[1]["starttime"] = 2
+			params[1] = params[1]
+		thread.join()
+		provider = tuned.storage.WriteBehindProvider(self._path, 60)
+		provider.load()
+		self.assertEqual({1: {"cmdline": "b", "starttime": 2}}, provider.get("ns1", "params"))
@@ -0,0 +1,234 @@
+import unittest
+import threading
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
+
+import tuned.units
+from tuned.profiles.unit import Unit
+
+class DummyInstance(object):
+	def __init__(self, name, resources, log, lock, verify_result = True):
+		self.name = name
+		self.plugin = Mock()
+		self.plugin.get_tuning_resources.return_value = set(resources)
+		self._log = log
+		self._lock = lock
+		self._verify_result = verify_result
+		self.has_dynamic_tuning = True
+		self.update_interval = None
+
+	def update_tuning(self):
+		self._record("update")
+
+	def _record(self, op):
+		with self._lock:
+			self._log.append((op, self.name, threading.current_thread().name))
+
+	def apply_tuning(self):
+		self._record("apply")
+
+	def verify_tuning(self, ignore_missing):
+		self._record("verify")
+		return self._verify_result
+
+	def unapply_tuning(self, full_rollback = False):
+		self._record("unapply")
+
+class DummyMonitor(object):
+	update_interval = None
+
+	def __init__(self, log):
+		self._log = log
+
+	def update(self):
+		self._log.append(("monitor", type(self).__name__, None))
+
+class OtherMonitor(DummyMonitor):
+	pass
+
+class SwitchPlugin(object):
+	def __init__(self, name, log, updatable = True):
+		self.name = name
+		self.updatable = updatable
+		self._log = log
+
+	def create_instance(self, name, devices, devices_udev_regex, script_pre, script_post, options):
+		return SwitchInstance(self, name, devices, devices_udev_regex, script_pre, script_post, options)
+
+	def init_devices(self):
+		pass
+
+	def assign_free_devices(self, instance):
+		pass
+
+	def initialize_instance(self, instance):
+		pass
+
+	def destroy_instance(self, instance):
+		self._log.append(("destroy", instance.name))
+
+	def cleanup(self):
+		self._log.append(("cleanup", self.name))
+
+	def expand_options(self, options):
+		return dict(options)
+
+	def get_tuning_resources(self, instance):
+		return set([self.name])
+
+class SwitchInstance(object):
+	def __init__(self, plugin, name, devices, devices_udev_regex, script_pre, script_post, options):
+		self.plugin = plugin
+		self.name = name
+		self.devices_expression = devices
+		self.devices_udev_regex = devices_udev_regex
+		self.script_pre = script_pre
+		self.script_post = script_post
+		self.options = options
+
+	def apply_tuning(self):
+		self.plugin._log.append(("apply", self.name))
+
+	def unapply_tuning(self, full_rollback = False):
+		self.plugin._log.append(("unapply", self.name))
+
+	def update_options(self, options, old_options):
+		if not self.plugin.updatable:
+			return False
+		if options != old_options:
+			self.plugin._log.append(("update", self.name))
+			self.options = options
+		return True
+
+class ManagerTestCase(unittest.TestCase):
+	def setUp(self):
+		self._log = []
+		self._lock = threading.Lock()
+
+	def _create_manager(self, parallel):
+		config = Mock()
+		config.get_bool.return_value = parallel
+		config.get.return_value = 4
+		return tuned.units.Manager(Mock(), Mock(), 0, Mock(), config)
+
+	def _instance(self, name, resources, verify_result = True):
+		return DummyInstance(name, resources, self._log, self._lock, verify_result)
+
+	def test_dependencies(self):
+		instances = [
+			self._instance("cpu", ["cpu"]),
+			self._instance("net", ["net"]),
+			self._instance("cpu2", ["cpu"]),
+			self._instance("sysctl", ["sysctl"]),
+			self._instance("vm", ["vm", "sysctl"]),
+			self._instance("script", ["script", "*"]),
+			self._instance("disk", ["disk"]),
+		]
+		deps = tuned.units.Manager._get_dependencies(instances)
+		self.assertEqual(deps, [set(), set(), set([0]), set(), set([3]),
+			set([0, 1, 2, 3, 4]), set([5])])
+
+	def test_serial_order(self):
+		manager = self._create_manager(False)
+		manager._instances.extend([self._instance("a", ["a"]),
+			self._instance("b", ["b"])])
+		manager.start_tuning()
+		manager.stop_tuning()
+		self.assertEqual([(op, name) for (op, name, thread) in self._log],
+			[("apply", "a"), ("apply", "b"), ("unapply", "b"), ("unapply", "a")])
+
+	def test_parallel_keeps_order_of_dependent_instances(self):
+		manager = self._create_manager(True)
+		names = ["cpu1", "net1", "cpu2", "net2", "cpu3"]
+		for name in names:
+			manager._instances.append(self._instance(name, [name[:3]]))
+		manager.start_tuning()
+		applied = [name for (op, name, thread) in self._log]
+		self.assertEqual(sorted(applied), sorted(names))
+		cpus = [name for name in applied if name.startswith("cpu")]
+		self.assertEqual(cpus, ["cpu1", "cpu2", "cpu3"])
+
+		del self._log[:]
+		manager.stop_tuning()
+		unapplied = [name for (op, name, thread) in self._log]
+		nets = [name for name in unapplied if name.startswith("net")]
+		self.assertEqual(nets, ["net2", "net1"])
+
+	def test_parallel_verify(self):
+		manager = self._create_manager(True)
+		manager._instances.extend([self._instance("a", ["a"]),
+			self._instance("b", ["b"], verify_result = False)])
+		self.assertFalse(manager.verify_tuning(False))
+
+		manager = self._create_manager(True)
+		manager._instances.extend([self._instance("a", ["a"]),
+			self._instance("b", ["b"])])
+		self.assertTrue(manager.verify_tuning(False))
+
+	def test_parallel_exception_does_not_stop_others(self):
+		manager = self._create_manager(True)
+		broken = self._instance("broken", ["broken"])
+		broken.apply_tuning = Mock(side_effect = RuntimeError("failure"))
+		manager._instances.extend([broken, self._instance("a", ["a"])])
+		manager.start_tuning()
+		self.assertEqual([name for (op, name, thread) in self._log], ["a"])
+
+	def test_switch_tuning(self):
+		plugins = {}
+		def create_plugin(name):
+			plugins[name] = SwitchPlugin(name, self._log, name != "vm")
+			return plugins[name]
+		manager = self._create_manager(False)
+		manager._plugins_repository.create.side_effect = create_plugin
+		manager.create({
+			"sysctl": Unit("sysctl", {"a": "1"}),
+			"vm": Unit("vm", {"x": "1"}),
+			"disk": Unit("disk", {"d": "1"}),
+			"audio": Unit("audio", {}),
+		})
+		manager.start_tuning()
+		manager.hold_tuning()
+		self.assertTrue(manager.tuning_held)
+		disk = manager.instances[2]
+
+		del self._log[:]
+		manager.switch_tuning({
+			"sysctl": Unit("sysctl", {"a": "2"}),
+			"vm": Unit("vm", {"x": "2"}),
+			"disk": Unit("disk", {"d": "1"}),
+			"net": Unit("net", {}),
+		})
+		self.assertFalse(manager.tuning_held)
+		self.assertEqual(self._log, [("unapply", "audio"), ("destroy", "audio"),
+			("update", "sysctl"), ("unapply", "vm"), ("destroy", "vm"),
+			("cleanup", "audio"), ("apply", "vm"), ("apply", "net")])
+		self.assertEqual([instance.name for instance in manager.instances],
+			["sysctl", "vm", "disk", "net"])
+		self.assertIs(manager.instances[2], disk)
+		self.assertEqual([plugin.name for plugin in manager.plugins],
+			["sysctl", "vm", "disk", "net"])
+
+	def test_update_due(self):
+		manager = self._create_manager(False)
+		fast = self._instance("fast", ["fast"])
+		fast.update_interval = 2
+		slow = self._instance("slow", ["slow"])
+		static = self._instance("static", ["static"])
+		static.has_dynamic_tuning = False
+		manager._instances.extend([fast, slow, static])
+		other = OtherMonitor(self._log)
+		other.update_interval = 5
+		manager._monitors_repository.monitors = [DummyMonitor(self._log),
+			DummyMonitor(self._log), other]
+
+		updates = []
+		for now in range(0, 11):
+			del self._log[:]
+			manager.update_due(10, now)
+			updates.append([name for (op, name, thread) in self._log])
+		self.assertEqual(updates, [[], [],
+			["DummyMonitor", "fast"], [], ["DummyMonitor", "fast"], ["OtherMonitor"],
+			["DummyMonitor", "fast"], [], ["DummyMonitor", "fast"], [],
+			["DummyMonitor", "OtherMonitor", "fast", "slow"]])
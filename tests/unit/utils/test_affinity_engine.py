@@ -0,0 +1,151 @@
+import unittest
+import errno
+import threading
+import re
+from tuned.utils.affinity_engine import AffinityEngine, TaskFilter
+
+class FakeTask(object):
+	def __init__(self, pid, comm, cgroups = "", starttime = 0):
+		self.pid = pid
+		self._comm = comm
+		self.cgroups = cgroups
+		self._starttime = starttime
+
+	@property
+	def comm(self):
+		if self._comm is None:
+			raise OSError(errno.ESRCH, "No such process")
+		return self._comm
+
+	@property
+	def starttime(self):
+		if self._starttime is None:
+			raise OSError(errno.ESRCH, "No such process")
+		return self._starttime
+
+class FakeScanner(object):
+	def __init__(self, processes):
+		self._processes = processes
+
+	def processes(self):
+		return [process for (process, threads) in self._processes]
+
+	def threads(self, process):
+		return dict(self._processes)[process]
+
+class FakeScheduler(object):
+	def __init__(self, affinities):
+		self.affinities = affinities
+		self.calls = 0
+		self.threads = set()
+		self._lock = threading.Lock()
+
+	def get_affinity(self, pid):
+		if pid not in self.affinities:
+			raise OSError(errno.ESRCH, "No such process")
+		if self.affinities[pid] is None:
+			raise OSError(errno.EPERM, "Operation not permitted")
+		return set(self.affinities[pid])
+
+	def set_affinity(self, pid, affinity):
+		with self._lock:
+			self.calls += 1
+			self.threads.add(threading.current_thread().name)
+		if pid == 13:
+			del self.affinities[pid]
+			raise OSError(errno.ESRCH, "No such process")
+		if pid == 14:
+			raise OSError(errno.EINVAL, "Invalid argument")
+		self.affinities[pid] = list(affinity)
+
+class TaskFilterTestCase(unittest.TestCase):
+	def test_match(self):
+		task_filter = TaskFilter("^k|^s", "^kworker", ":/daemons\\b")
+		self.assertTrue(task_filter.match(FakeTask(1, "sshd")))
+		self.assertTrue(task_filter.match(FakeTask(2, "kthreadd")))
+		self.assertFalse(task_filter.match(FakeTask(3, "kworker/0:1")))
+		self.assertFalse(task_filter.match(FakeTask(4, "bash")))
+		self.assertFalse(task_filter.match(FakeTask(5, "sshd", "1:cpuset:/daemons")))
+
+	def test_vanished_task(self):
+		# the comm of a vanished task is empty
+		self.assertTrue(TaskFilter().match(FakeTask(1, None)))
+		self.assertFalse(TaskFilter("a").match(FakeTask(1, None)))
+
+	def test_select(self):
+		init = FakeTask(1, "init")
+		worker = FakeTask(2, "worker")
+		scanner = FakeScanner([
+			(init, [FakeTask(3, "init-thread"), FakeTask(4, "other")]),
+			(worker, [FakeTask(5, "init-worker")]),
+		])
+		tasks = TaskFilter("init").select(scanner)
+		self.assertEqual([task.pid for task in tasks], [1, 3])
+
+	def test_select_fields(self):
+		init = FakeTask(1, "init")
+		scanner = FakeScanner([
+			(init, [FakeTask(2, "init-thread"), FakeTask(3, "init-gone", starttime = None)]),
+			(FakeTask(4, "initrd", starttime = None), [FakeTask(5, "initrd-thread")]),
+		])
+		tasks = TaskFilter("init").select(scanner, ["starttime"])
+		self.assertEqual([task.pid for task in tasks], [1, 2, 5])
+
+	def test_invalid_expression(self):
+		self.assertRaises(re.error, TaskFilter, "(")
+
+class AffinityEngineTestCase(unittest.TestCase):
+	def test_apply(self):
+		scheduler = FakeScheduler({10: [0, 1, 2, 3], 11: [2, 3], 12: [0]})
+		engine = AffinityEngine(scheduler.get_affinity, scheduler.set_affinity)
+		(originals, stats) = engine.apply([10, 11, 12, 20], [0, 1])
+		self.assertEqual(scheduler.affinities, {10: [0, 1], 11: [0, 1], 12: [0, 1]})
+		self.assertEqual(originals, {10: set([0, 1, 2, 3]), 11: set([2, 3]), 12: set([0])})
+		self.assertEqual((stats.changed, stats.skipped, stats.vanished), (3, 0, 1))
+		self.assertEqual(stats.errors, [])
+
+	def test_intersect(self):
+		scheduler = FakeScheduler({10: [0, 1, 2, 3], 11: [2, 3], 12: [1]})
+		engine = AffinityEngine(scheduler.get_affinity, scheduler.set_affinity)
+		(originals, stats) = engine.apply([10, 11, 12], [1, 2], intersect = True)
+		self.assertEqual(scheduler.affinities, {10: [1, 2], 11: [2], 12: [1]})
+		self.assertEqual(sorted(originals), [10, 11])
+		self.assertEqual((stats.changed, stats.skipped, stats.vanished), (2, 1, 0))
+		self.assertEqual(scheduler.calls, 2)
+
+	def test_errors(self):
+		scheduler = FakeScheduler({10: None, 13: [0], 14: [0], 15: [0]})
+		engine = AffinityEngine(scheduler.get_affinity, scheduler.set_affinity)
+		(originals, stats) = engine.apply([10, 13, 14, 15], [1])
+		self.assertEqual(list(originals), [15])
+		self.assertEqual((stats.changed, stats.skipped, stats.vanished), (1, 0, 1))
+		self.assertEqual([(pid, affinity) for (pid, affinity, e) in stats.errors],
+				[(10, None), (14, [1])])
+		self.assertEqual(str(stats), "1 changed, 0 skipped, 1 vanished, 2 failed")
+
+	def test_restore(self):
+		scheduler = FakeScheduler({10: [0, 1, 2, 3], 11: [2, 3]})
+		engine = AffinityEngine(scheduler.get_affinity, scheduler.set_affinity)
+		(originals, stats) = engine.apply([10, 11], [0])
+		stats = engine.restore(originals)
+		self.assertEqual(scheduler.affinities, {10: [0, 1, 2, 3], 11: [2, 3]})
+		self.assertEqual(stats.changed, 2)
+
+	def test_workers(self):
+		pids = list(range(100, 200))
+		scheduler = FakeScheduler(dict([(pid, [0, 1]) for pid in pids]))
+		engine = AffinityEngine(scheduler.get_affinity, scheduler.set_affinity,
+				workers = 4, batch_size = 10)
+		(originals, stats) = engine.apply(pids, [1])
+		self.assertEqual(stats.changed, 100)
+		self.assertEqual(len(originals), 100)
+		self.assertTrue(all(affinity == [1] for affinity in scheduler.affinities.values()))
+		self.assertNotIn(threading.current_thread().name, scheduler.threads)
+
+	def test_string_affinity(self):
+		cgroups = {10: "/", 11: "group"}
+		engine = AffinityEngine(lambda pid: cgroups[pid], cgroups.__setitem__)
+		(originals, stats) = engine.apply([10, 11], "group", intersect = True)
+		self.assertEqual(originals, {10: "/"})
+		self.assertEqual(cgroups, {10: "group", 11: "group"})
+		self.assertEqual(stats.skipped, 1)
@@ -0,0 +1,52 @@
+import unittest
+import pickle
+from tuned.utils.cpuset import CpuSet
+
+class CpuSetTestCase(unittest.TestCase):
+	def test_parse(self):
+		self.assertEqual(CpuSet.parse("4-8,^6,0xf00,,!10-11").to_list(), [4,5,7,8,9])
+		self.assertEqual(CpuSet.parse("0x1,0000,0001").to_list(), [0,32])
+		self.assertEqual(CpuSet.parse("'0-3'").to_list(), [0,1,2,3])
+		self.assertEqual(CpuSet.parse(["1", "2-4"]).to_list(), [1,2,3,4])
+		self.assertEqual(CpuSet.parse("5-3").to_list(), [])
+		self.assertEqual(CpuSet.parse("1,2,3-x").to_list(), [])
+		self.assertEqual(CpuSet.parse("1,^x").to_list(), [])
+
+	def test_large(self):
+		cpus = CpuSet.parse("0-1023,^1-1022")
+		self.assertEqual(cpus.to_list(), [0,1023])
+		self.assertEqual(len(CpuSet.parse("0-1023")), 1024)
+
+	def test_format(self):
+		cpus = CpuSet([0,1,3,4,5,6,8,9,32])
+		self.assertEqual(cpus.pack(), ["0-1","3-6","8-9","32"])
+		self.assertEqual(str(cpus), "0-1,3-6,8-9,32")
+		self.assertEqual(CpuSet.parse("1-3,5,32").to_hex(), "00000001,0000002e")
+		self.assertEqual(CpuSet().to_hex(), "00000000")
+		self.assertEqual(CpuSet.from_hex("0xf").mask, 0xf)
+		self.assertRaises(ValueError, CpuSet.from_hex, "0xz")
+
+	def test_set_operations(self):
+		a = CpuSet([0,1,2,3])
+		b = CpuSet([2,3,4])
+		self.assertEqual(a | b, CpuSet(range(5)))
+		self.assertEqual(a & b, CpuSet([2,3]))
+		self.assertEqual(a - b, CpuSet([0,1]))
+		self.assertEqual(a ^ b, CpuSet([0,1,4]))
+		self.assertEqual(a & [3,7], CpuSet([3]))
+		self.assertTrue(CpuSet([1,2]) <= a)
+		self.assertTrue(CpuSet([1,2]) < a)
+		self.assertFalse(a < a)
+		self.assertTrue(a.isdisjoint([5,6]))
+		self.assertIn(3, a)
+		self.assertNotIn(4, a)
+		self.assertEqual(len(a), 4)
+		self.assertEqual(list(b), [2,3,4])
+		self.assertFalse(CpuSet())
+
+	def test_immutable(self):
+		a = CpuSet([1])
+		self.assertRaises(AttributeError, setattr, a, "_mask", 3)
+		self.assertEqual(hash(a), hash(CpuSet.from_mask(2)))
+		self.assertEqual(len(set([a, CpuSet([1])])), 1)
+		self.assertEqual(pickle.loads(pickle.dumps(a)), a)
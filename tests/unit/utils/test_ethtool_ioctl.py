@@ -0,0 +1,148 @@
+import unittest
+import errno
+import struct
+
+from tuned.utils.ethtool_ioctl import Ethtool, EthtoolUnavailable
+import tuned.utils.ethtool_ioctl as ethtool_ioctl
+
+FEATURES = ["tx-scatter-gather", "tx-checksum-ipv4", "tx-checksum-ipv6",
+		"tx-tcp-segmentation", "tx-tcp6-segmentation", "rx-gro", "rx-lro",
+		"rx-checksum", "tx-nocache-copy"]
+
+class FakeNic(object):
+	"""Responder to the ethtool commands of one device."""
+	def __init__(self):
+		self.calls = []
+		self.coalesce = [0] * 22
+		self.coalesce[0] = 3
+		self.pause = [1, 1, 0]
+		self.ring = [4096, 0, 0, 4096, 1024, 0, 0, 1024]
+		self.channels = [0, 0, 1, 63, 0, 0, 1, 8]
+		# rx-lro is not available, tx-nocache-copy never changed
+		self.available = (1 << len(FEATURES)) - 1 - (1 << 6)
+		self.never_changed = 1 << 8
+		self.active = 0b10100111
+		self.wolopts = 1 << 5
+		self.link = [0x102f | (1 << 6), 0x2f | (1 << 6), 1000, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0]
+
+	def __call__(self, device, data):
+		cmd = struct.unpack_from("=I", data)[0]
+		self.calls.append(cmd)
+		if device != "eth0":
+			raise OSError(errno.ENODEV, "No such device")
+		if cmd == ethtool_ioctl.ETHTOOL_GCOALESCE:
+			struct.pack_into("=22I", data, 4, *self.coalesce)
+		elif cmd == ethtool_ioctl.ETHTOOL_SCOALESCE:
+			self.coalesce = list(struct.unpack_from("=22I", data, 4))
+		elif cmd == ethtool_ioctl.ETHTOOL_GPAUSEPARAM:
+			struct.pack_into("=3I", data, 4, *self.pause)
+		elif cmd == ethtool_ioctl.ETHTOOL_GRINGPARAM:
+			struct.pack_into("=8I", data, 4, *self.ring)
+		elif cmd == ethtool_ioctl.ETHTOOL_SRINGPARAM:
+			self.ring = list(struct.unpack_from("=8I", data, 4))
+		elif cmd == ethtool_ioctl.ETHTOOL_GCHANNELS:
+			struct.pack_into("=8I", data, 4, *self.channels)
+		elif cmd == ethtool_ioctl.ETHTOOL_GSSET_INFO:
+			struct.pack_into("=QI", data, 8, 1 << ethtool_ioctl.ETH_SS_FEATURES, len(FEATURES))
+		elif cmd == ethtool_ioctl.ETHTOOL_GSTRINGS:
+			for (i, name) in enumerate(FEATURES):
+				struct.pack_into("=32s", data, 12 + 32 * i, name.encode())
+		elif cmd == ethtool_ioctl.ETHTOOL_GFEATURES:
+			struct.pack_into("=4I", data, 8, self.available, self.active, self.active, self.never_changed)
+		elif cmd == ethtool_ioctl.ETHTOOL_SFEATURES:
+			(valid, requested) = struct.unpack_from("=2I", data, 8)
+			valid &= self.available
+			self.active = (self.active & ~valid) | (requested & valid)
+		elif cmd == ethtool_ioctl.ETHTOOL_GWOL:
+			struct.pack_into("=II", data, 4, 0xff, self.wolopts)
+		elif cmd == ethtool_ioctl.ETHTOOL_SWOL:
+			self.wolopts = struct.unpack_from("=I", data, 8)[0]
+		elif cmd == ethtool_ioctl.ETHTOOL_GSET:
+			struct.pack_into(ethtool_ioctl._LINK_FORMAT, data, 0, cmd, *self.link)
+		elif cmd == ethtool_ioctl.ETHTOOL_SSET:
+			self.link = list(struct.unpack(ethtool_ioctl._LINK_FORMAT, bytes(data))[1:])
+		elif cmd == ethtool_ioctl.ETHTOOL_GLINK:
+			struct.pack_into("=I", data, 4, 1)
+		else:
+			raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+		return 0
+
+class EthtoolTestCase(unittest.TestCase):
+	def setUp(self):
+		self._nic = FakeNic()
+		self._ethtool = Ethtool(self._nic)
+
+	def test_coalesce(self):
+		coalesce = self._ethtool.get("coalesce", "eth0")
+		self.assertEqual(coalesce["rx-usecs"], "3")
+		self.assertEqual(coalesce["adaptive-rx"], "off")
+		self.assertEqual(len(coalesce), 22)
+		self._ethtool.set("coalesce", "eth0", {"adaptive-rx": "on", "tx-usecs": "16"})
+		self.assertEqual(self._nic.coalesce[0], 3)
+		self.assertEqual(self._nic.coalesce[4], 16)
+		self.assertEqual(self._nic.coalesce[9], 1)
+		self.assertRaises(ValueError, self._ethtool.set, "coalesce", "eth0", {"rx-usecs": "x"})
+
+	def test_pause(self):
+		self.assertEqual(self._ethtool.get("pause", "eth0"),
+				{"autoneg": "on", "rx": "on", "tx": "off"})
+		# not implemented by the driver
+		self.assertRaises(OSError, self._ethtool.set, "pause", "eth0", {"tx": "on"})
+
+	def test_ring_channels(self):
+		self.assertEqual(self._ethtool.get("ring", "eth0"),
+				{"rx": "1024", "rx-mini": "n/a", "rx-jumbo": "n/a", "tx": "1024"})
+		self.assertEqual(self._ethtool.get("channels", "eth0"),
+				{"rx": "n/a", "tx": "n/a", "other": "1", "combined": "8"})
+		self._ethtool.set("ring", "eth0", {"rx": "2048"})
+		self.assertEqual(self._nic.ring[4:], [2048, 0, 0, 1024])
+
+	def test_features(self):
+		features = self._ethtool.get("features", "eth0")
+		self.assertEqual(features["gro"], "on")
+		self.assertEqual(features["rx-gro"], "on")
+		self.assertEqual(features["tso"], "off")
+		self.assertEqual(features["tx"], "on")
+		self.assertEqual(features["rx"], "on")
+		self.assertNotIn("lro", features)
+		self.assertNotIn("tx-nocache-copy", features)
+		self._ethtool.set("features", "eth0", {"tso": "on", "gro": "off"})
+		features = self._ethtool.get("features", "eth0")
+		self.assertEqual(features["tso"], "on")
+		self.assertEqual(features["tx-tcp6-segmentation"], "on")
+		self.assertEqual(features["gro"], "off")
+		self.assertRaises(ValueError, self._ethtool.set, "features", "eth0", {"foo": "on"})
+
+	def test_feature_names_cached(self):
+		self._ethtool.get("features", "eth0")
+		self._ethtool.get("features", "eth0")
+		self.assertEqual(self._nic.calls.count(ethtool_ioctl.ETHTOOL_GSTRINGS), 1)
+
+	def test_wol(self):
+		self.assertEqual(self._ethtool.get("wol", "eth0"), "g")
+		self._ethtool.set("wol", "eth0", "d")
+		self.assertEqual(self._ethtool.get("wol", "eth0"), "d")
+		self._ethtool.set("wol", "eth0", "pg")
+		self.assertEqual(self._nic.wolopts, 0x21)
+
+	def test_link(self):
+		link = self._ethtool.get_link("eth0")
+		self.assertEqual(link["speed"], 1000)
+		self.assertTrue(link["full_duplex"])
+		self.assertTrue(link["autoneg"])
+		self.assertTrue(link["link"])
+		self.assertTrue(link["supported_autoneg"])
+		self.assertIn((10000, True), link["supported_modes"])
+		self.assertNotIn((10000, True), link["advertised_modes"])
+		self._ethtool.set_link("eth0", advertising = 0x00f)
+		self.assertEqual(self._ethtool.get_link("eth0")["advertised_modes"],
+				[(10, False), (10, True), (100, False), (100, True)])
+
+	def test_missing_device(self):
+		self.assertIsNone(self._ethtool.get("coalesce", "eth1"))
+
+	def test_unavailable(self):
+		def ioctl(device, data):
+			raise OSError(errno.ENOTTY, "Inappropriate ioctl for device")
+		ethtool = Ethtool(ioctl)
+		self.assertRaises(EthtoolUnavailable, ethtool.get, "ring", "eth0")
@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+import shutil
+import os
+from tuned.utils.file_reader import FileReader
+
+class FileReaderTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		self._reader = FileReader(max_files = 2, buffer_size = 4)
+
+	def tearDown(self):
+		self._reader.close_all()
+		shutil.rmtree(self._tmp_dir)
+
+	def _write(self, name, data):
+		path = os.path.join(self._tmp_dir, name)
+		with open(path, "w") as f:
+			f.write(data)
+		return path
+
+	def test_reread(self):
+		path = self._write("a", "1\n")
+		self.assertEqual(self._reader.read(path), "1\n")
+		self._write("a", "a longer content\n")
+		self.assertEqual(self._reader.read(path), "a longer content\n")
+		self.assertEqual(len(self._reader), 1)
+		self.assertEqual(self._reader.stats()[path][0], 2)
+
+	def test_replaced_file(self):
+		path = self._write("a", "old")
+		self.assertEqual(self._reader.read(path), "old")
+		os.unlink(path)
+		self._write("a", "new")
+		# the open descriptor still reads the removed file
+		self.assertEqual(self._reader.read(path), "old")
+		self._reader.close_prefix(self._tmp_dir)
+		self.assertEqual(self._reader.read(path), "new")
+
+	def test_missing_file(self):
+		with self.assertRaises(OSError):
+			self._reader.read(os.path.join(self._tmp_dir, "missing"))
+		self.assertEqual(len(self._reader), 0)
+
+	def test_eviction(self):
+		paths = [self._write(name, name) for name in ["a", "b", "c"]]
+		for path in paths:
+			self._reader.read(path)
+		self.assertEqual(sorted(self._reader.stats()), paths[1:])
+		self._reader.read(paths[1])
+		self._reader.read(paths[0])
+		self.assertEqual(sorted(self._reader.stats()), paths[:2])
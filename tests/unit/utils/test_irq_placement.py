@@ -0,0 +1,100 @@
+import unittest
+import tempfile
+import shutil
+import os
+from tuned.utils.cpuset import CpuSet
+from tuned.utils.irq_placement import IrqPlacement, Irq, PLACEMENT_INTERSECT, \
+		PLACEMENT_NUMA, PLACEMENT_SPREAD
+
+INTERRUPTS = """           CPU0       CPU1       CPU2       CPU3
+  0:         22          0          0          0   IO-APIC   2-edge      timer
+ 24:          1          0          0          0   PCI-MSI 524288-edge      eth0-rx-0
+ 25:          0          1          0          0   PCI-MSI 524289-edge      eth0-rx-1
+ 26:          0          0          5          0   PCI-MSI 524290-edge      eth0-rx-2
+ 30:          0          0          0          1   IO-APIC  16-fasteoi   ahci
+NMI:          0          0          0          0   Non-maskable interrupts
+"""
+
+class IrqPlacementTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		self._proc_dir = os.path.join(self._tmp_dir, "proc")
+		self._sys_dir = os.path.join(self._tmp_dir, "sys")
+		self._write(os.path.join(self._proc_dir, "interrupts"), INTERRUPTS)
+		for irq in [0, 24, 25, 26, 30]:
+			self._write(os.path.join(self._proc_dir, "irq", str(irq), "smp_affinity_list"), "0-3\n")
+		devices = os.path.join(self._sys_dir, "bus", "pci", "devices")
+		nic = os.path.join(devices, "0000:3b:00.0")
+		for irq in [24, 25, 26]:
+			self._write(os.path.join(nic, "msi_irqs", str(irq)), "msix\n")
+		self._write(os.path.join(nic, "numa_node"), "1\n")
+		self._write(os.path.join(nic, "local_cpulist"), "2-3\n")
+		sata = os.path.join(devices, "0000:00:17.0")
+		self._write(os.path.join(sata, "irq"), "30\n")
+		self._write(os.path.join(sata, "numa_node"), "-1\n")
+		self._placement = IrqPlacement(self._proc_dir, self._sys_dir)
+
+	def tearDown(self):
+		shutil.rmtree(self._tmp_dir)
+
+	def _write(self, path, data):
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(data)
+
+	def test_read(self):
+		irqs = self._placement.read()
+		self.assertEqual(sorted(irqs), [0, 24, 25, 26, 30])
+		self.assertEqual(irqs[24].description, "PCI-MSI 524288-edge eth0-rx-0")
+		self.assertEqual(irqs[24].affinity, CpuSet([0, 1, 2, 3]))
+		self.assertEqual(irqs[24].device, "0000:3b:00.0")
+		self.assertEqual(irqs[24].numa_node, 1)
+		self.assertEqual(irqs[24].local_cpus, CpuSet([2, 3]))
+		self.assertEqual(irqs[30].device, "0000:00:17.0")
+		self.assertIsNone(irqs[30].numa_node)
+		self.assertIsNone(irqs[0].device)
+
+	def test_unreadable_affinity(self):
+		os.unlink(os.path.join(self._proc_dir, "irq", "0", "smp_affinity_list"))
+		irqs = self._placement.read()
+		self.assertIsNone(irqs[0].affinity)
+		self.assertNotIn(0, IrqPlacement.plan(irqs, [0, 1]))
+
+	def test_plan_intersect(self):
+		irqs = self._placement.read()
+		irqs[0].affinity = CpuSet([2])
+		targets = IrqPlacement.plan(irqs, [0, 1, 3], PLACEMENT_INTERSECT)
+		self.assertEqual(targets[0], CpuSet([0, 1, 3]))
+		self.assertEqual(targets[24], CpuSet([0, 1, 3]))
+
+	def test_plan_numa(self):
+		irqs = self._placement.read()
+		targets = IrqPlacement.plan(irqs, [0, 1, 3], PLACEMENT_NUMA)
+		self.assertEqual(targets[24], CpuSet([3]))
+		self.assertEqual(targets[26], CpuSet([3]))
+		# no local CPUs known
+		self.assertEqual(targets[30], CpuSet([0, 1, 3]))
+		# not a PCI device
+		self.assertEqual(targets[0], CpuSet([0, 1, 3]))
+
+	def test_plan_numa_no_local_housekeeping(self):
+		irqs = self._placement.read()
+		targets = IrqPlacement.plan(irqs, [0, 1], PLACEMENT_NUMA)
+		self.assertEqual(targets[24], CpuSet([0, 1]))
+
+	def test_plan_spread(self):
+		irqs = self._placement.read()
+		targets = IrqPlacement.plan(irqs, [0, 1, 2, 3], PLACEMENT_SPREAD)
+		self.assertEqual([targets[irq] for irq in [24, 25, 26]],
+				[CpuSet([2]), CpuSet([3]), CpuSet([2])])
+		# single vector devices get all local CPUs
+		self.assertEqual(targets[30], CpuSet([0, 1, 2, 3]))
+
+	def test_plan_spread_devices(self):
+		irqs = dict((irq, Irq(irq, affinity = CpuSet([0, 1, 2, 3]), device = device,
+				local_cpus = CpuSet([0, 1, 2, 3])))
+				for (irq, device) in [(1, "a"), (2, "a"), (3, "b"), (4, "b")])
+		targets = IrqPlacement.plan(irqs, [0, 1, 2, 3], PLACEMENT_SPREAD)
+		# the second device continues on the next CPUs
+		self.assertEqual([targets[irq].to_list() for irq in [1, 2, 3, 4]], [[0], [1], [2], [3]])
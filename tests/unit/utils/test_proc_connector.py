@@ -0,0 +1,49 @@
+import unittest
+import socket
+import struct
+
+from tuned.utils.proc_connector import ProcConnector
+import tuned.utils.proc_connector as proc_connector
+
+def _proc_event(what, data, idx = proc_connector.CN_IDX_PROC):
+	event = struct.pack("=IIQ", what, 0, 0) + data
+	cn_msg = struct.pack("=IIIIHH", idx, proc_connector.CN_VAL_PROC,
+		0, 0, len(event), 0)
+	length = 16 + len(cn_msg) + len(event)
+	msg = struct.pack("=IHHII", length, proc_connector.NLMSG_DONE, 0, 0, 0) \
+		+ cn_msg + event
+	return msg + b"\0" * (((length + 3) & ~3) - length)
+
+class ProcConnectorTestCase(unittest.TestCase):
+	def setUp(self):
+		(self._sender, receiver) = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+		self._connector = ProcConnector(sock = receiver)
+
+	def tearDown(self):
+		self._connector.close()
+		self._sender.close()
+
+	def test_read_events(self):
+		self._sender.send(_proc_event(proc_connector.PROC_EVENT_EXEC,
+			struct.pack("=ii", 100, 100)))
+		self._sender.send(_proc_event(proc_connector.PROC_EVENT_FORK,
+			struct.pack("=iiii", 100, 100, 101, 101))
+			+ _proc_event(proc_connector.PROC_EVENT_COMM,
+			struct.pack("=ii", 102, 100) + b"worker\0".ljust(16, b"\0")))
+		self._sender.send(_proc_event(proc_connector.PROC_EVENT_EXIT,
+			struct.pack("=iiII", 100, 100, 0, 17)))
+		self.assertEqual(self._connector.read_events(), [
+			(proc_connector.PROC_EVENT_EXEC, 100),
+			(proc_connector.PROC_EVENT_FORK, 101),
+			(proc_connector.PROC_EVENT_COMM, 102),
+			(proc_connector.PROC_EVENT_EXIT, 100)])
+		self.assertEqual(self._connector.read_events(), [])
+
+	def test_ignored_messages(self):
+		self._sender.send(_proc_event(proc_connector.PROC_EVENT_NONE,
+			struct.pack("=I", 0)))
+		self._sender.send(_proc_event(proc_connector.PROC_EVENT_EXEC,
+			struct.pack("=ii", 100, 100), idx = 2))
+		self._sender.send(_proc_event(proc_connector.PROC_EVENT_EXEC,
+			struct.pack("=i", 100)))
+		self.assertEqual(self._connector.read_events(), [])
@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import shutil
+import os
+from tuned.utils.proc_scanner import ProcScanner
+
+STAT = "%d (%s) %s 1 %d %d 0 -1 %d 0 0 0 0 0 0 0 0 20 0 1 0 %d 0 0\n"
+
+class ProcScannerTestCase(unittest.TestCase):
+	def setUp(self):
+		self._tmp_dir = tempfile.mkdtemp()
+		self._scanner = ProcScanner(self._tmp_dir)
+
+	def tearDown(self):
+		shutil.rmtree(self._tmp_dir)
+
+	def _add_task(self, path, pid, comm, flags = 0, starttime = 100, state = "S", cmdline = None, cgroup = None):
+		os.makedirs(path)
+		with open(os.path.join(path, "stat"), "w") as f:
+			f.write(STAT % (pid, comm, state, pid, pid, flags, starttime))
+		if cmdline is not None:
+			with open(os.path.join(path, "cmdline"), "w") as f:
+				f.write(cmdline)
+		if cgroup is not None:
+			with open(os.path.join(path, "cgroup"), "w") as f:
+				f.write(cgroup)
+
+	def _add_process(self, pid, comm, threads = [], **kwargs):
+		path = os.path.join(self._tmp_dir, str(pid))
+		self._add_task(path, pid, comm, **kwargs)
+		for tid in [pid] + threads:
+			self._add_task(os.path.join(path, "task", str(tid)), tid, comm)
+
+	def test_processes(self):
+		self._add_process(1, "systemd", cmdline = "/sbin/init\0")
+		self._add_process(20, "worker", threads = [21, 22], cmdline = "worker\0-v\0")
+		pids = sorted([task.pid for task in self._scanner.processes()])
+		self.assertEqual(pids, [1, 20])
+		pids = sorted([task.pid for task in self._scanner.tasks()])
+		self.assertEqual(pids, [1, 20, 21, 22])
+
+	def test_threads_share_cmdline(self):
+		self._add_process(20, "worker", threads = [21], cmdline = "worker\0-v\0")
+		process = self._scanner.task(20)
+		threads = self._scanner.threads(process)
+		self.assertEqual([thread.pid for thread in threads], [21])
+		self.assertEqual(process.cmdline, "worker -v")
+		# the command line is read only once per thread group
+		os.unlink(os.path.join(self._tmp_dir, "20", "cmdline"))
+		self.assertEqual(threads[0].cmdline, "worker -v")
+
+	def test_stat(self):
+		self._add_process(30, "a (b) c", flags = 0x04200040, starttime = 12345, state = "R")
+		task = self._scanner.task(30)
+		self.assertEqual(task.comm, "a (b) c")
+		self.assertEqual(task.state, "R")
+		self.assertEqual(task.starttime, 12345)
+		self.assertTrue(task.is_kthread)
+		self.assertTrue(task.is_bound_to_cpu)
+
+	def test_kthread_cmdline(self):
+		self._add_process(2, "kthreadd", flags = 0x00200040, cmdline = "")
+		task = self._scanner.task(2)
+		self.assertEqual(task.cmdline, "kthreadd")
+		self.assertTrue(task.is_kthread)
+		self.assertFalse(task.is_bound_to_cpu)
+
+	def test_cgroups(self):
+		self._add_process(40, "sshd", cgroup = "1:cpu:/a\n0::/system.slice/sshd.service\n")
+		task = self._scanner.task(40)
+		self.assertEqual(task.cgroups, "0::/system.slice/sshd.service,1:cpu:/a")
+
+	def test_vanished_task(self):
+		task = self._scanner.task(50)
+		self.assertRaises(OSError, lambda: task.comm)
+		self.assertEqual(self._scanner.threads(task), [])
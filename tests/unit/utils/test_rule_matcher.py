@@ -0,0 +1,36 @@
+import re
+import unittest
+
+from tuned.utils.rule_matcher import RuleMatcher
+
+class RuleMatcherTestCase(unittest.TestCase):
+	def test_last_matching_rule_wins(self):
+		matcher = RuleMatcher([(r"\[.*\]$", "kthreads"),
+			(r"\[(ksoftirqd|watchdog).*\]", "softirq"),
+			(r"^/usr/bin/(\w+) ", "binaries"),
+			(r"\[watchdog.*\]", "watchdog")])
+		self.assertEqual(len(matcher), 4)
+		self.assertIsNotNone(matcher._combined)
+		self.assertEqual(matcher.match("[kworker/0:1]"), "kthreads")
+		self.assertEqual(matcher.match("[ksoftirqd/1]"), "softirq")
+		self.assertEqual(matcher.match("[watchdog/1]"), "watchdog")
+		self.assertEqual(matcher.match("/usr/bin/python3 -s tuned"), "binaries")
+		self.assertIsNone(matcher.match("/sbin/init"))
+		self.assertIsNone(matcher.match(None))
+
+	def test_same_as_sequential_search(self):
+		rules = [(r"a", 1), (r"b$", 2), (r"^c", 3), (r"(x)\1", 4), (r"(?:d|e)+f", 5)]
+		matcher = RuleMatcher(rules)
+		for s in ["a", "ab", "cab", "ca", "xx", "axxb", "deef", "def c", "", "zzz"]:
+			expected = None
+			for regex, value in rules:
+				if re.search(regex, s):
+					expected = value
+			self.assertEqual(matcher.match(s), expected, s)
+
+	def test_invalid_and_uncombinable_rules(self):
+		matcher = RuleMatcher([(r"(", 1), (r"foo", 2), (r"(?i)bar", 3)])
+		self.assertEqual(len(matcher), 2)
+		self.assertEqual(matcher.match("foo"), 2)
+		self.assertEqual(matcher.match("foo BAR"), 3)
+		self.assertIsNone(RuleMatcher([]).match("foo"))
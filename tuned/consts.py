@@ -13,6 +13,8 @@ DBUS_INTERFACE = "com.redhat.tuned.control"
 DBUS_OBJECT = "/Tuned"
 DEFAULT_PROFILE = "balanced"
 DEFAULT_STORAGE_FILE = "/run/tuned/save.pickle"
+DEFAULT_STORAGE_DIR = "/run/tuned/storage"
+DEFAULT_STORAGE_JOURNAL = "/run/tuned/storage.journal"
 LOAD_DIRECTORIES = ["/usr/lib/tuned", "/etc/tuned"]
 PERSISTENT_STORAGE_DIR = "/var/lib/tuned"
 PLUGIN_MAIN_UNIT_NAME = "main"
@@ -77,8 +79,18 @@ LOG_FILE_MAXBYTES = 100 * 1000
 LOG_FILE = "/var/log/tuned/tuned.log"
 PID_FILE = "/run/tuned/tuned.pid"
 SYSTEM_RELEASE_FILE = "/etc/system-release-cpe"
+# number of samples kept by monitors for each device
+MONITOR_HISTORY_SIZE = 64
+# maximal number of files kept open for repeated reads
+FILE_READER_MAX_FILES = 1024
+# interval (in seconds) of dropping the exited tasks from the scheduler rollback database
+SCHED_ROLLBACK_CLEANUP_INTERVAL = 60
+# number of tasks which affinity is set by one worker at a time
+AFFINITY_BATCH_SIZE = 256
 # prefix for functions plugins
 FUNCTION_PREFIX = "function_"
+# maximal number of cached parsed strings and results of pure functions
+FUNCTIONS_CACHE_SIZE = 4096
 # prefix for exported environment variables when calling scripts
 ENV_PREFIX = "TUNED_"
 
@@ -102,6 +114,13 @@ CFG_LOG_FILE_COUNT = "log_file_count"
 CFG_LOG_FILE_MAX_SIZE = "log_file_max_size"
 CFG_UNAME_STRING = "uname_string"
 CFG_CPUINFO_STRING = "cpuinfo_string"
+CFG_PARALLEL_TUNING = "parallel_tuning"
+CFG_PARALLEL_TUNING_WORKERS = "parallel_tuning_workers"
+CFG_INCREMENTAL_PROFILE_SWITCH = "incremental_profile_switch"
+CFG_STORAGE_PROVIDER = "storage_provider"
+CFG_STORAGE_FLUSH_INTERVAL = "storage_flush_interval"
+CFG_DISK_MONITOR_DEVICE_CLASSES = "disk_monitor_device_classes"
+CFG_PROCESS_AFFINITY_WORKERS = "process_affinity_workers"
 
 # no_daemon mode
 CFG_DEF_DAEMON = True
@@ -131,6 +150,25 @@ CFG_DEF_LOG_FILE_COUNT = 2
 CFG_FUNC_LOG_FILE_COUNT = "getint"
 # default log file max size
 CFG_DEF_LOG_FILE_MAX_SIZE = 1024 * 1024
+# apply, verify and unapply independent instances in parallel
+CFG_DEF_PARALLEL_TUNING = False
+CFG_FUNC_PARALLEL_TUNING = "getboolean"
+# maximal number of worker threads used by the parallel tuning
+CFG_DEF_PARALLEL_TUNING_WORKERS = 4
+CFG_FUNC_PARALLEL_TUNING_WORKERS = "getint"
+# apply only the differences between profiles when switching them
+CFG_DEF_INCREMENTAL_PROFILE_SWITCH = False
+CFG_FUNC_INCREMENTAL_PROFILE_SWITCH = "getboolean"
+# where to keep the data needed for the roll back of the tuning
+CFG_DEF_STORAGE_PROVIDER = "pickle"
+# delay (in seconds) of writing the changed storage data to the disk
+CFG_DEF_STORAGE_FLUSH_INTERVAL = 1
+CFG_FUNC_STORAGE_FLUSH_INTERVAL = "getint"
+# classes of the disks watched by the disk monitor
+CFG_DEF_DISK_MONITOR_DEVICE_CLASSES = "ata, scsi, nvme, virtio, xen, dm, md"
+# number of worker threads setting the affinity of processes
+CFG_DEF_PROCESS_AFFINITY_WORKERS = 1
+CFG_FUNC_PROCESS_AFFINITY_WORKERS = "getint"
 
 PATH_CPU_DMA_LATENCY = "/dev/cpu_dma_latency"
 
@@ -23,16 +23,16 @@ class Application(object):
 		log.info("TuneD: %s, kernel: %s" % (tuned.version.TUNED_VERSION_STR, os.uname()[2]))
 		self._dbus_exporter = None
 
-		storage_provider = storage.PickleProvider()
-		storage_factory = storage.Factory(storage_provider)
-
 		self.config = GlobalConfig() if config is None else config
+		self._storage_provider = self._create_storage_provider()
+		storage_factory = storage.Factory(self._storage_provider)
+
 		if self.config.get_bool(consts.CFG_DYNAMIC_TUNING):
 			log.info("dynamic tuning is enabled (can be overridden in plugins)")
 		else:
 			log.info("dynamic tuning is globally disabled")
 
-		monitors_repository = monitors.Repository()
+		monitors_repository = monitors.Repository(self.config)
 		udev_buffer_size = self.config.get_size("udev_buffer_size", consts.CFG_DEF_UDEV_BUFFER_SIZE)
 		hardware_inventory = hardware.Inventory(buffer_size=udev_buffer_size)
 		device_matcher = hardware.DeviceMatcher()
@@ -59,6 +59,22 @@ class Application(object):
 
 		self._pid_file = None
 
+	def _create_storage_provider(self):
+		provider = self.config.get(consts.CFG_STORAGE_PROVIDER, consts.CFG_DEF_STORAGE_PROVIDER)
+		flush_interval = int(self.config.get(consts.CFG_STORAGE_FLUSH_INTERVAL, consts.CFG_DEF_STORAGE_FLUSH_INTERVAL))
+		if provider == "write_behind":
+			storage_provider = storage.WriteBehindProvider(flush_interval=flush_interval)
+		elif provider == "journal":
+			storage_provider = storage.JournalProvider(flush_interval=flush_interval)
+		else:
+			if provider != "pickle":
+				log.error("Unknown storage provider '%s', using 'pickle'." % provider)
+			storage_provider = storage.PickleProvider()
+		if storage_provider.persistent:
+			# data of the previous run for the crash recovery
+			storage_provider.load()
+		return storage_provider
+
 	def _handle_signal(self, signal_number, handler):
 		def handler_wrapper(_signal_number, _frame):
 			if signal_number == _signal_number:
@@ -201,6 +217,7 @@ class Application(object):
 		result = self._controller.run()
 		if self.config.get_bool(consts.CFG_DAEMON, consts.CFG_DEF_DAEMON):
 			exports.stop()
+		self._storage_provider.shutdown()
 
 		if self._pid_file is not None:
 			self._delete_pid_file()
@@ -21,12 +21,14 @@ class Daemon(object):
 		self._update_interval = int(consts.CFG_DEF_UPDATE_INTERVAL)
 		self._dynamic_tuning = consts.CFG_DEF_DYNAMIC_TUNING
 		self._recommend_command = True
+		self._incremental_profile_switch = consts.CFG_DEF_INCREMENTAL_PROFILE_SWITCH
 		if config is not None:
 			self._daemon = config.get_bool(consts.CFG_DAEMON, consts.CFG_DEF_DAEMON)
 			self._sleep_interval = int(config.get(consts.CFG_SLEEP_INTERVAL, consts.CFG_DEF_SLEEP_INTERVAL))
 			self._update_interval = int(config.get(consts.CFG_UPDATE_INTERVAL, consts.CFG_DEF_UPDATE_INTERVAL))
 			self._dynamic_tuning = config.get_bool(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING)
 			self._recommend_command = config.get_bool(consts.CFG_RECOMMEND_COMMAND, consts.CFG_DEF_RECOMMEND_COMMAND)
+			self._incremental_profile_switch = config.get_bool(consts.CFG_INCREMENTAL_PROFILE_SWITCH, consts.CFG_DEF_INCREMENTAL_PROFILE_SWITCH)
 		self._application = application
 		if self._sleep_interval <= 0:
 			self._sleep_interval = int(consts.CFG_DEF_SLEEP_INTERVAL)
@@ -190,11 +192,17 @@ class Daemon(object):
 		if self._profile is None:
 			raise TunedException("Cannot start the daemon without setting a profile.")
 
-		self._unit_manager.create(self._profile.units)
-		self._save_active_profile(" ".join(self._active_profiles),
-					  self._manual)
-		self._save_post_loaded_profile(self._post_loaded_profile)
-		self._unit_manager.start_tuning()
+		if self._unit_manager.tuning_held:
+			self._save_active_profile(" ".join(self._active_profiles),
+						  self._manual)
+			self._save_post_loaded_profile(self._post_loaded_profile)
+			self._unit_manager.switch_tuning(self._profile.units)
+		else:
+			self._unit_manager.create(self._profile.units)
+			self._save_active_profile(" ".join(self._active_profiles),
+						  self._manual)
+			self._save_post_loaded_profile(self._post_loaded_profile)
+			self._unit_manager.start_tuning()
 		self._profile_applied.set()
 		log.info("static tuning from profile '%s' applied" % self._profile.name)
 		if self._daemon:
@@ -208,16 +216,12 @@ class Daemon(object):
 			# and e.g. DBus control will not work. The polling interval of 1 seconds (which is
 			# the default) is still much better than 50 ms polling with unpatched interpreter.
 			# For more details see TuneD rhbz#917587.
-			_sleep_cnt = self._sleep_cycles
+			# monitors and instances can have their own update intervals,
+			# only the due ones are updated, see Manager.update_due
+			update_interval = self._sleep_cycles * self._sleep_interval
 			while not self._cmd.wait(self._terminate, self._sleep_interval):
 				if self._dynamic_tuning:
-					_sleep_cnt -= 1
-					if _sleep_cnt <= 0:
-						_sleep_cnt = self._sleep_cycles
-						log.debug("updating monitors")
-						self._unit_manager.update_monitors()
-						log.debug("performing tunings")
-						self._unit_manager.update_tuning()
+					self._unit_manager.update_due(update_interval)
 
 		self._profile_applied.clear()
 
@@ -227,6 +231,14 @@ class Daemon(object):
 		while not self._cmd.wait(self._not_used, self._sleep_interval) and i < 3:
 			i += 1
 
+		# keep the tuning applied, only the differences between the profiles
+		# will be applied when the daemon is started with the new profile
+		if self._terminate_profile_switch.is_set() and self._daemon \
+				and self._incremental_profile_switch:
+			log.info("keeping the tuning applied during the profile switch")
+			self._unit_manager.hold_tuning()
+			return
+
 		# if terminating due to profile switch
 		if self._terminate_profile_switch.is_set():
 			full_rollback = True
@@ -311,11 +323,18 @@ class Daemon(object):
 	def is_running(self):
 		return self._thread is not None and self._thread.is_alive()
 
+	def _release_held_tuning(self):
+		if self._unit_manager.tuning_held:
+			log.info("rolling back the tuning held from the previous profile")
+			self._unit_manager.stop_tuning(True)
+			self._unit_manager.destroy_all()
+
 	def start(self):
 		if self.is_running():
 			return False
 
 		if self._profile is None:
+			self._release_held_tuning()
 			return False
 
 		log.info("starting tuning")
@@ -350,6 +369,7 @@ class Daemon(object):
 	# profile_switch is helper telling plugins whether the stop is due to profile switch
 	def stop(self, profile_switch = False):
 		if not self.is_running():
+			self._release_held_tuning()
 			return False
 		log.info("stopping tuning")
 		if profile_switch:
@@ -1,2 +1,3 @@
 from .base import *
+from .history import *
 from .repository import *
@@ -1,4 +1,7 @@
 import tuned.logs
+import tuned.consts as consts
+from .history import History
+from tuned.utils.file_reader import FileReader
 log = tuned.logs.get()
 
 __all__ = ["Monitor"]
@@ -13,8 +16,20 @@ class Monitor(object):
 	Following methods require reimplementation:
 	  - _init_available_devices(cls)
 	  - update(cls)
+
+	The update should store the data of each device by _store_sample,
+	which keeps the last sample as the device load and appends it to
+	the ring-buffer history of the device.
 	"""
 
+	# number of samples kept in the history of each device
+	_history_size = consts.MONITOR_HISTORY_SIZE
+	# update interval in seconds, None to update the monitor as often as
+	# the most frequently updated instance with dynamic tuning
+	update_interval = None
+	# files read on every update are kept open, shared by all monitors
+	_reader = FileReader()
+
 	# class properties
 
 	@classmethod
@@ -24,12 +39,21 @@ class Monitor(object):
 		cls._available_devices = set()
 		cls._updating_devices = set()
 		cls._load = {}
+		cls._history = {}
 
 		cls._init_available_devices()
 		assert isinstance(cls._available_devices, set)
 		cls._class_initialized = True
 		log.debug("available devices: %s" % ", ".join(cls._available_devices))
 
+	@classmethod
+	def _configure(cls, global_cfg):
+		"""
+		Read the monitor options from the global configuration, called
+		before the monitor is created.
+		"""
+		pass
+
 	@classmethod
 	def _init_available_devices(cls):
 		raise NotImplementedError()
@@ -40,6 +64,14 @@ class Monitor(object):
 		log.debug("available devices updated to: %s"
 				% ", ".join(cls._available_devices))
 
+	@classmethod
+	def _update_available_device(cls, device):
+		"""
+		Update availability of a single device, monitors able to check
+		one device cheaply should reimplement it.
+		"""
+		cls._update_available_devices()
+
 	@classmethod
 	def get_available_devices(cls):
 		return cls._available_devices
@@ -48,6 +80,26 @@ class Monitor(object):
 	def update(cls):
 		raise NotImplementedError()
 
+	@classmethod
+	def _store_sample(cls, device, load, sample = None, timestamp = None):
+		"""
+		Store the load of the device, 'sample' is the numeric form of
+		the load for the history, the load itself is used if not given.
+		"""
+		cls._load[device] = load
+		if sample is None:
+			sample = load
+		typecode = "q" if all(isinstance(v, int) for v in sample) else "d"
+		history = cls._history.get(device)
+		if history is None or history.width != len(sample) or history.typecode != typecode:
+			history = History(len(sample), cls._history_size, typecode)
+			cls._history[device] = history
+		history.append(sample, timestamp)
+
+	@classmethod
+	def _read_file(cls, path):
+		return cls._reader.read(path)
+
 	@classmethod
 	def _register_instance(cls, instance):
 		cls._instances.add(instance)
@@ -71,9 +123,11 @@ class Monitor(object):
 	# instance properties
 
 	def __init__(self, devices = None):
-		if not hasattr(self, "_class_initialized"):
+		# every monitor class keeps its own state, it must not be
+		# inherited from an (initialized) parent class
+		if "_class_initialized" not in type(self).__dict__:
 			self._init_class()
-			assert hasattr(self, "_class_initialized")
+			assert "_class_initialized" in type(self).__dict__
 
 		self._register_instance(self)
 
@@ -106,7 +160,7 @@ class Monitor(object):
 
 	def add_device(self, device):
 		assert (isinstance(device,str) or isinstance(device,unicode))
-		self._update_available_devices()
+		self._update_available_device(device)
 		if device in self._available_devices:
 			self._devices.add(device)
 			self._updating_devices.add(device)
@@ -122,3 +176,6 @@ class Monitor(object):
 
 	def get_device_load(self, device):
 		return self._load.get(device, None)
+
+	def get_device_history(self, device):
+		return self._history.get(device, None)
@@ -0,0 +1,141 @@
+from array import array
+import math
+import time
+
+__all__ = ["History"]
+
+class History(object):
+	"""
+	Fixed-size ring buffer of the samples of one device.
+
+	A sample is a sequence of 'width' numbers (usually counters) taken at
+	a time. The samples are stored in flat arrays, the oldest sample is
+	overwritten when the buffer is full. Deltas are computed between
+	consecutive samples, the peak (maximal) delta of each column is
+	tracked over the whole lifetime of the history. Counters should use
+	the "q" typecode, doubles cannot hold large counters exactly.
+	"""
+
+	def __init__(self, width, size, typecode = "d"):
+		if width < 1 or size < 2:
+			raise ValueError("invalid history dimensions")
+		self._width = width
+		self._size = size
+		self._typecode = typecode
+		self._values = array(typecode, [0]) * (width * size)
+		self._times = array("d", [0.0]) * size
+		self._peak = array(typecode, [0]) * width
+		self._count = 0
+		self._next = 0
+
+	@property
+	def typecode(self):
+		return self._typecode
+
+	@property
+	def width(self):
+		return self._width
+
+	@property
+	def size(self):
+		return self._size
+
+	def __len__(self):
+		return min(self._count, self._size)
+
+	def append(self, sample, timestamp = None):
+		if len(sample) != self._width:
+			raise ValueError("sample has %d values, expected %d" % (len(sample), self._width))
+		if timestamp is None:
+			timestamp = time.monotonic()
+		offset = self._next * self._width
+		self._values[offset:offset + self._width] = array(self._typecode, sample)
+		self._times[self._next] = timestamp
+		self._next = (self._next + 1) % self._size
+		self._count += 1
+		if self._count > 1:
+			for (column, value) in enumerate(self.delta()):
+				if value > self._peak[column]:
+					self._peak[column] = value
+
+	def _index(self, age):
+		if age < 0 or age >= len(self):
+			raise IndexError("sample age out of range")
+		return (self._next - 1 - age) % self._size
+
+	def sample(self, age = 0):
+		"""
+		Return the sample taken 'age' samples ago, 0 is the last one.
+		"""
+		offset = self._index(age) * self._width
+		return self._values[offset:offset + self._width].tolist()
+
+	def timestamp(self, age = 0):
+		return self._times[self._index(age)]
+
+	def value(self, column, age = 0):
+		return self._values[self._index(age) * self._width + column]
+
+	def delta(self, age = 0):
+		"""
+		Return the differences between the sample taken 'age' samples ago
+		and the sample before it.
+		"""
+		new = self._index(age) * self._width
+		old = self._index(age + 1) * self._width
+		return [self._values[new + i] - self._values[old + i] for i in range(self._width)]
+
+	def column_deltas(self, column, window = None):
+		"""
+		Return the deltas of the column in the last 'window' intervals
+		(all buffered intervals by default), the newest delta is the last.
+		"""
+		count = len(self) - 1
+		if window is not None:
+			count = min(count, window)
+		values = self._values
+		width = self._width
+		deltas = []
+		for age in range(count - 1, -1, -1):
+			new = self._index(age) * width + column
+			old = self._index(age + 1) * width + column
+			deltas.append(values[new] - values[old])
+		return deltas
+
+	def rate(self, column, age = 0):
+		"""
+		Return the change of the column per second.
+		"""
+		interval = self._times[self._index(age)] - self._times[self._index(age + 1)]
+		if interval <= 0:
+			return 0.0
+		return (self.value(column, age) - self.value(column, age + 1)) / interval
+
+	def peak(self):
+		"""
+		Return the maximal deltas of all columns seen so far.
+		"""
+		return self._peak.tolist()
+
+	def ewma(self, column, alpha, window = None):
+		"""
+		Return the exponentially weighted moving average of the column
+		deltas, 'alpha' is the weight of the newest delta.
+		"""
+		deltas = self.column_deltas(column, window)
+		if not deltas:
+			return 0.0
+		avg = float(deltas[0])
+		for value in deltas[1:]:
+			avg += alpha * (value - avg)
+		return avg
+
+	def percentile(self, column, percent, window = None):
+		"""
+		Return the percentile of the column deltas (nearest rank method).
+		"""
+		deltas = sorted(self.column_deltas(column, window))
+		if not deltas:
+			return 0.0
+		rank = int(math.ceil(percent / 100.0 * len(deltas)))
+		return deltas[max(0, min(rank - 1, len(deltas) - 1))]
@@ -0,0 +1,88 @@
+import tuned.monitors
+import tuned.logs
+
+log = tuned.logs.get()
+
+class CpuMonitor(tuned.monitors.Monitor):
+	"""
+	Per-CPU utilization monitor.
+
+	All CPUs are parsed from one read of /proc/stat. The devices are named
+	cpuN as the devices of the cpu plugin. The load of a device is the list
+	[busy, idle, irq, softirq] of the times (in USER_HZ units) the CPU
+	spent since boot, busy includes irq and softirq, idle includes iowait.
+	The deltas over the last update interval are available from the
+	history, see utilization().
+	"""
+
+	_stat_file = "/proc/stat"
+	# /proc/stat columns: user nice system idle iowait irq softirq steal
+	_busy_columns = [0, 1, 2, 5, 6, 7]
+	_idle_columns = [3, 4]
+	_irq_column = 5
+	_softirq_column = 6
+	BUSY = 0
+	IDLE = 1
+	IRQ = 2
+	SOFTIRQ = 3
+
+	@classmethod
+	def _read_stat(cls):
+		return cls._read_file(cls._stat_file)
+
+	@classmethod
+	def _parse_stat(cls, data, devices = None):
+		stats = {}
+		for line in data.splitlines():
+			# the aggregate line is "cpu ..."
+			if not line.startswith("cpu") or line.startswith("cpu "):
+				continue
+			fields = line.split()
+			if devices is not None and fields[0] not in devices:
+				continue
+			try:
+				values = [int(v) for v in fields[1:9]]
+			except ValueError:
+				continue
+			# older kernels have no steal column
+			values.extend([0] * (8 - len(values)))
+			stats[fields[0]] = [sum(values[i] for i in cls._busy_columns),
+					sum(values[i] for i in cls._idle_columns),
+					values[cls._irq_column], values[cls._softirq_column]]
+		return stats
+
+	@classmethod
+	def _init_available_devices(cls):
+		try:
+			cls._available_devices = set(cls._parse_stat(cls._read_stat()))
+		except (IOError, OSError) as e:
+			log.error("unable to read '%s': %s" % (cls._stat_file, e))
+			cls._available_devices = set()
+
+	@classmethod
+	def update(cls):
+		if not cls._updating_devices:
+			return
+		stats = cls._parse_stat(cls._read_stat(), cls._updating_devices)
+		for device, load in stats.items():
+			cls._store_sample(device, load)
+
+	def utilization(self, device):
+		"""
+		Return the fractions (0.0 - 1.0) of the last update interval the CPU
+		was busy, idle, handling irqs and softirqs as a dictionary, None if
+		there are not enough samples.
+		"""
+		history = self.get_device_history(device)
+		if history is None or len(history) < 2:
+			return None
+		delta = history.delta()
+		total = delta[self.BUSY] + delta[self.IDLE]
+		if total <= 0:
+			return None
+		return {
+			"busy": float(delta[self.BUSY]) / total,
+			"idle": float(delta[self.IDLE]) / total,
+			"irq": float(delta[self.IRQ]) / total,
+			"softirq": float(delta[self.SOFTIRQ]) / total,
+		}
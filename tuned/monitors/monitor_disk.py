@@ -1,35 +1,110 @@
 import tuned.monitors
+import tuned.logs
+import tuned.consts as consts
 import os
+import re
+
+log = tuned.logs.get()
 
 class DiskMonitor(tuned.monitors.Monitor):
+	"""
+	Disk I/O monitor.
+
+	The statistics of all disks are parsed from one read of /proc/diskstats.
+	The load of a device is the list of its I/O statistics fields (see the
+	kernel documentation of /proc/diskstats), the discard and flush fields
+	of newer kernels are set to 0 on older kernels, so the number of the
+	fields is always the same. Only disks of the configured device classes
+	are monitored.
+	"""
 
-	_supported_vendors = ["ATA", "SCSI"]
+	_diskstats_file = "/proc/diskstats"
+	_sys_block_dir = "/sys/block"
+	# 11 fields up to kernel 4.17, discard fields added in 4.18, flush in 5.5
+	_stat_fields = 17
+	_device_classes = set(re.split(r"[\s,]+", consts.CFG_DEF_DISK_MONITOR_DEVICE_CLASSES))
+
+	@classmethod
+	def _configure(cls, global_cfg):
+		classes = global_cfg.get(consts.CFG_DISK_MONITOR_DEVICE_CLASSES, consts.CFG_DEF_DISK_MONITOR_DEVICE_CLASSES)
+		cls._device_classes = set(c for c in re.split(r"[\s,]+", str(classes).lower()) if c)
 
 	@classmethod
 	def _init_available_devices(cls):
-		block_devices = os.listdir("/sys/block")
+		try:
+			block_devices = os.listdir(cls._sys_block_dir)
+		except OSError:
+			block_devices = []
 		available = set(filter(cls._is_device_supported, block_devices))
 		cls._available_devices = available
 
 		for d in available:
-			cls._load[d] = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+			cls._load.setdefault(d, [0] * cls._stat_fields)
 
 	@classmethod
-	def _is_device_supported(cls, device):
-		vendor_file = "/sys/block/%s/device/vendor" % device
+	def _update_available_device(cls, device):
+		if cls._is_device_supported(device):
+			cls._available_devices.add(device)
+			cls._load.setdefault(device, [0] * cls._stat_fields)
+		else:
+			cls._available_devices.discard(device)
+
+	@classmethod
+	def _read_attr(cls, device, attr):
 		try:
-			vendor = open(vendor_file).read().strip()
+			with open(os.path.join(cls._sys_block_dir, device, attr)) as f:
+				return f.read().strip()
 		except IOError:
-			return False
+			return None
 
-		return vendor in cls._supported_vendors
+	@classmethod
+	def _device_class(cls, device):
+		# removable media, e.g. USB sticks and card readers
+		if cls._read_attr(device, "removable") == "1":
+			return None
+		if device.startswith("dm-"):
+			return "dm"
+		if device.startswith("md"):
+			return "md"
+		if device.startswith("nvme"):
+			return "nvme"
+		if device.startswith("vd"):
+			return "virtio"
+		if device.startswith("xvd"):
+			return "xen"
+		# only the disks of the sd driver (SCSI and ATA disks), not e.g.
+		# the optical drives of the sr driver
+		driver = os.path.join(cls._sys_block_dir, device, "device", "driver")
+		if not os.path.islink(driver) or os.path.basename(os.readlink(driver)) != "sd":
+			return None
+		return "ata" if cls._read_attr(device, "device/vendor") == "ATA" else "scsi"
 
 	@classmethod
-	def update(cls):
-		for device in cls._updating_devices:
-			cls._update_disk(device)
+	def _is_device_supported(cls, device):
+		if not os.path.isdir(os.path.join(cls._sys_block_dir, device)):
+			return False
+		return cls._device_class(device) in cls._device_classes
+
+	@classmethod
+	def _parse_diskstats(cls, data, devices):
+		stats = {}
+		for line in data.splitlines():
+			fields = line.split()
+			# major, minor, name and at least 11 statistics fields
+			if len(fields) < 14 or fields[2] not in devices:
+				continue
+			try:
+				load = [int(v) for v in fields[3:3 + cls._stat_fields]]
+			except ValueError:
+				continue
+			load.extend([0] * (cls._stat_fields - len(load)))
+			stats[fields[2]] = load
+		return stats
 
 	@classmethod
-	def _update_disk(cls, dev):
-		with open("/sys/block/" + dev + "/stat") as statfile:
-			cls._load[dev] = list(map(int, statfile.read().split()))
+	def update(cls):
+		if not cls._updating_devices:
+			return
+		stats = cls._parse_diskstats(cls._read_file(cls._diskstats_file), cls._updating_devices)
+		for device, load in stats.items():
+			cls._store_sample(device, load)
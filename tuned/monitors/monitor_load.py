@@ -7,6 +7,6 @@ class LoadMonitor(tuned.monitors.Monitor):
 
 	@classmethod
 	def update(cls):
-		with open("/proc/loadavg") as statfile:
-			data = statfile.read().split()
-		cls._load["system"] = float(data[0])
+		data = cls._read_file("/proc/loadavg").split()
+		load = float(data[0])
+		cls._store_sample("system", load, [load])
@@ -1,22 +1,58 @@
 import tuned.monitors
+import tuned.logs
 import os
 import re
 from tuned.utils.nettool import ethcard
 
+log = tuned.logs.get()
+
 class NetMonitor(tuned.monitors.Monitor):
+	"""
+	Network traffic monitor.
+
+	Physical interfaces are enumerated from /sys/class/net, the counters of
+	all interfaces are collected from one read of /proc/net/dev. The load
+	of a device is [rx_bytes, rx_packets, tx_bytes, tx_packets].
+	"""
+
+	_net_class_dir = "/sys/class/net"
+	_net_dev_file = "/proc/net/dev"
+	# indexes of the load fields in the /proc/net/dev lines (without the name)
+	_net_dev_fields = [0, 1, 8, 9]
+
+	@classmethod
+	def _is_physical(cls, dev):
+		try:
+			link = os.readlink(os.path.join(cls._net_class_dir, dev))
+		except OSError:
+			return False
+		return "/virtual/net/" not in link
 
 	@classmethod
 	def _init_available_devices(cls):
-		available = []
-		for root, dirs, files in os.walk("/sys/devices"):
-			if root.endswith("/net") and not root.endswith("/virtual/net"):
-				available += dirs
-		
-		cls._available_devices = set(available)
+		try:
+			devices = os.listdir(cls._net_class_dir)
+		except OSError:
+			devices = []
+		available = set(filter(cls._is_physical, devices))
+		cls._available_devices = available
 
 		for dev in available:
 			#max_speed = cls._calcspeed(ethcard(dev).get_max_speed())
-			cls._load[dev] = ['0', '0', '0', '0']
+			cls._load.setdefault(dev, [0, 0, 0, 0])
+
+	@classmethod
+	def _update_available_device(cls, device):
+		if cls._is_physical(device):
+			cls._available_devices.add(device)
+			cls._load.setdefault(device, [0, 0, 0, 0])
+		else:
+			cls._available_devices.discard(device)
+
+	def remove_device(self, device):
+		super(NetMonitor, self).remove_device(device)
+		if device not in self._updating_devices:
+			self._reader.close_prefix(os.path.join(self._net_class_dir, device) + "/")
 
 	@classmethod
 	def _calcspeed(cls, speed):
@@ -29,12 +65,39 @@ class NetMonitor(tuned.monitors.Monitor):
 	@classmethod
 	def _updateStat(cls, dev):
 		files = ["rx_bytes", "rx_packets", "tx_bytes", "tx_packets"]
-		for i,f in enumerate(files):
-			with open("/sys/class/net/" + dev + "/statistics/" + f) as statfile:
-				cls._load[dev][i] = statfile.read().strip()
+		load = []
+		for f in files:
+			load.append(int(cls._read_file(os.path.join(cls._net_class_dir, dev, "statistics", f)).strip()))
+		cls._store_sample(dev, load)
+
+	@classmethod
+	def _parse_net_dev(cls, data):
+		stats = {}
+		# the first two lines are headers
+		for line in data.splitlines()[2:]:
+			(dev, sep, counters) = line.partition(":")
+			if not sep:
+				continue
+			fields = counters.split()
+			try:
+				stats[dev.strip()] = [int(fields[i]) for i in cls._net_dev_fields]
+			except (IndexError, ValueError):
+				continue
+		return stats
 
 	@classmethod
 	def update(cls):
+		try:
+			stats = cls._parse_net_dev(cls._read_file(cls._net_dev_file))
+		except (IOError, OSError) as e:
+			log.debug("unable to read '%s': %s" % (cls._net_dev_file, e))
+			stats = {}
 		for device in cls._updating_devices:
-			cls._updateStat(device)
-
+			load = stats.get(device)
+			if load is not None:
+				cls._store_sample(device, load)
+			else:
+				try:
+					cls._updateStat(device)
+				except (IOError, OSError):
+					pass
@@ -0,0 +1,131 @@
+import tuned.monitors
+import tuned.logs
+import errno
+import os
+import select
+
+log = tuned.logs.get()
+
+class PressureMonitor(tuned.monitors.Monitor):
+	"""
+	Pressure Stall Information (PSI) monitor.
+
+	The devices are the resources with pressure files in /proc/pressure
+	(cpu, memory, io). The load of a device is a dictionary with the "some"
+	and "full" lines of the file, each of them is a dictionary with the
+	avg10, avg60 and avg300 percentages and the total stall time in
+	microseconds. The history keeps the [some, full] totals, so the
+	percentage of the time stalled during the last update interval is
+	100 * rate / 1000000, see stall_percent().
+
+	PSI triggers can be registered by add_trigger(), the kernel notifies
+	when the stall time in a window exceeds the given threshold, see
+	poll_triggers().
+	"""
+
+	_pressure_dir = "/proc/pressure"
+	_resources = ["cpu", "memory", "io"]
+	_kinds = ["some", "full"]
+
+	@classmethod
+	def _init_available_devices(cls):
+		available = set()
+		for resource in cls._resources:
+			try:
+				cls._read_pressure(resource)
+			except (IOError, OSError) as e:
+				# the files exist but cannot be read if PSI is disabled
+				# by the psi=0 kernel parameter
+				if e.errno != errno.ENOENT:
+					log.debug("pressure of '%s' is not available: %s" % (resource, e))
+				continue
+			available.add(resource)
+		cls._available_devices = available
+
+	@classmethod
+	def _parse_pressure(cls, data):
+		load = {}
+		for line in data.splitlines():
+			fields = line.split()
+			if not fields or fields[0] not in cls._kinds:
+				continue
+			values = {}
+			for field in fields[1:]:
+				(name, sep, value) = field.partition("=")
+				if name == "total":
+					values[name] = int(value)
+				else:
+					values[name] = float(value)
+			load[fields[0]] = values
+		return load
+
+	@classmethod
+	def _read_pressure(cls, resource):
+		return cls._parse_pressure(cls._read_file(os.path.join(cls._pressure_dir, resource)))
+
+	@classmethod
+	def update(cls):
+		for device in cls._updating_devices:
+			load = cls._read_pressure(device)
+			sample = [load.get(kind, {}).get("total", 0) for kind in cls._kinds]
+			cls._store_sample(device, load, sample)
+
+	def __init__(self, devices = None):
+		self._triggers = {}
+		super(PressureMonitor, self).__init__(devices)
+
+	def cleanup(self):
+		for fd in list(self._triggers):
+			self.remove_trigger(fd)
+		super(PressureMonitor, self).cleanup()
+
+	def stall_percent(self, device, kind = "some"):
+		"""
+		Return the percentage of the time some (or all, if kind is "full")
+		tasks were stalled on the resource during the last update interval.
+		The avg10 value is returned if there are not enough samples.
+		"""
+		history = self.get_device_history(device)
+		if history is not None and len(history) >= 2:
+			return min(100.0, history.rate(self._kinds.index(kind)) / 10000.0)
+		load = self.get_device_load(device)
+		if load is None:
+			return None
+		return load.get(kind, {}).get("avg10")
+
+	def add_trigger(self, device, kind, stall_us, window_us):
+		"""
+		Register a PSI trigger, returns its file descriptor. The trigger
+		fires when the tasks are stalled for more than stall_us in
+		window_us. Requires the CAP_SYS_RESOURCE capability.
+		"""
+		fd = os.open(os.path.join(self._pressure_dir, device), os.O_RDWR | os.O_NONBLOCK)
+		try:
+			os.write(fd, ("%s %d %d\0" % (kind, stall_us, window_us)).encode())
+		except OSError:
+			os.close(fd)
+			raise
+		self._triggers[fd] = device
+		return fd
+
+	def remove_trigger(self, fd):
+		if self._triggers.pop(fd, None) is not None:
+			os.close(fd)
+
+	def poll_triggers(self, timeout = 0):
+		"""
+		Return the set of devices which triggers fired, waits up to
+		timeout seconds.
+		"""
+		if not self._triggers:
+			return set()
+		poller = select.poll()
+		for fd in self._triggers:
+			poller.register(fd, select.POLLPRI)
+		fired = set()
+		for (fd, event) in poller.poll(timeout * 1000):
+			if event & select.POLLPRI:
+				fired.add(self._triggers[fd])
+			elif event & (select.POLLERR | select.POLLNVAL):
+				log.debug("PSI trigger of '%s' is no longer valid" % self._triggers[fd])
+		return fired
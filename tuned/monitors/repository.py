@@ -8,9 +8,10 @@ __all__ = ["Repository"]
 
 class Repository(PluginLoader):
 
-	def __init__(self):
+	def __init__(self, global_cfg = None):
 		super(Repository, self).__init__()
 		self._monitors = set()
+		self._global_cfg = global_cfg
 
 	@property
 	def monitors(self):
@@ -24,6 +25,8 @@ class Repository(PluginLoader):
 	def create(self, plugin_name, devices):
 		log.debug("creating monitor %s" % plugin_name)
 		monitor_cls = self.load_plugin(plugin_name)
+		if self._global_cfg is not None:
+			monitor_cls._configure(self._global_cfg)
 		monitor_instance = monitor_cls(devices)
 		self._monitors.add(monitor_instance)
 		return monitor_instance
@@ -82,6 +82,18 @@ class Plugin(object):
         restored."""
         return []
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        """System resources shared with other plugins. Instances which share
+        a resource are never tuned concurrently, the "*" resource serializes
+        the plugin with all other plugins."""
+        return ["*"]
+
+    def get_tuning_resources(self, instance):
+        """Resources touched by tuning of the instance, used by the unit
+        manager to order the parallel tuning."""
+        return set([self.name] + self._get_tuning_resources())
+
     def _get_effective_options(self, options):
         """Merge provided options with plugin default options."""
         # TODO: _has_dynamic_options is a hack
@@ -109,13 +121,32 @@ class Plugin(object):
         if name in self._instances:
             raise Exception("Plugin instance with name '%s' already exists." % name)
 
+        options = dict(options)
+        update_interval = self._parse_update_interval(name, options.pop("update_interval", None))
         effective_options = self._get_effective_options(options)
         instance = self._instance_factory.create(self, name, devices_expression, devices_udev_regex,
                                                  script_pre, script_post, effective_options)
+        instance.update_interval = update_interval
         self._instances[name] = instance
 
         return instance
 
+    def _parse_update_interval(self, name, value):
+        """The update_interval option is common to all plugins, it sets
+        the interval of the dynamic tuning of the instance."""
+        if value is None:
+            return None
+        if self._variables is not None:
+            value = self._variables.expand(value)
+        try:
+            interval = float(value)
+        except ValueError:
+            interval = 0
+        if interval <= 0:
+            log.error("instance %s: invalid update_interval '%s', using the default" % (name, value))
+            return None
+        return interval
+
     def destroy_instance(self, instance):
         """Destroy existing instance."""
         if instance._plugin != self:
@@ -328,6 +359,38 @@ class Plugin(object):
             self._call_device_script(instance, instance.script_pre, "unapply", instance.processed_devices,
                                      full_rollback=full_rollback)
 
+    def expand_options(self, options):
+        """Expand variables in the option values."""
+        return dict((name, self._variables.expand(value))
+                    for name, value in options.items())
+
+    def instance_update_options(self, instance, options, old_options):
+        """
+        Switch the instance to new options, only the changed options are
+        unapplied and applied again. The old_options are the expanded options
+        the instance was applied with. Returns False if it is not possible
+        and the instance has to be recreated.
+        """
+        options = dict(options)
+        instance.update_interval = self._parse_update_interval(instance.name, options.pop("update_interval", None))
+        options = self._get_effective_options(options)
+        new_options = self.expand_options(options)
+        changed = set(name for name in set(new_options) | set(old_options)
+                      if new_options.get(name) != old_options.get(name))
+        if len(changed) == 0:
+            instance._options = options
+            return True
+        if not instance.active or not instance.has_static_tuning:
+            return False
+        # scripts are called around the whole tuning of the instance
+        if instance.script_pre is not None or instance.script_post is not None:
+            return False
+        if not self._instance_update_static(instance, options, changed):
+            return False
+        log.info("instance %s: updated options %s"
+                 % (instance.name, ", ".join(sorted(changed))))
+        return True
+
     def _instance_apply_static(self, instance):
         self._execute_all_non_device_commands(instance)
         self._execute_all_device_commands(instance, instance.assigned_devices)
@@ -345,6 +408,44 @@ class Plugin(object):
                                           instance.processed_devices)
         self._cleanup_all_non_device_commands(instance)
 
+    def _instance_update_static(self, instance, options, changed):
+        """
+        Unapply and apply again only the commands of the changed options.
+        Plugins which keep their own state or override the static tuning
+        have to override this method, otherwise their instances are always
+        recreated.
+        """
+        if (type(self)._instance_apply_static is not Plugin._instance_apply_static
+                or type(self)._instance_unapply_static is not Plugin._instance_unapply_static
+                or instance.has_dynamic_tuning):
+            return False
+        if any(name not in self._commands or name in self._options_used_by_dynamic
+               for name in changed):
+            return False
+
+        commands = [command for command in list(self._commands.values())
+                    if command["name"] in changed]
+        for command in reversed(commands):
+            if instance.options.get(command["name"], None) is None:
+                continue
+            if command["per_device"]:
+                for device in instance.processed_devices:
+                    self._cleanup_device_command(instance, command, device)
+            else:
+                self._cleanup_non_device_command(instance, command)
+
+        instance._options = options
+        for command in commands:
+            new_value = self._variables.expand(options.get(command["name"], None))
+            if new_value is None:
+                continue
+            if command["per_device"]:
+                for device in instance.processed_devices:
+                    self._execute_device_command(instance, command, device, new_value)
+            else:
+                self._execute_non_device_command(instance, command, new_value)
+        return True
+
     def _instance_apply_dynamic(self, instance, device):
         for option in [opt for opt in self._options_used_by_dynamic if
                        self._storage_get(instance, self._commands[opt], device) is None]:
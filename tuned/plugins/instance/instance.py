@@ -10,6 +10,7 @@ class Instance(object):
 		self._script_pre = script_pre
 		self._script_post = script_post
 		self._options = options
+		self._update_interval = None
 
 		self._active = True
 		self._has_static_tuning = False
@@ -64,6 +65,15 @@ class Instance(object):
 	def options(self):
 		return self._options
 
+	@property
+	def update_interval(self):
+		"""Interval of the dynamic tuning in seconds, None for the default."""
+		return self._update_interval
+
+	@update_interval.setter
+	def update_interval(self, value):
+		self._update_interval = value
+
 	@property
 	def has_static_tuning(self):
 		return self._has_static_tuning
@@ -86,6 +96,9 @@ class Instance(object):
 	def unapply_tuning(self, full_rollback = False):
 		self._plugin.instance_unapply_tuning(self, full_rollback)
 
+	def update_options(self, options, old_options):
+		return self._plugin.instance_update_options(self, options, old_options)
+
 	def destroy(self):
 		self.unapply_tuning()
 		self._plugin.destroy_instance(self)
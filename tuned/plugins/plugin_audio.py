@@ -65,6 +65,10 @@ class AudioPlugin(base.Plugin):
         except:
             return None
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -68,6 +68,10 @@ class CPULatencyPlugin(base.Plugin):
     starting with kernel 4.13: "performance", "balance-performance",
     "normal", "balance-power" and "power".
     +
+    If the kernel provides the `/sys/devices/system/cpu/cpuN/power/energy_perf_bias`
+    files, *TuneD* writes them directly. Otherwise the tool is run once per
+    value for all the CPUs of the instance.
+    +
     .Specifying alternative Energy Performance Bias values
     ====
     ----
@@ -86,6 +90,23 @@ class CPULatencyPlugin(base.Plugin):
     specified either by the [option]`latency_high` option or by the
     [option]`latency_low` option.
     +
+    `pressure_threshold`:::
+    If set, the CPU Pressure Stall Information (PSI) is used instead of
+    the load average. When some tasks were waiting for a CPU for at least
+    [option]`pressure_threshold` percent of the time since the last update,
+    the latency is set to the value of the [option]`latency_low` option,
+    otherwise to the value of the [option]`latency_high` option. A PSI
+    trigger also catches short bursts of the pressure between the updates.
+    If PSI is not available, the load average is used.
+    +
+    .Switch to the low latency when tasks wait for a CPU 10% of the time
+    ====
+    ----
+    [cpu]
+    pressure_threshold=10
+    ----
+    ====
+    +
     `force_latency`:::
     You can also force the latency to a specific value and prevent it from
     dynamically changing further. To do so, set the [option]`force_latency`
@@ -145,6 +166,16 @@ class CPULatencyPlugin(base.Plugin):
     ====
     """
 
+    # energy_perf_bias names -> values written to the sysfs file
+    _energy_perf_bias_values = {
+        "performance": "0",
+        "balance-performance": "4",
+        "normal": "6",
+        "balance-power": "8",
+        "power": "15",
+        "powersave": "15",
+    }
+
     def __init__(self, *args, **kwargs):
         super(CPULatencyPlugin, self).__init__(*args, **kwargs)
 
@@ -154,6 +185,11 @@ class CPULatencyPlugin(base.Plugin):
         self._is_intel = False
         self._is_amd = False
         self._has_energy_perf_bias = False
+        self._has_energy_perf_bias_sysfs = False
+        # values read by x86_energy_perf_policy, keyed by the device name
+        self._energy_perf_bias_cache = None
+        # CPUs waiting for x86_energy_perf_policy, keyed by the value
+        self._energy_perf_bias_batch = None
         self._has_intel_pstate = False
 
         self._min_perf_pct_save = None
@@ -174,12 +210,17 @@ class CPULatencyPlugin(base.Plugin):
     def _get_device_objects(self, devices):
         return [self._hardware_inventory.get_device("cpu", x) for x in devices]
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
             "load_threshold": 0.2,
             "latency_low": 100,
             "latency_high": 1000,
+            "pressure_threshold": None,
             "force_latency": None,
             "governor": None,
             "sampling_down_factor": None,
@@ -218,6 +259,12 @@ class CPULatencyPlugin(base.Plugin):
 
     def _check_energy_perf_bias(self):
         self._has_energy_perf_bias = False
+        self._has_energy_perf_bias_sysfs = os.path.exists(
+            self._energy_perf_bias_path(0))
+        if self._has_energy_perf_bias_sysfs:
+            log.info("energy_perf_bias sysfs interface detected")
+            self._has_energy_perf_bias = True
+            return
         retcode_unsupported = 1
         retcode, out = self._cmd.execute(["x86_energy_perf_policy", "-r"],
                                          no_errors=[errno.ENOENT, retcode_unsupported])
@@ -268,11 +315,14 @@ class CPULatencyPlugin(base.Plugin):
                 self._has_pm_qos = False
             self._latency = None
 
+            instance._load_monitor = None
+            instance._pressure_monitor = None
             if instance.options["force_latency"] is None:
-                instance._load_monitor = self._monitors_repository.create("load", None)
+                if instance.options["pressure_threshold"] is not None:
+                    self._create_pressure_monitor(instance)
+                if instance._pressure_monitor is None:
+                    instance._load_monitor = self._monitors_repository.create("load", None)
                 instance._has_dynamic_tuning = True
-            else:
-                instance._load_monitor = None
 
             self._check_arch()
         else:
@@ -284,12 +334,34 @@ class CPULatencyPlugin(base.Plugin):
         except IndexError:
             instance._first_device = None
 
+    def _create_pressure_monitor(self, instance):
+        try:
+            threshold = float(instance.options["pressure_threshold"])
+        except ValueError:
+            log.error("invalid pressure_threshold '%s', using the load average" % instance.options["pressure_threshold"])
+            return
+        monitor = self._monitors_repository.create("pressure", ["cpu"])
+        if "cpu" not in monitor.devices:
+            log.info("CPU pressure stall information is not available, using the load average")
+            self._monitors_repository.delete(monitor)
+            return
+        instance._pressure_monitor = monitor
+        instance._pressure_threshold = threshold
+        # the trigger window is one second, the minimum is 500 ms
+        window = 1000000
+        try:
+            monitor.add_trigger("cpu", "some", max(1, int(window * threshold / 100)), window)
+        except (OSError, IOError) as e:
+            log.debug("unable to register CPU pressure trigger: %s" % e)
+
     def _instance_cleanup(self, instance):
         if instance._first_instance:
             if self._has_pm_qos:
                 os.close(self._cpu_latency_fd)
             if instance._load_monitor is not None:
                 self._monitors_repository.delete(instance._load_monitor)
+            if instance._pressure_monitor is not None:
+                self._monitors_repository.delete(instance._pressure_monitor)
 
     def _get_intel_pstate_attr(self, attr):
         return self._cmd.read_file("/sys/devices/system/cpu/intel_pstate/%s" % attr, None).strip()
@@ -305,6 +377,19 @@ class CPULatencyPlugin(base.Plugin):
         self._set_intel_pstate_attr(attr, value)
         return v
 
+    def _instance_pre_static(self, instance, enabling):
+        self._energy_perf_bias_cache = None
+        self._energy_perf_bias_batch = {}
+
+    def _instance_post_static(self, instance, enabling):
+        self._flush_energy_perf_bias()
+        self._energy_perf_bias_cache = None
+
+    def _instance_verify_static(self, instance, ignore_missing, devices):
+        self._energy_perf_bias_cache = None
+        return super(CPULatencyPlugin, self)._instance_verify_static(
+            instance, ignore_missing, devices)
+
     def _instance_apply_static(self, instance):
         super(CPULatencyPlugin, self)._instance_apply_static(instance)
 
@@ -345,6 +430,17 @@ class CPULatencyPlugin(base.Plugin):
         if device != instance._first_device:
             return
 
+        if instance._pressure_monitor is not None:
+            monitor = instance._pressure_monitor
+            pressure = monitor.stall_percent("cpu")
+            # a fired trigger means a burst since the last update
+            if "cpu" in monitor.poll_triggers() or \
+                    (pressure is not None and pressure >= instance._pressure_threshold):
+                self._set_latency(instance.options["latency_low"])
+            else:
+                self._set_latency(instance.options["latency_high"])
+            return
+
         load = instance._load_monitor.get_load()["system"]
         if load < instance.options["load_threshold"]:
             self._set_latency(instance.options["latency_high"])
@@ -530,6 +626,10 @@ class CPULatencyPlugin(base.Plugin):
             return None
         return self._cmd.read_file(path).strip()
 
+    @staticmethod
+    def _energy_perf_bias_path(cpu_id):
+        return "%s/cpu%s/power/energy_perf_bias" % (consts.SYSFS_CPUS_PATH, cpu_id)
+
     def _try_set_energy_perf_bias(self, cpu_id, value):
         (ret_code, out, err_msg) = self._cmd.execute(
             ["x86_energy_perf_policy",
@@ -539,6 +639,64 @@ class CPULatencyPlugin(base.Plugin):
             return_err=True)
         return ret_code, err_msg
 
+    def _try_write_energy_perf_bias(self, cpu_id, value):
+        """
+        Write the EPB value directly to sysfs. The kernel accepts numbers
+        and all the v2 names, "powersave" is the pre Linux 4.13 name of
+        "power" which the tool accepted.
+        """
+        if not self._has_energy_perf_bias_sysfs:
+            return False
+        value = self._energy_perf_bias_values.get(value, value)
+        return self._cmd.write_to_file(self._energy_perf_bias_path(cpu_id),
+                                       value, no_error=True)
+
+    def _set_energy_perf_bias_sysfs(self, cpu_id, energy_perf_bias):
+        for val in energy_perf_bias.split('|'):
+            val = val.strip()
+            if self._try_write_energy_perf_bias(cpu_id, val):
+                log.debug("energy_perf_bias successfully set to '%s' on cpu '%s'"
+                          % (val, cpu_id))
+                return True
+        return False
+
+    def _set_energy_perf_bias_tool(self, cpu_ids, energy_perf_bias):
+        """
+        Set EPB on all CPUs from cpu_ids with a single x86_energy_perf_policy
+        call per tried value.
+        """
+        cpulist = ",".join(self._cmd.cpulist_pack(cpu_ids))
+        vals = energy_perf_bias.split('|')
+        for val in vals:
+            val = val.strip()
+            log.debug("Trying to set energy_perf_bias to '%s' on cpus '%s'"
+                      % (val, cpulist))
+            (retcode, err_msg) = self._try_set_energy_perf_bias(
+                cpulist, val)
+            if retcode == 0:
+                log.info("energy_perf_bias successfully set to '%s' on cpus '%s'"
+                         % (val, cpulist))
+                break
+            elif retcode < 0:
+                log.error("Failed to set energy_perf_bias: %s"
+                          % err_msg)
+                break
+            else:
+                log.debug(
+                    "Could not set energy_perf_bias to '%s' "
+                    "on cpus '%s', trying another value" % (val, cpulist))
+        else:
+            log.error("Failed to set energy_perf_bias on cpus '%s'."
+                      " Is the value in the profile correct?" % cpulist)
+        self._energy_perf_bias_cache = None
+
+    def _flush_energy_perf_bias(self):
+        batch = self._energy_perf_bias_batch
+        self._energy_perf_bias_batch = None
+        if batch:
+            for energy_perf_bias, cpu_ids in batch.items():
+                self._set_energy_perf_bias_tool(cpu_ids, energy_perf_bias)
+
     @command_set("energy_perf_bias", per_device=True)
     def _set_energy_perf_bias(self, energy_perf_bias, device, sim):
         if not self._is_cpu_online(device):
@@ -547,28 +705,15 @@ class CPULatencyPlugin(base.Plugin):
         if self._has_energy_perf_bias:
             if not sim:
                 cpu_id = device.lstrip("cpu")
-                vals = energy_perf_bias.split('|')
-                for val in vals:
-                    val = val.strip()
-                    log.debug("Trying to set energy_perf_bias to '%s' on cpu '%s'"
-                              % (val, device))
-                    (retcode, err_msg) = self._try_set_energy_perf_bias(
-                        cpu_id, val)
-                    if retcode == 0:
-                        log.info("energy_perf_bias successfully set to '%s' on cpu '%s'"
-                                 % (val, device))
-                        break
-                    elif retcode < 0:
-                        log.error("Failed to set energy_perf_bias: %s"
-                                  % err_msg)
-                        break
-                    else:
-                        log.debug(
-                            "Could not set energy_perf_bias to '%s' "
-                            "on cpu '%s', trying another value" % (val, device))
+                energy_perf_bias = str(energy_perf_bias)
+                if self._set_energy_perf_bias_sysfs(cpu_id, energy_perf_bias):
+                    pass
+                elif self._energy_perf_bias_batch is not None:
+                    # the tool is forked once per value in _flush_energy_perf_bias
+                    self._energy_perf_bias_batch.setdefault(
+                        energy_perf_bias, []).append(cpu_id)
                 else:
-                    log.error("Failed to set energy_perf_bias on cpu '%s'."
-                              " Is the value in the profile correct?" % device)
+                    self._set_energy_perf_bias_tool([cpu_id], energy_perf_bias)
             return str(energy_perf_bias)
         else:
             return None
@@ -599,23 +744,36 @@ class CPULatencyPlugin(base.Plugin):
                 15: "power",
                 }.get(CPULatencyPlugin._try_parse_num(s), s)
 
+    def _read_energy_perf_bias_tool(self):
+        """
+        Read EPB of all CPUs with a single x86_energy_perf_policy call.
+        """
+        values = {}
+        retcode, lines = self._cmd.execute(["x86_energy_perf_policy", "-r"])
+        if retcode != 0:
+            return values
+        for line in lines.splitlines():
+            l = line.split()
+            if len(l) < 2 or not l[0].startswith("cpu") or l[0] in values:
+                continue
+            if len(l) == 2:
+                values[l[0].rstrip(":")] = CPULatencyPlugin._energy_perf_policy_to_human(l[1])
+            elif len(l) == 3:
+                values[l[0].rstrip(":")] = CPULatencyPlugin._energy_perf_policy_to_human_v2(l[2])
+        return values
+
     @command_get("energy_perf_bias")
     def _get_energy_perf_bias(self, device, ignore_missing):
-        energy_perf_bias = None
         if not self._is_cpu_online(device):
             log.debug("%s is not online, skipping" % device)
             return None
-        if self._has_energy_perf_bias:
-            cpu_id = device.lstrip("cpu")
-            retcode, lines = self._cmd.execute(["x86_energy_perf_policy", "-c", cpu_id, "-r"])
-            if retcode == 0:
-                for line in lines.splitlines():
-                    l = line.split()
-                    if len(l) == 2:
-                        energy_perf_bias = CPULatencyPlugin._energy_perf_policy_to_human(l[1])
-                        break
-                    elif len(l) == 3:
-                        energy_perf_bias = CPULatencyPlugin._energy_perf_policy_to_human_v2(l[2])
-                        break
-
-        return energy_perf_bias
+        if not self._has_energy_perf_bias:
+            return None
+        if self._has_energy_perf_bias_sysfs:
+            value = self._cmd.read_file(self._energy_perf_bias_path(device.lstrip("cpu")),
+                                        err_ret=None, no_error=True)
+            if value is not None:
+                return CPULatencyPlugin._energy_perf_policy_to_human_v2(value.strip())
+        if self._energy_perf_bias_cache is None:
+            self._energy_perf_bias_cache = self._read_energy_perf_bias_tool()
+        return self._energy_perf_bias_cache.get(device)
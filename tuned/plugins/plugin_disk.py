@@ -83,6 +83,10 @@ class DiskPlugin(hotplug.Plugin):
             instance.load_monitor.remove_device(device_name)
         super(DiskPlugin, self)._removed_device_unapply_tuning(instance, device_name)
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -164,14 +168,14 @@ class DiskPlugin(hotplug.Plugin):
         if device not in self._hdparm_apm_devices:
             return
 
-        load = instance.load_monitor.get_device_load(device)
-        if load is None:
+        history = instance.load_monitor.get_device_history(device)
+        if history is None or len(history) < 2:
             return
 
         if device not in instance.stats:
             DiskPlugin.init_stats_and_idle(instance, device)
 
-        DiskPlugin._update_stats(instance, device, load)
+        DiskPlugin._update_stats(instance, device, history)
         self._update_idle(instance, device)
 
         stats = instance.stats[device]
@@ -217,22 +221,19 @@ class DiskPlugin(hotplug.Plugin):
 
     @staticmethod
     def init_stats_and_idle(instance, device):
-        instance.stats[device] = {"new": 11 * [0], "old": 11 * [0], "max": 11 * [1]}
+        instance.stats[device] = {"max": 11 * [1]}
         instance.idle[device] = {"level": 0, "read": 0, "write": 0}
         instance.spindown_change_delayed[device] = False
 
     @staticmethod
-    def _update_stats(instance, device, new_load):
-        instance.stats[device]["old"] = old_load = instance.stats[device]["new"]
-        instance.stats[device]["new"] = new_load
-
-        # load difference
-        diff = [new_old[0] - new_old[1] for new_old in zip(new_load, old_load)]
+    def _update_stats(instance, device, history):
+        # load difference between the last two samples
+        diff = history.delta()
         instance.stats[device]["diff"] = diff
 
-        # adapt maximum expected load if the difference is higher
+        # adapt maximum expected load to the highest difference seen
         old_max_load = instance.stats[device]["max"]
-        max_load = [max(pair) for pair in zip(old_max_load, diff)]
+        max_load = [max(pair) for pair in zip(old_max_load, history.peak())]
         instance.stats[device]["max"] = max_load
 
         # read/write ratio
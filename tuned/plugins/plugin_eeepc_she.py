@@ -39,6 +39,10 @@ class EeePCSHEPlugin(base.Plugin):
         self._load_monitor = None
         super(EeePCSHEPlugin, self).__init__(*args, **kwargs)
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -0,0 +1,205 @@
+import collections
+import errno
+import re
+
+from . import hotplug
+from .decorators import *
+import tuned.logs
+from tuned.utils.cpuset import CpuSet
+from tuned.utils.irq_placement import IrqPlacement
+
+log = tuned.logs.get()
+
+# the hotplug plugin base works with objects with the device name in sys_name
+_IrqDevice = collections.namedtuple("_IrqDevice", ["sys_name"])
+
+
+class IrqPlugin(hotplug.Plugin):
+    """
+    `irq`::
+
+    Pins interrupts to CPUs. The devices of the plug-in are the IRQs,
+    named `irqN` where `N` is the IRQ number, so they can be selected by
+    the `devices` option (e.g. `devices=irq24,irq25`). The IRQs can also
+    be selected by a regular expression searched in their line in
+    `/proc/interrupts` (the interrupt controller and the names of the
+    handlers, e.g. `nvme0q1` or `mlx5_comp3@pci:0000:3b:00.0`) using the
+    [option]`irq_name` option, and by a regular expression matching the
+    name of the driver of their PCI device using the [option]`irq_driver`
+    option.
+    +
+    The [option]`affinity` option sets the CPU list the selected IRQs
+    are pinned to. The original affinities are restored when the
+    profile is unloaded.
+    +
+    The IRQs are rescanned on PCI device events, so new interrupt
+    vectors (e.g. after creating virtual functions or reloading a driver)
+    are pinned as soon as they appear.
+    +
+    .Pin the completion interrupts of mlx5 NICs to CPUs 2-3
+    ====
+    ----
+    [irq_mlx5]
+    type=irq
+    irq_name=mlx5_comp
+    affinity=2-3
+    ----
+    ====
+    +
+    NOTE: The plug-in shares the IRQs with the `scheduler` plug-in
+    ([option]`isolated_cores`) and with `irqbalance`, which can move
+    the interrupts again.
+    """
+
+    def _instance_unapply_dynamic(self, instance, device):
+        pass
+
+    def _instance_update_dynamic(self, instance, device):
+        pass
+
+    def __init__(self, *args, **kwargs):
+        super(IrqPlugin, self).__init__(*args, **kwargs)
+        self._irq_reader = IrqPlacement()
+        self._irqs = {}
+
+    @staticmethod
+    def _irq_device(irq):
+        return "irq%d" % irq
+
+    @staticmethod
+    def _device_irq(device):
+        return int(device[3:])
+
+    def _read_irqs(self):
+        try:
+            self._irqs = self._irq_reader.read()
+        except (OSError, IOError) as e:
+            log.error("Failed to read the interrupts: %s" % e)
+            self._irqs = {}
+        return set(self._irq_device(irq) for irq, info in self._irqs.items()
+                   if info.affinity is not None)
+
+    def _init_devices(self):
+        super(IrqPlugin, self)._init_devices()
+        self._devices_supported = True
+        self._free_devices = self._read_irqs()
+        self._assigned_devices = set()
+
+    def _hardware_events_init(self):
+        self._hardware_inventory.subscribe(self, "pci", self._hardware_events_callback)
+
+    def _hardware_events_cleanup(self):
+        self._hardware_inventory.unsubscribe(self)
+
+    def _hardware_events_callback(self, event, device):
+        # the vectors are allocated and freed by the drivers, look at
+        # the IRQs after any change of the PCI devices
+        self._rescan_irqs()
+
+    def _rescan_irqs(self):
+        previous = self._irqs
+        current = self._read_irqs()
+        known = self._assigned_devices | self._free_devices
+        # an IRQ number freed and allocated again between two rescans
+        # has a new description, it is handled as a removed and added IRQ
+        reused = set(self._irq_device(irq) for irq, info in self._irqs.items()
+                     if irq in previous and previous[irq].description != info.description)
+        reused &= known & current
+        for device in sorted(reused):
+            self._forget_device(device)
+        for device in sorted((known - current) | reused):
+            self._remove_device(_IrqDevice(device))
+        for device in sorted((current - known) | reused):
+            self._add_device(_IrqDevice(device))
+
+    # the stored original affinity belongs to the freed vector, it must
+    # not be written to the new vector with the same number
+    def _forget_device(self, device):
+        for instance in self._instances.values():
+            if device in instance.processed_devices:
+                for command in self._commands.values():
+                    if command["per_device"]:
+                        self._storage_unset(instance, command, device)
+
+    def _get_matching_devices(self, instance, devices):
+        matching = super(IrqPlugin, self)._get_matching_devices(instance, devices)
+        (name_re, driver_re) = self._instance_filters(instance)
+        if name_re is None and driver_re is None:
+            return matching
+        filtered = set()
+        for device in matching:
+            info = self._irqs.get(self._device_irq(device))
+            if info is None:
+                continue
+            if name_re is not None and name_re.search(info.description) is None:
+                continue
+            if driver_re is not None and (info.driver is None
+                                          or driver_re.search(info.driver) is None):
+                continue
+            filtered.add(device)
+        return filtered
+
+    # the devices are assigned before the instance is initialized,
+    # so the expressions are compiled on the first use
+    def _instance_filters(self, instance):
+        if not hasattr(instance, "_irq_filters"):
+            filters = []
+            for option in ["irq_name", "irq_driver"]:
+                value = instance.options.get(option)
+                if value is not None and self._variables is not None:
+                    value = self._variables.expand(value)
+                try:
+                    filters.append(re.compile(value) if value else None)
+                except re.error as e:
+                    log.error("instance %s: invalid %s '%s': %s" % (instance.name, option, value, e))
+                    # match nothing rather than everything
+                    filters.append(re.compile(r"(?!)"))
+            instance._irq_filters = tuple(filters)
+        return instance._irq_filters
+
+    @classmethod
+    def _get_tuning_resources(cls):
+        return ["irq"]
+
+    @classmethod
+    def _get_config_options(cls):
+        return {
+            "affinity": None,
+            "irq_name": None,
+            "irq_driver": None,
+        }
+
+    def _instance_init(self, instance):
+        instance._has_static_tuning = True
+        instance._has_dynamic_tuning = False
+
+    def _instance_cleanup(self, instance):
+        pass
+
+    @command_set("affinity", per_device=True)
+    def _set_affinity(self, value, device, sim):
+        cpus = CpuSet.parse(value)
+        if not cpus:
+            log.error("Invalid IRQ affinity '%s'" % value)
+            return None
+        if not sim:
+            irq = self._device_irq(device)
+            try:
+                self._irq_reader.write_affinity(irq, cpus)
+            except (OSError, IOError) as e:
+                # EIO is returned if changing the affinity is not supported
+                if e.errno == errno.EIO:
+                    log.debug("Setting SMP affinity of IRQ %d is not supported" % irq)
+                elif e.errno == errno.ENOENT:
+                    log.debug("IRQ %d vanished" % irq)
+                else:
+                    log.error("Failed to set SMP affinity of IRQ %d to '%s': %s" % (irq, cpus, e))
+                return None
+        return str(cpus)
+
+    @command_get("affinity")
+    def _get_affinity(self, device, ignore_missing=False):
+        cpus = self._irq_reader.read_affinity(self._device_irq(device))
+        if cpus is None:
+            return None
+        return str(cpus)
@@ -47,6 +47,10 @@ class IrqbalancePlugin(base.Plugin):
     def _instance_cleanup(self, instance):
         pass
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return ["irq"]
+
     @classmethod
     def _get_config_options(cls):
         return {
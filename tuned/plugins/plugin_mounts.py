@@ -71,6 +71,10 @@ class MountsPlugin(base.Plugin):
         self._free_devices = set(self._mountpoint_topology.keys())
         self._assigned_devices = set()
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
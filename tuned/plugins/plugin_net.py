@@ -1,15 +1,24 @@
-import errno
 from . import base
 from .decorators import *
 import tuned.logs
 from tuned.utils.nettool import ethcard
 from tuned.utils.commands import commands
+from tuned.utils.ethtool_ioctl import Ethtool, EthtoolUnavailable
+from tuned.utils.cpuset import CpuSet
+import os
 import re
 
 log = tuned.logs.get()
 
 WOL_VALUES = "pumbagsd"
 
+# packet steering options: (queue type, file in the queue directory)
+STEERING_OPTIONS = {
+    "rps_cpus": ("rx", "rps_cpus"),
+    "xps_cpus": ("tx", "xps_cpus"),
+    "rps_flow_cnt": ("rx", "rps_flow_cnt"),
+}
+
 
 class NetTuningPlugin(base.Plugin):
     """
@@ -21,6 +30,11 @@ class NetTuningPlugin(base.Plugin):
     the [option]`dynamic` and the global [option]`dynamic_tuning`
     option in `tuned-main.conf`.
     +
+    The ethtool settings (wake-on-lan, coalesce, features, pause, ring
+    and channels) are read and changed through the ethtool ioctl of the
+    kernel. The `ethtool` utility is used only if the ioctl is not
+    available.
+    +
     The [option]`wake_on_lan` option sets wake-on-lan to the specified
     value as when using the `ethtool` utility.
     +
@@ -123,10 +137,9 @@ class NetTuningPlugin(base.Plugin):
     ====
     +
     The [option]`txqueuelen` option allows changing txqueuelen (the length
-    of the transmit queue). It uses `ip` utility that is in package	iproute
-    recommended for TuneD, so the package needs to be installed for its correct
-    functionality. To query the txqueuelen parameters of your network device
-    use `ip link show` and the current value is shown after the qlen column.
+    of the transmit queue) by writing to `/sys/class/net/<device>/tx_queue_len`.
+    To query the txqueuelen parameters of your network device use
+    `ip link show` and the current value is shown after the qlen column.
     +
     .Adjust the length of the transmit queue
     ====
@@ -136,11 +149,10 @@ class NetTuningPlugin(base.Plugin):
     ----
     ====
     +
-    The [option]`mtu` option allows changing MTU (Maximum Transmission Unit).
-    It uses `ip` utility that is in package	iproute recommended for TuneD, so
-    the package needs to be installed for its correct functionality. To query
-    the MTU parameters of your network device use `ip link show` and the
-    current value is shown after the MTU column.
+    The [option]`mtu` option allows changing MTU (Maximum Transmission Unit)
+    by writing to `/sys/class/net/<device>/mtu`. To query the MTU parameters
+    of your network device use `ip link show` and the current value is shown
+    after the MTU column.
     +
     .Adjust the size of the MTU
     ====
@@ -149,6 +161,37 @@ class NetTuningPlugin(base.Plugin):
     mtu=9000
     ----
     ====
+    +
+    The [option]`rps_cpus` and [option]`xps_cpus` options set the CPUs
+    for the receive packet steering (RPS) and the transmit packet
+    steering (XPS) of all the receive and transmit queues of the device,
+    written to `/sys/class/net/<device>/queues/rx-*/rps_cpus` and
+    `tx-*/xps_cpus`. The value is a CPU list (an empty mask such as
+    `0x0` disables the steering) or `auto`, which spreads the queues
+    over the housekeeping CPUs local to the NUMA node of the device.
+    Each queue gets its own share of the CPUs. If the device has at
+    least as many queues as CPUs, the hardware already spreads the
+    packets, `auto` disables RPS and leaves XPS as the driver set it.
+    The housekeeping CPUs are the online CPUs without the
+    `isolated_cores` profile variable, if it is defined.
+    +
+    The [option]`rps_flow_cnt` option sets the size of the flow table
+    of the receive flow steering (RFS) of each receive queue, `auto`
+    divides the [option]`rps_sock_flow_entries` among the queues,
+    rounded down to a power of two as the kernel sizes the tables. The
+    [option]`rps_sock_flow_entries` option sets the size of the global
+    RFS socket flow table in `/proc/sys/net/core/rps_sock_flow_entries`.
+    +
+    .Spread the packet processing of NICs with few queues
+    ====
+    ----
+    [net]
+    rps_cpus=auto
+    xps_cpus=auto
+    rps_sock_flow_entries=32768
+    rps_flow_cnt=auto
+    ----
+    ====
     """
 
     def __init__(self, *args, **kwargs):
@@ -156,8 +199,8 @@ class NetTuningPlugin(base.Plugin):
         self._load_smallest = 0.05
         self._level_steps = 6
         self._cmd = commands()
-        self._re_ip_link_show = {}
-        self._use_ip = True
+        # the ethtool utility is used if the ioctl is not available
+        self._ethtool = Ethtool()
 
     def _init_devices(self):
         self._devices_supported = True
@@ -192,17 +235,26 @@ class NetTuningPlugin(base.Plugin):
             self._monitors_repository.delete(instance._load_monitor)
             instance._load_monitor = None
 
+    def instance_update_options(self, instance, options, old_options):
+        # the auto steering targets depend also on the isolated_cores
+        # variable, the online CPUs and the queues, which are not seen
+        # in the options, the instance is recreated to compute them again
+        if any(str(old_options.get(option, "")).strip().lower() == "auto"
+               for option in STEERING_OPTIONS):
+            return False
+        return super(NetTuningPlugin, self).instance_update_options(instance, options, old_options)
+
     def _instance_apply_dynamic(self, instance, device):
         self._instance_update_dynamic(instance, device)
 
     def _instance_update_dynamic(self, instance, device):
-        load = [int(value) for value in instance._load_monitor.get_device_load(device)]
-        if load is None:
+        history = instance._load_monitor.get_device_history(device)
+        if history is None or len(history) < 2:
             return
 
         if device not in instance._stats:
             self._init_stats_and_idle(instance, device)
-        self._update_stats(instance, device, load)
+        self._update_stats(instance, device, history)
         self._update_idle(instance, device)
 
         stats = instance._stats[device]
@@ -267,6 +319,11 @@ class NetTuningPlugin(base.Plugin):
                 "other": None,
                 "combined": None}
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        # rps_sock_flow_entries is written to /proc/sys/net/core
+        return ["sysctl"]
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -280,27 +337,27 @@ class NetTuningPlugin(base.Plugin):
             "channels": None,
             "txqueuelen": None,
             "mtu": None,
+            "rps_cpus": None,
+            "xps_cpus": None,
+            "rps_flow_cnt": None,
+            "rps_sock_flow_entries": None,
         }
 
     @staticmethod
     def _init_stats_and_idle(instance, device):
         max_speed = NetTuningPlugin._calc_speed(ethcard(device).get_max_speed())
-        instance._stats[device] = {"new": 4 * [0], "max": 2 * [max_speed, 1]}
+        instance._stats[device] = {"max": 2 * [max_speed, 1]}
         instance._idle[device] = {"level": 0, "read": 0, "write": 0}
 
     @staticmethod
-    def _update_stats(instance, device, new_load):
-        # put new to old
-        instance._stats[device]["old"] = old_load = instance._stats[device]["new"]
-        instance._stats[device]["new"] = new_load
-
-        # load difference
-        diff = [new_old[0] - new_old[1] for new_old in zip(new_load, old_load)]
+    def _update_stats(instance, device, history):
+        # load difference between the last two samples
+        diff = history.delta()
         instance._stats[device]["diff"] = diff
 
-        # adapt maximum expected load if the difference is higer
+        # adapt maximum expected load to the highest difference seen
         old_max_load = instance._stats[device]["max"]
-        max_load = [max(pair) for pair in zip(old_max_load, diff)]
+        max_load = [max(pair) for pair in zip(old_max_load, history.peak())]
         instance._stats[device]["max"] = max_load
 
         # read/write ratio
@@ -381,6 +438,44 @@ class NetTuningPlugin(base.Plugin):
     def _nf_conntrack_hashsize_path(cls):
         return "/sys/module/nf_conntrack/parameters/hashsize"
 
+    def _disable_ethtool_ioctl(self, e):
+        log.info("%s, using the ethtool utility" % e)
+        self._ethtool.close()
+        self._ethtool = None
+
+    def _ethtool_get(self, context, device):
+        """
+        Get the context ("wol" or the context of the parameters) by the
+        ioctl. Raises EthtoolUnavailable if the ethtool utility has to be used.
+        """
+        if self._ethtool is None:
+            raise EthtoolUnavailable("ethtool ioctl is disabled")
+        try:
+            return self._ethtool.get(context, device)
+        except EthtoolUnavailable as e:
+            self._disable_ethtool_ioctl(e)
+            raise
+        except (OSError, IOError) as e:
+            log.debug("Cannot get %s of device '%s': %s" % (context, device, e))
+            return None
+
+    def _ethtool_set(self, context, device, value):
+        """
+        Set the context by the ioctl, the errors are logged. Raises
+        EthtoolUnavailable if the ethtool utility has to be used.
+        """
+        if self._ethtool is None:
+            raise EthtoolUnavailable("ethtool ioctl is disabled")
+        try:
+            self._ethtool.set(context, device, value)
+        except EthtoolUnavailable as e:
+            self._disable_ethtool_ioctl(e)
+            raise
+        except ValueError as e:
+            log.error("Cannot set %s of device '%s': %s" % (context, device, e))
+        except (OSError, IOError) as e:
+            log.error("Cannot set %s of device '%s' to '%s': %s" % (context, device, value, e))
+
     @command_set("wake_on_lan", per_device=True)
     def _set_wake_on_lan(self, value, device, sim):
         if value is None:
@@ -393,11 +488,18 @@ class NetTuningPlugin(base.Plugin):
             return None
 
         if not sim:
-            self._cmd.execute(["ethtool", "-s", device, "wol", value])
+            try:
+                self._ethtool_set("wol", device, value)
+            except EthtoolUnavailable:
+                self._cmd.execute(["ethtool", "-s", device, "wol", value])
         return value
 
     @command_get("wake_on_lan")
     def _get_wake_on_lan(self, device):
+        try:
+            return self._ethtool_get("wol", device)
+        except EthtoolUnavailable:
+            pass
         value = None
         try:
             m = re.match(r".*Wake-on:\s*([" + WOL_VALUES + "]+).*", self._cmd.execute(["ethtool", device])[1], re.S)
@@ -427,102 +529,228 @@ class NetTuningPlugin(base.Plugin):
             return int(value)
         return None
 
-    def _call_ip_link(self, args=None):
-
-        if args is None:
-            args = []
-
-        if not self._use_ip:
-            return None
+    @classmethod
+    def _rps_sock_flow_entries_path(cls):
+        return "/proc/sys/net/core/rps_sock_flow_entries"
 
-        args = ["ip", "link"] + args
-        (rc, out, err_msg) = self._cmd.execute(args, no_errors=[errno.ENOENT], return_err=True)
-        if rc == -errno.ENOENT:
-            log.warn("ip command not found, ignoring for other devices")
-            self._use_ip = False
-            return None
-        elif rc:
-            log.info("Problem calling ip command")
-            log.debug("(rc: %s, msg: '%s')" % (rc, err_msg))
-            return None
-        return out
+    @classmethod
+    def _cpus_online_path(cls):
+        return "/sys/devices/system/cpu/online"
 
-    def _ip_link_show(self, device=None):
-        args = ["show"]
-        if device:
-            args.append(device)
-        return self._call_ip_link(args)
+    @classmethod
+    def _net_sysfs_path(cls, device, attr):
+        return "/sys/class/net/%s/%s" % (device, attr)
 
-    @command_set("txqueuelen", per_device=True)
-    def _set_txqueuelen(self, value, device, sim):
+    def _set_net_sysfs_value(self, option, attr, value, device, sim):
         if value is None:
             return None
         try:
             int(value)
         except ValueError:
-            log.warn("txqueuelen value '%s' is not integer" % value)
+            log.warn("%s value '%s' is not integer" % (option, value))
             return None
         if not sim:
-            # there is inconsistency in "ip", where "txqueuelen" is set as it, but is shown as "qlen"
-            res = self._call_ip_link(["set", "dev", device, "txqueuelen", value])
-            if res is None:
-                log.warn("Cannot set txqueuelen for device '%s'" % device)
+            if not self._cmd.write_to_file(self._net_sysfs_path(device, attr), value):
+                log.warn("Cannot set %s for device '%s'" % (option, device))
                 return None
         return value
 
-    def _get_re_ip_link_show(self, arg):
-        """
-        Return regex for int arg value from "ip link show" command
-        """
-        if arg not in self._re_ip_link_show:
-            self._re_ip_link_show[arg] = re.compile(r".*\s+%s\s+(\d+)" % arg)
-        return self._re_ip_link_show[arg]
-
-    @command_get("txqueuelen")
-    def _get_txqueuelen(self, device, ignore_missing=False):
-        out = self._ip_link_show(device)
-        if out is None:
-            if not ignore_missing:
-                log.info("Cannot get 'ip link show' result for txqueuelen value for device '%s'" % device)
+    def _get_net_sysfs_value(self, option, attr, device, ignore_missing):
+        value = self._cmd.read_file(self._net_sysfs_path(device, attr), err_ret=None,
+                                    no_error=ignore_missing)
+        if value is None:
             return None
-        res = self._get_re_ip_link_show("qlen").search(out)
-        if res is None:
-            # We can theoretically get device without qlen (http://linux-ip.net/gl/ip-cref/ip-cref-node17.html)
+        value = value.strip()
+        if not value.isdigit():
             if not ignore_missing:
-                log.info("Cannot get txqueuelen value from 'ip link show' result for device '%s'" % device)
+                log.info("Cannot get %s value for device '%s'" % (option, device))
             return None
-        return res.group(1)
+        return value
+
+    @command_set("txqueuelen", per_device=True)
+    def _set_txqueuelen(self, value, device, sim):
+        return self._set_net_sysfs_value("txqueuelen", "tx_queue_len", value, device, sim)
+
+    @command_get("txqueuelen")
+    def _get_txqueuelen(self, device, ignore_missing=False):
+        return self._get_net_sysfs_value("txqueuelen", "tx_queue_len", device, ignore_missing)
 
     @command_set("mtu", per_device=True)
     def _set_mtu(self, value, device, sim):
+        return self._set_net_sysfs_value("mtu", "mtu", value, device, sim)
+
+    @command_get("mtu")
+    def _get_mtu(self, device, ignore_missing=False):
+        return self._get_net_sysfs_value("mtu", "mtu", device, ignore_missing)
+
+    @command_set("rps_sock_flow_entries")
+    def _set_rps_sock_flow_entries(self, value, sim):
         if value is None:
             return None
         try:
-            int(value)
+            entries = int(value)
         except ValueError:
-            log.warn("mtu value '%s' is not integer" % value)
+            log.warn("rps_sock_flow_entries value '%s' is not integer" % value)
+            return None
+        if entries < 0:
             return None
         if not sim:
-            res = self._call_ip_link(["set", "dev", device, "mtu", value])
-            if res is None:
-                log.warn("Cannot set mtu for device '%s'" % device)
-                return None
-        return value
+            self._cmd.write_to_file(self._rps_sock_flow_entries_path(), entries)
+        return entries
 
-    @command_get("mtu")
-    def _get_mtu(self, device, ignore_missing=False):
-        out = self._ip_link_show(device)
-        if out is None:
-            if not ignore_missing:
-                log.info("Cannot get 'ip link show' result for mtu value for device '%s'" % device)
-            return None
-        res = self._get_re_ip_link_show("mtu").search(out)
-        if res is None:
-            # mtu value should be always present, but it's better to have a test
-            if not ignore_missing:
-                log.info("Cannot get mtu value from 'ip link show' result for device '%s'" % device)
+    @command_get("rps_sock_flow_entries")
+    def _get_rps_sock_flow_entries(self):
+        value = self._cmd.read_file(self._rps_sock_flow_entries_path(), no_error=True).strip()
+        if len(value) > 0:
+            return int(value)
+        return None
+
+    def _queues(self, device, queue_type):
+        try:
+            names = os.listdir(self._net_sysfs_path(device, "queues"))
+        except OSError:
+            return []
+        prefix = queue_type + "-"
+        queues = [name for name in names
+                  if name.startswith(prefix) and name[len(prefix):].isdigit()]
+        return sorted(queues, key=lambda name: int(name[len(prefix):]))
+
+    def _queue_path(self, device, queue, attr):
+        return os.path.join(self._net_sysfs_path(device, "queues"), queue, attr)
+
+    def _housekeeping_cpus(self, device):
+        """
+        Return the online CPUs without the isolated_cores profile variable,
+        only those local to the device if there are any.
+        """
+        cpus = CpuSet.parse(self._cmd.read_file(self._cpus_online_path(), no_error=True).strip())
+        if self._variables is not None:
+            isolated = self._variables.expand("${isolated_cores}")
+            if "${" not in isolated:
+                cpus -= CpuSet.parse(isolated)
+        local = CpuSet.parse(self._cmd.read_file(
+            self._net_sysfs_path(device, "device/local_cpulist"), no_error=True).strip())
+        return (cpus & local) or cpus
+
+    @staticmethod
+    def _spread_cpus(cpus, queues):
+        """
+        Split the CPUs among the queues, each queue gets a contiguous
+        share. The queues get no CPUs if there are not fewer queues than
+        CPUs, the packets are already spread by the hardware.
+        """
+        cpus = CpuSet(cpus).to_list()
+        if not cpus:
+            return []
+        if queues >= len(cpus):
+            return [CpuSet()] * queues
+        return [CpuSet(cpus[i * len(cpus) // queues:(i + 1) * len(cpus) // queues])
+                for i in range(queues)]
+
+    def _steering_targets(self, option, value, device):
+        """Return dictionary of queue -> value to write, None on error."""
+        (queue_type, attr) = STEERING_OPTIONS[option]
+        queues = self._queues(device, queue_type)
+        if not queues:
+            log.info("device '%s' has no %s queues for %s" % (device, queue_type, option))
             return None
-        return res.group(1)
+        value = str(value).strip()
+        if option == "rps_flow_cnt":
+            if value.lower() == "auto":
+                entries = (self._get_rps_sock_flow_entries() or 0) // len(queues)
+                # the kernel rounds the flow tables up to a power of two,
+                # round down so they do not exceed rps_sock_flow_entries
+                if entries > 0:
+                    entries = 1 << (entries.bit_length() - 1)
+                return dict((queue, str(entries)) for queue in queues)
+            try:
+                return dict((queue, str(int(value))) for queue in queues)
+            except ValueError:
+                log.warn("rps_flow_cnt value '%s' is not integer" % value)
+                return None
+        if value.lower() == "auto":
+            cpus = self._spread_cpus(self._housekeeping_cpus(device), len(queues))
+            if not cpus:
+                log.error("cannot get the housekeeping CPUs for %s of device '%s'" % (option, device))
+                return None
+            if option == "xps_cpus" and not any(cpus):
+                # the drivers set XPS up for the multi-queue devices
+                log.debug("device '%s' has a %s queue per CPU, leaving %s" % (device, queue_type, option))
+                return {}
+        else:
+            cpus = [CpuSet.parse(value)] * len(queues)
+        return dict((queue, cpuset.to_hex()) for (queue, cpuset) in zip(queues, cpus))
+
+    @staticmethod
+    def _steering_value_equal(option, requested, current):
+        base = 10 if option == "rps_flow_cnt" else 16
+        try:
+            requested = int(str(requested).replace(",", ""), base)
+            current = int(str(current).replace(",", ""), base)
+        except ValueError:
+            return False
+        if option == "rps_flow_cnt" and requested > 0:
+            # the kernel reads back the value rounded up to a power of two
+            requested = 1 << (requested - 1).bit_length()
+        return requested == current
+
+    def _steering(self, option, start, value, device, verify, ignore_missing):
+        attr = STEERING_OPTIONS[option][1]
+        storage_key = self._storage_key(
+            command_name=option,
+            device_name=device)
+        if start:
+            targets = self._steering_targets(option, value, device)
+            if targets is None:
+                return False
+            if not targets:
+                return True if verify else None
+            current = {}
+            for queue in list(targets):
+                queue_value = self._cmd.read_file(self._queue_path(device, queue, attr),
+                                                  err_ret=None, no_error=True)
+                if queue_value is None:
+                    # e.g. XPS of the single queue devices
+                    del targets[queue]
+                else:
+                    current[queue] = queue_value.strip()
+            if not targets:
+                log.info("%s is not supported by device '%s'" % (option, device))
+                return ignore_missing if verify else False
+            if verify:
+                res = all(self._steering_value_equal(option, targets[queue], current[queue])
+                          for queue in targets)
+                self._log_verification_result(option, res,
+                                              " ".join(self._cmd.dict2list(targets)),
+                                              " ".join(self._cmd.dict2list(current)),
+                                              device=device)
+                return res
+            self._storage.set(storage_key, current)
+            for queue in sorted(targets):
+                self._cmd.write_to_file(self._queue_path(device, queue, attr), targets[queue])
+        else:
+            original = self._storage.get(storage_key)
+            if original is None:
+                return None
+            for queue in sorted(original):
+                # the queues may be gone, e.g. after changing the channels
+                self._cmd.write_to_file(self._queue_path(device, queue, attr), original[queue],
+                                        no_error=True)
+            self._storage.unset(storage_key)
+        return None
+
+    # the steering is set after the channels, which can change the queues
+    @command_custom("rps_cpus", per_device=True, priority=10)
+    def _rps_cpus(self, start, value, device, verify, ignore_missing):
+        return self._steering("rps_cpus", start, value, device, verify, ignore_missing)
+
+    @command_custom("xps_cpus", per_device=True, priority=10)
+    def _xps_cpus(self, start, value, device, verify, ignore_missing):
+        return self._steering("xps_cpus", start, value, device, verify, ignore_missing)
+
+    @command_custom("rps_flow_cnt", per_device=True, priority=10)
+    def _rps_flow_cnt(self, start, value, device, verify, ignore_missing):
+        return self._steering("rps_flow_cnt", start, value, device, verify, ignore_missing)
 
     # d is dict: {parameter: value}
     def _check_parameters(self, context, d):
@@ -612,6 +840,10 @@ class NetTuningPlugin(base.Plugin):
             parameters.pop(param, None)
 
     def _get_device_parameters(self, context, device):
+        try:
+            return self._ethtool_get(context, device)
+        except EthtoolUnavailable:
+            pass
         context2opt = {"coalesce": "-c", "features": "-k", "pause": "-a", "ring": "-g",
                        "channels": "-l"}
         opt = context2opt[context]
@@ -645,6 +877,11 @@ class NetTuningPlugin(base.Plugin):
 
         if not sim and len(d) != 0:
             log.debug("setting %s: %s" % (context, str(d)))
+            try:
+                self._ethtool_set(context, device, d)
+                return d
+            except EthtoolUnavailable:
+                pass
             context2opt = {"coalesce": "-C", "features": "-K", "pause": "-A", "ring": "-G",
                            "channels": "-L"}
             opt = context2opt[context]
@@ -21,6 +21,10 @@ class RTENTSKPlugin(base.Plugin):
     def _instance_update_dynamic(self, instance, device):
         pass
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     def _instance_init(self, instance):
         instance._has_static_tuning = True
         instance._has_dynamic_tuning = False
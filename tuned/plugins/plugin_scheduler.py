@@ -10,12 +10,20 @@ import threading
 import perf
 import select
 import tuned.consts as consts
-import procfs
 from tuned.utils.commands import commands
+from .scheduler_rollback import SchedulerParams, SchedulerRollback
+from tuned.utils.rule_matcher import RuleMatcher
+from tuned.utils.proc_scanner import ProcScanner, Task
+from tuned.utils.affinity_engine import AffinityEngine, TaskFilter
+from tuned.utils.irq_placement import IrqPlacement, PLACEMENTS, PLACEMENT_INTERSECT
+from tuned.utils.cpuset import CpuSet
+from tuned.utils.proc_connector import ProcConnector, PROC_EVENT_FORK, \
+    PROC_EVENT_EXEC, PROC_EVENT_COMM, PROC_EVENT_EXIT
 import errno
 import os
 import collections
 import math
+import time
 
 # Check existence of scheduler API in os module
 try:
@@ -26,39 +34,67 @@ except AttributeError:
 log = tuned.logs.get()
 
 
-class SchedulerParams(object):
-    def __init__(self, cmd, cmdline=None, scheduler=None,
-                 priority=None, affinity=None, cgroup=None):
-        self._cmd = cmd
-        self.cmdline = cmdline
-        self.scheduler = scheduler
-        self.priority = priority
-        self.affinity = affinity
-        self.cgroup = cgroup
-
-    @property
-    def affinity(self):
-        if self._affinity is None:
-            return None
-        else:
-            return self._cmd.bitmask2cpulist(self._affinity)
-
-    @affinity.setter
-    def affinity(self, value):
-        if value is None:
-            self._affinity = None
-        else:
-            self._affinity = self._cmd.cpulist2bitmask(value)
-
-
 class IRQAffinities(object):
     def __init__(self):
         self.irqs = {}
+        # affinities set by the numa and spread IRQ placements
+        self.targets = {}
         self.default = None
         # IRQs that don't support changing CPU affinity:
         self.unchangeable = []
 
 
+class PerfEventSource(object):
+    """Source of process events from perf ring buffers, events are
+    returned as (PROC_EVENT_*, pid) tuples like by the ProcConnector."""
+    _perf2proc_event = {
+        perf.RECORD_COMM: PROC_EVENT_COMM,
+        perf.RECORD_FORK: PROC_EVENT_FORK,
+        perf.RECORD_EXIT: PROC_EVENT_EXIT,
+    }
+
+    def __init__(self, cpus, mmap_pages=None):
+        self._cpus = cpus
+        self._threads = perf.thread_map()
+        evsel = perf.evsel(type=perf.TYPE_SOFTWARE,
+                           config=perf.COUNT_SW_DUMMY,
+                           task=1, comm=1, mmap=0, freq=0,
+                           wakeup_events=1, watermark=1,
+                           sample_type=perf.SAMPLE_TID | perf.SAMPLE_CPU)
+        evsel.open(cpus=self._cpus, threads=self._threads)
+        self._evlist = perf.evlist(self._cpus, self._threads)
+        self._evlist.add(evsel)
+        if mmap_pages is None:
+            self._evlist.mmap()
+        else:
+            self._evlist.mmap(pages=mmap_pages)
+        self._fds = None
+
+    def get_pollfd(self):
+        # Store the file objects so that they don't go out of scope
+        # too soon. This is a workaround for python3-perf bug rhbz#1659445.
+        self._fds = self._evlist.get_pollfd()
+        return self._fds
+
+    def read_events(self):
+        events = []
+        read_events = True
+        while read_events:
+            read_events = False
+            for cpu in self._cpus:
+                event = self._evlist.read_on_cpu(cpu)
+                if event:
+                    read_events = True
+                    what = self._perf2proc_event.get(event.type)
+                    if what is not None:
+                        events.append((what, int(event.tid)))
+        return events
+
+    def close(self):
+        for fd in self._evlist.get_pollfd():
+            os.close(fd.name)
+
+
 class SchedulerUtils(object):
     """Class encapsulating scheduler implementation in os module
     """
@@ -288,6 +324,33 @@ class SchedulerPlugin(base.Plugin):
     default_irq_smp_affinity=0,2
     ----
     ====
+    The [option]`irq_placement` option controls where *TuneD* moves
+    the IRQs when isolating cores:
+    +
+    --
+    `intersect`::
+    The affinity of each IRQ is intersected with the non-isolated
+    cores, all non-isolated cores are used if the intersection is
+    empty. This is the default.
+    `numa`::
+    The IRQs of PCI devices are moved to the non-isolated cores local
+    to the device (its `local_cpulist` in sysfs), so they stay on the
+    NUMA node of the device. All non-isolated cores are used if none
+    of them is local. Other IRQs are handled as with `intersect`.
+    `spread`::
+    Like `numa`, but the vectors of multi-queue devices (e.g. NIC or
+    NVMe queues) are spread over the local non-isolated cores, one core
+    per vector.
+    --
+    +
+    .Spread the NIC queue interrupts over the NUMA-local housekeeping cores
+    ====
+    ----
+    [scheduler]
+    isolated_cores=2-15,18-31
+    irq_placement=spread
+    ----
+    ====
     To adjust scheduling policy, priority and affinity for a group of
     processes/threads, use the following syntax.
     +
@@ -367,6 +430,22 @@ class SchedulerPlugin(base.Plugin):
     ----
     ====
     +
+    Instead of perf, the kernel proc connector can be used as the source
+    of the process events by setting the [option]`event_source` option
+    to `proc_connector`. All the exec, comm, fork and exit events are
+    then delivered through a single netlink socket, which is cheaper than
+    polling the per-CPU perf buffers on systems creating many short-lived
+    processes. The default value is `perf`. If the proc connector is not
+    available, *TuneD* falls back to perf.
+    +
+    .Using the proc connector as the source of the process events
+    ====
+    ----
+    [scheduler]
+    event_source=proc_connector
+    ----
+    ====
+    +
     NOTE: For perf events, memory mapped buffer is used. Under heavy load
     the buffer may overflow. In such cases the `scheduler` plug-in
     may start missing events and failing to process some newly created
@@ -508,6 +587,8 @@ class SchedulerPlugin(base.Plugin):
     `/sys/kernel/debug/sched/migration_cost_ns`.
     ====
     """
+    _proc_scanner = ProcScanner()
+
     def _instance_unapply_dynamic(self, instance, device):
         pass
 
@@ -536,11 +617,15 @@ class SchedulerPlugin(base.Plugin):
         self._has_dynamic_options = True
         self._daemon = consts.CFG_DEF_DAEMON
         self._sleep_interval = int(consts.CFG_DEF_SLEEP_INTERVAL)
+        self._affinity_workers = int(consts.CFG_DEF_PROCESS_AFFINITY_WORKERS)
         if global_cfg is not None:
             self._daemon = global_cfg.get_bool(
                 consts.CFG_DAEMON, consts.CFG_DEF_DAEMON)
             self._sleep_interval = int(global_cfg.get(
                 consts.CFG_SLEEP_INTERVAL, consts.CFG_DEF_SLEEP_INTERVAL))
+            self._affinity_workers = int(global_cfg.get(
+                consts.CFG_PROCESS_AFFINITY_WORKERS,
+                consts.CFG_DEF_PROCESS_AFFINITY_WORKERS))
         self._cmd = commands()
         # helper variable utilized for showing hint only once that the error may be caused by Secure Boot
         self._secure_boot_hint = None
@@ -555,6 +640,8 @@ class SchedulerPlugin(base.Plugin):
             command_name="scheduler")
         self._irq_storage_key = self._storage_key(
             command_name="irq")
+        self._irq_placement = IrqPlacement()
+        self._irq_placement_value = PLACEMENT_INTERSECT
         try:
             self._scheduler_utils = SchedulerUtils()
         except AttributeError:
@@ -593,13 +680,13 @@ class SchedulerPlugin(base.Plugin):
 
         # FIXME: do we want to do this here?
         # recover original values in case of crash
-        self._scheduler_original = self._storage.get(
-            self._scheduler_storage_key, {})
+        self._scheduler_original = SchedulerRollback(self._storage.get(
+            self._scheduler_storage_key, {}))
 
         if len(self._scheduler_original) > 0:
             log.info("recovering scheduling settings from previous run")
             self._restore_ps_affinity()
-            self._scheduler_original = {}
+            self._scheduler_original = SchedulerRollback()
             self._storage.unset(self._scheduler_storage_key)
 
         self._cgroups_original_affinity = dict()
@@ -629,28 +716,35 @@ class SchedulerPlugin(base.Plugin):
         if self._cmd.get_bool(instance._scheduler.get("runtime", 1)) == "0":
             instance.runtime_tuning = False
         instance._terminate = threading.Event()
+        instance._event_source = None
         if self._daemon and instance.runtime_tuning:
             try:
-                instance._threads = perf.thread_map()
-                evsel = perf.evsel(type=perf.TYPE_SOFTWARE,
-                                   config=perf.COUNT_SW_DUMMY,
-                                   task=1, comm=1, mmap=0, freq=0,
-                                   wakeup_events=1, watermark=1,
-                                   sample_type=perf.SAMPLE_TID | perf.SAMPLE_CPU)
-                evsel.open(cpus=self._cpus, threads=instance._threads)
-                instance._evlist = perf.evlist(self._cpus, instance._threads)
-                instance._evlist.add(evsel)
-                if perf_mmap_pages is None:
-                    instance._evlist.mmap()
-                else:
-                    instance._evlist.mmap(pages=perf_mmap_pages)
+                instance._event_source = self._create_event_source(
+                    instance._scheduler["event_source"], perf_mmap_pages)
             # no perf
             except:
                 instance.runtime_tuning = False
 
+    def _create_event_source(self, event_source, perf_mmap_pages):
+        if event_source == "proc_connector":
+            try:
+                source = ProcConnector()
+                log.info("using the proc connector as the source of process events")
+                return source
+            except (OSError, IOError) as e:
+                log.warning("unable to use the proc connector, falling back to perf: %s" % e)
+        elif event_source != "perf":
+            log.error("unknown event_source '%s', using perf" % event_source)
+        return PerfEventSource(self._cpus, perf_mmap_pages)
+
     def _instance_cleanup(self, instance):
-        for fd in instance._evlist.get_pollfd():
-            os.close(fd.name)
+        if instance._event_source is not None:
+            instance._event_source.close()
+            instance._event_source = None
+
+    @classmethod
+    def _get_tuning_resources(cls):
+        return ["irq", "sysctl"]
 
     @classmethod
     def _get_config_options(cls):
@@ -664,8 +758,10 @@ class SchedulerPlugin(base.Plugin):
             "ps_whitelist": None,
             "ps_blacklist": None,
             "default_irq_smp_affinity": "calc",
+            "irq_placement": PLACEMENT_INTERSECT,
             "perf_mmap_pages": None,
             "perf_process_fork": "false",
+            "event_source": "perf",
             "sched_min_granularity_ns": None,
             "sched_latency_ns": None,
             "sched_wakeup_granularity_ns": None,
@@ -682,39 +778,47 @@ class SchedulerPlugin(base.Plugin):
     def _sanitize_cgroup_path(value):
         return str(value).replace(".", "/") if value is not None else None
 
+    # process is a PID or a Task object
     # Raises OSError, IOError
     @staticmethod
     def _get_cmdline(process):
-        if not isinstance(process, procfs.process):
-            pid = process
-            process = procfs.process(pid)
-        cmdline = procfs.process_cmdline(process)
+        if not isinstance(process, Task):
+            process = SchedulerPlugin._proc_scanner.task(process)
+        cmdline = process.cmdline
         if SchedulerPlugin._is_kthread(process):
             cmdline = "[" + cmdline + "]"
         return cmdline
 
+    # Returns dictionary of PID -> (cmdline, Task) of all tasks,
+    # the command line is read only once per thread group
     # Raises OSError, IOError
     @staticmethod
-    def get_processes():
-        ps = procfs.pidstats()
-        ps.reload_threads()
-        processes = {}
-        for proc in ps.values():
+    def _scan_tasks():
+        tasks = {}
+        for task in SchedulerPlugin._proc_scanner.tasks():
             try:
-                cmd = SchedulerPlugin._get_cmdline(proc)
-                pid = proc["pid"]
-                processes[pid] = cmd
-                if "threads" in proc:
-                    for pid in proc["threads"].keys():
-                        cmd = SchedulerPlugin._get_cmdline(proc)
-                        processes[pid] = cmd
+                tasks[task.pid] = (SchedulerPlugin._get_cmdline(task), task)
             except (OSError, IOError) as e:
                 if e.errno == errno.ENOENT \
                         or e.errno == errno.ESRCH:
                     continue
                 else:
                     raise
-        return processes
+        return tasks
+
+    # Raises OSError, IOError
+    @staticmethod
+    def get_processes():
+        return dict([(pid, cmd) for pid, (cmd, task)
+                     in SchedulerPlugin._scan_tasks().items()])
+
+    # Returns the start time of the task or None if it vanished
+    @staticmethod
+    def _get_starttime(task):
+        try:
+            return task.starttime
+        except (OSError, IOError):
+            return None
 
     # Raises OSError
     # Raises SystemError with old (pre-0.4) python-schedutils
@@ -752,11 +856,11 @@ class SchedulerPlugin(base.Plugin):
             else:
                 log.error("Failed to set scheduling parameters of PID %d: %s" % (pid, e))
 
-    # process is a procfs.process object
+    # process is a Task object
     # Raises OSError, IOError
     @staticmethod
     def _is_kthread(process):
-        return process["stat"]["flags"] & procfs.pidstat.PF_KTHREAD != 0
+        return process.is_kthread
 
     # Return codes:
     # 0 - Affinity is fixed
@@ -766,9 +870,9 @@ class SchedulerPlugin(base.Plugin):
     @staticmethod
     def _affinity_changeable(pid):
         try:
-            process = procfs.process(pid)
-            if process["stat"].is_bound_to_cpu():
-                if process["stat"]["state"] == "Z":
+            process = SchedulerPlugin._proc_scanner.task(pid)
+            if process.is_bound_to_cpu:
+                if process.state == "Z":
                     log.debug(
                         "Affinity of zombie task with PID %d "
                         "cannot be changed, the task's affinity mask is fixed." % pid)
@@ -797,14 +901,14 @@ class SchedulerPlugin(base.Plugin):
             return -2
 
     def _store_orig_process_rt(self, pid, scheduler, priority):
-        try:
-            params = self._scheduler_original[pid]
-        except KeyError:
-            params = SchedulerParams(self._cmd)
+        with self._scheduler_original.lock:
+            params = self._scheduler_original.get(pid)
+            if params is None:
+                params = SchedulerParams()
+            if params.scheduler is None and params.priority is None:
+                params.scheduler = scheduler
+                params.priority = priority
             self._scheduler_original[pid] = params
-        if params.scheduler is None and params.priority is None:
-            params.scheduler = scheduler
-            params.priority = priority
 
     def _tune_process_rt(self, pid, sched, prio):
         cont = True
@@ -835,16 +939,16 @@ class SchedulerPlugin(base.Plugin):
         return str(affinity)[:7] == "cgroup."
 
     def _store_orig_process_affinity(self, pid, affinity, is_cgroup=False):
-        try:
-            params = self._scheduler_original[pid]
-        except KeyError:
-            params = SchedulerParams(self._cmd)
+        with self._scheduler_original.lock:
+            params = self._scheduler_original.get(pid)
+            if params is None:
+                params = SchedulerParams()
+            if params.affinity is None and params.cgroup is None:
+                if is_cgroup:
+                    params.cgroup = affinity
+                else:
+                    params.affinity = affinity
             self._scheduler_original[pid] = params
-        if params.affinity is None and params.cgroup is None:
-            if is_cgroup:
-                params.cgroup = affinity
-            else:
-                params.affinity = affinity
 
     def _get_cgroup_affinity(self, pid):
         # we cannot use procfs, because it uses comma ',' delimiter which
@@ -877,7 +981,7 @@ class SchedulerPlugin(base.Plugin):
         is_cgroup = not isinstance(cgroup, list) and len(cgroup) > 0
         return is_cgroup, cgroup
 
-    def _tune_process_affinity(self, pid, affinity, intersect=False):
+    def _tune_process_affinity(self, pid, affinity):
         cont = True
         if affinity is None:
             return cont
@@ -888,9 +992,6 @@ class SchedulerPlugin(base.Plugin):
                 self._set_cgroup(pid, cgroup)
             else:
                 prev_affinity = self._get_affinity(pid)
-                if intersect:
-                    affinity = SchedulerPlugin._get_intersect_affinity(
-                        prev_affinity, affinity, affinity)
                 self._set_affinity(pid, affinity)
             self._store_orig_process_affinity(
                 pid, prev_affinity, is_cgroup)
@@ -907,14 +1008,20 @@ class SchedulerPlugin(base.Plugin):
         return cont
 
     # tune process and store previous values
-    def _tune_process(self, pid, cmd, sched, prio, affinity):
+    def _tune_process(self, pid, cmd, sched, prio, affinity, starttime=None):
         cont = self._tune_process_rt(pid, sched, prio)
         if not cont:
             return
         cont = self._tune_process_affinity(pid, affinity)
-        if not cont or pid not in self._scheduler_original:
+        if not cont:
             return
-        self._scheduler_original[pid].cmdline = cmd
+        with self._scheduler_original.lock:
+            params = self._scheduler_original.get(pid)
+            if params is None:
+                return
+            params.cmdline = cmd
+            params.starttime = starttime
+            self._scheduler_original[pid] = params
 
     def _convert_sched_params(self, str_scheduler, str_priority):
         scheduler = self._scheduler_utils.sched_cfg_to_num(str_scheduler)
@@ -1058,7 +1165,7 @@ class SchedulerPlugin(base.Plugin):
 
         self._cgroup_set_affinity()
         try:
-            ps = SchedulerPlugin.get_processes()
+            ps = SchedulerPlugin._scan_tasks()
         except (OSError, IOError) as e:
             log.error("error applying tuning, cannot get information about running processes: %s"
                       % e)
@@ -1069,45 +1176,42 @@ class SchedulerPlugin(base.Plugin):
                if re.match(r"group\.", option)
                and len(vals) == 5]
         sched_cfg = sorted(buf, key=lambda option_vals: option_vals[1][0])
-        sched_all = dict()
-        # for runtime tuning
-        instance._sched_lookup = {}
-        for option, (rule_prio, scheduler, priority, affinity, regex) \
-                in sched_cfg:
-            try:
-                r = re.compile(regex)
-            except re.error as _:
-                log.error("error compiling regular expression: '%s'" % str(regex))
-                continue
-            processes = [(pid, cmd) for pid, cmd in ps.items() if re.search(r, cmd) is not None]
-            # cmd - process name, option - group name
-            sched = dict([(pid, (cmd, option, scheduler, priority, affinity, regex))
-                          for pid, cmd in processes])
-            sched_all.update(sched)
-            # make any contained regexes non-capturing: replace "(" with "(?:",
-            # unless the "(" is preceded by "\" or followed by "?"
-            regex = re.sub(r"(?<!\\)\((?!\?)", "(?:", str(regex))
-            instance._sched_lookup[regex] = [scheduler, priority, affinity]
-        for pid, (cmd, option, scheduler, priority, affinity, regex) \
-                in sched_all.items():
-            self._tune_process(pid, cmd, scheduler,
-                               priority, affinity)
+        # shared with the runtime tuning, the last matching group wins
+        instance._sched_matcher = RuleMatcher(
+            [(regex, (scheduler, priority, affinity))
+             for option, (rule_prio, scheduler, priority, affinity, regex) in sched_cfg])
+        if len(instance._sched_matcher) > 0:
+            for pid, (cmd, task) in ps.items():
+                v = instance._sched_matcher.match(cmd)
+                if v is not None:
+                    (scheduler, priority, affinity) = v
+                    self._tune_process(pid, cmd, scheduler,
+                                       priority, affinity,
+                                       SchedulerPlugin._get_starttime(task))
         self._storage.set(self._scheduler_storage_key,
                           self._scheduler_original)
         if self._daemon and instance.runtime_tuning:
             instance._thread = threading.Thread(target=self._thread_code, args=[instance])
             instance._thread.start()
 
-    def _restore_ps_affinity(self):
+    # if command line for the pid didn't change, it's very probably the same process,
+    # the start time (not stored by older versions) rules out the reused PIDs
+    @staticmethod
+    def _is_same_task(pid, orig_params):
+        task = SchedulerPlugin._proc_scanner.task(pid)
         try:
-            ps = SchedulerPlugin.get_processes()
-        except (OSError, IOError) as e:
-            log.error("error unapplying tuning, "
-                      "cannot get information about running processes: %s" % e)
-            return
+            if SchedulerPlugin._get_cmdline(task) != orig_params.cmdline:
+                return False
+            starttime = getattr(orig_params, "starttime", None)
+            return starttime is None or task.starttime == starttime
+        except (OSError, IOError):
+            return False
+
+    def _restore_ps_affinity(self):
+        # only the stored tasks are checked, no need to scan all processes
+        affinities = {}
         for pid, orig_params in self._scheduler_original.items():
-            # if command line for the pid didn't change, it's very probably the same process
-            if pid not in ps or ps[pid] != orig_params.cmdline:
+            if not SchedulerPlugin._is_same_task(pid, orig_params):
                 continue
             if orig_params.scheduler is not None \
                     and orig_params.priority is not None:
@@ -1116,8 +1220,15 @@ class SchedulerPlugin(base.Plugin):
             if orig_params.cgroup is not None:
                 self._set_cgroup(pid, orig_params.cgroup)
             elif orig_params.affinity is not None:
-                self._set_affinity(pid, orig_params.affinity)
-        self._scheduler_original = {}
+                affinities[pid] = orig_params.affinity
+        if affinities:
+            engine = AffinityEngine(self._scheduler_utils.get_affinity,
+                                    self._scheduler_utils.set_affinity,
+                                    self._affinity_workers)
+            stats = engine.restore(affinities)
+            log.debug("restored CPU affinity of processes: %s" % stats)
+            self._log_affinity_errors(stats)
+        self._scheduler_original = SchedulerRollback()
         self._storage.unset(self._scheduler_storage_key)
 
     def _cgroup_cleanup_tasks_one(self, cgroup):
@@ -1187,9 +1298,10 @@ class SchedulerPlugin(base.Plugin):
         ret2 = self._cgroup_verify_affinity()
         return ret1 and ret2
 
-    def _add_pid(self, instance, pid: int, r):
+    def _add_pid(self, instance, pid: int):
+        task = SchedulerPlugin._proc_scanner.task(pid)
         try:
-            cmd = SchedulerPlugin._get_cmdline(pid)
+            cmd = SchedulerPlugin._get_cmdline(task)
         except (OSError, IOError) as e:
             if e.errno == errno.ENOENT \
                     or e.errno == errno.ESRCH:
@@ -1199,11 +1311,12 @@ class SchedulerPlugin(base.Plugin):
                 log.error("Failed to get cmdline of PID %d: %s" % (pid, e))
             return
 
-        v = self._cmd.re_lookup(instance._sched_lookup, cmd, r)
+        v = instance._sched_matcher.match(cmd)
         if v is not None and pid not in self._scheduler_original:
             log.debug("tuning new process '%s' with PID '%d' by '%s'" % (cmd, pid, str(v)))
             (sched, prio, affinity) = v
-            self._tune_process(pid, cmd, sched, prio, affinity)
+            self._tune_process(pid, cmd, sched, prio, affinity,
+                               SchedulerPlugin._get_starttime(task))
             self._storage.set(self._scheduler_storage_key,
                               self._scheduler_original)
 
@@ -1214,32 +1327,39 @@ class SchedulerPlugin(base.Plugin):
             self._storage.set(self._scheduler_storage_key,
                               self._scheduler_original)
 
+    def _process_events(self, instance, events):
+        # the task may have exited by the time the batch is processed
+        exited = set(pid for what, pid in events if what == PROC_EVENT_EXIT)
+        for what, pid in events:
+            if what == PROC_EVENT_EXEC or what == PROC_EVENT_COMM or \
+                    (self._perf_process_fork_value and what == PROC_EVENT_FORK):
+                if pid not in exited:
+                    self._add_pid(instance, pid)
+            elif what == PROC_EVENT_EXIT:
+                self._remove_pid(pid)
+
+    # drop the records of the tasks which exit was not seen
+    def _cleanup_scheduler_original(self):
+        removed = self._scheduler_original.cleanup(
+            lambda pid: SchedulerPlugin._get_starttime(SchedulerPlugin._proc_scanner.task(pid)))
+        if removed > 0:
+            log.debug("removed %d exited tasks from the rollback database" % removed)
+            self._storage.set(self._scheduler_storage_key,
+                              self._scheduler_original)
+
     def _thread_code(self, instance):
-        r = self._cmd.re_lookup_compile(instance._sched_lookup)
         poll = select.poll()
-        # Store the file objects in a local variable so that they don't
-        # go out of scope too soon. This is a workaround for
-        # python3-perf bug rhbz#1659445.
-        fds = instance._evlist.get_pollfd()
-        for fd in fds:
+        for fd in instance._event_source.get_pollfd():
             poll.register(fd)
 
+        next_cleanup = time.monotonic() + consts.SCHED_ROLLBACK_CLEANUP_INTERVAL
         while not instance._terminate.is_set():
             # timeout to poll in milliseconds
             if len(poll.poll(self._sleep_interval * 1000)) > 0 and not instance._terminate.is_set():
-                read_events = True
-                while read_events:
-                    read_events = False
-                    for cpu in self._cpus:
-                        event = instance._evlist.read_on_cpu(cpu)
-                        if event:
-                            read_events = True
-                            if event.type == perf.RECORD_COMM or \
-                                    (self._perf_process_fork_value and event.type == perf.RECORD_FORK):
-                                # TODO this line unclear
-                                self._add_pid(instance, int(event.tid), r)
-                            elif event.type == perf.RECORD_EXIT:
-                                self._remove_pid(int(event.tid))
+                self._process_events(instance, instance._event_source.read_events())
+            if time.monotonic() >= next_cleanup:
+                self._cleanup_scheduler_original()
+                next_cleanup = time.monotonic() + consts.SCHED_ROLLBACK_CLEANUP_INTERVAL
 
     @command_custom("cgroup_ps_blacklist", per_device=False)
     def _cgroup_ps_blacklist(self, enabling, value, verify, ignore_missing):
@@ -1276,6 +1396,18 @@ class SchedulerPlugin(base.Plugin):
             else:
                 self._default_irq_smp_affinity_value = self._cmd.cpulist_unpack(value)
 
+    @command_custom("irq_placement", per_device=False)
+    def _irq_placement_option(self, enabling, value, verify, ignore_missing):
+        # currently unsupported
+        if verify:
+            return None
+        if enabling and value is not None:
+            if value in PLACEMENTS:
+                self._irq_placement_value = value
+            else:
+                log.error("Invalid irq_placement '%s', using '%s'" % (value, PLACEMENT_INTERSECT))
+                self._irq_placement_value = PLACEMENT_INTERSECT
+
     @command_custom("perf_process_fork", per_device=False)
     def _perf_process_fork(self, enabling, value, verify, ignore_missing):
         # currently unsupported
@@ -1318,62 +1450,56 @@ class SchedulerPlugin(base.Plugin):
             return list(aff)
         return affinity3
 
-    def _set_all_obj_affinity(self, objs, affinity, threads=False):
-        psl = [v for v in objs if re.search(
-            self._ps_whitelist, SchedulerPlugin._get_stat_comm(v)) is not None]
-        if self._ps_blacklist != "":
-            psl = [v for v in psl if re.search(
-                self._ps_blacklist, SchedulerPlugin._get_stat_comm(v)) is None]
-        if self._cgroup_ps_blacklist_re != "":
-            psl = [v for v in psl if re.search(
-                self._cgroup_ps_blacklist_re, SchedulerPlugin._get_stat_cgroup(v)) is None]
-        psd = dict([(v.pid, v) for v in psl])
-        for pid in psd:
-            try:
-                cmd = SchedulerPlugin._get_cmdline(psd[pid])
-            except (OSError, IOError) as e:
-                if e.errno == errno.ENOENT \
-                        or e.errno == errno.ESRCH:
-                    log.debug("Failed to get cmdline of PID %d, the task vanished."
-                              % pid)
-                else:
-                    log.error("Refusing to set affinity of PID %d, failed to get its cmdline: %s"
-                              % (pid, e))
-                continue
-            cont = self._tune_process_affinity(
-                pid, affinity, intersect=True)
-            if not cont:
+    def _log_affinity_errors(self, stats):
+        for (pid, affinity, e) in stats.errors:
+            if affinity is None:
+                log.error("Refusing to set CPU affinity of PID %d, reading original affinity failed: %s"
+                          % (pid, e))
                 continue
-            if pid in self._scheduler_original:
-                self._scheduler_original[pid].cmdline = cmd
-            # process threads
-            if not threads and "threads" in psd[pid]:
-                self._set_all_obj_affinity(
-                    psd[pid]["threads"].values(),
-                    affinity, True)
-
-    @staticmethod
-    def _get_stat_cgroup(o):
-        try:
-            return o["cgroups"]
-        except (OSError, IOError, KeyError):
-            return ""
-
-    @staticmethod
-    def _get_stat_comm(o):
-        try:
-            return o["stat"]["comm"]
-        except (OSError, IOError, KeyError):
-            return ""
+            res = SchedulerPlugin._affinity_changeable(pid)
+            if res == 1 or res == -2:
+                log.error("Failed to set affinity of PID %d to '%s': %s"
+                          % (pid, affinity, e))
 
     def _set_ps_affinity(self, affinity):
         try:
-            ps = procfs.pidstats()
-            ps.reload_threads()
-            self._set_all_obj_affinity(ps.values(), affinity, False)
+            task_filter = TaskFilter(self._ps_whitelist, self._ps_blacklist,
+                                     self._cgroup_ps_blacklist_re)
+        except re.error as e:
+            log.error("error applying tuning, invalid process filter: %s" % e)
+            return
+        try:
+            tasks = task_filter.select(SchedulerPlugin._proc_scanner,
+                                       ["cmdline", "starttime"])
         except (OSError, IOError) as e:
             log.error("error applying tuning, cannot get information about running processes: %s"
                       % e)
+            return
+        (is_cgroup, cgroup) = SchedulerPlugin._parse_cgroup_affinity(affinity)
+        if is_cgroup:
+            engine = AffinityEngine(self._get_cgroup_affinity, self._set_cgroup)
+            affinity = cgroup
+        else:
+            engine = AffinityEngine(self._scheduler_utils.get_affinity,
+                                    self._scheduler_utils.set_affinity,
+                                    self._affinity_workers)
+        # the identity of the tasks is read before their affinity is
+        # changed, so every changed task can be rolled back
+        identities = {}
+        for task in tasks:
+            try:
+                identities[task.pid] = (SchedulerPlugin._get_cmdline(task), task.starttime)
+            except (OSError, IOError):
+                log.debug("Failed to get cmdline of PID %d, the task vanished." % task.pid)
+        (originals, stats) = engine.apply(list(identities), affinity, intersect=True)
+        log.info("set CPU affinity of processes to '%s': %s" % (affinity, stats))
+        self._log_affinity_errors(stats)
+        for pid, prev_affinity in originals.items():
+            with self._scheduler_original.lock:
+                self._store_orig_process_affinity(pid, prev_affinity, is_cgroup)
+                params = self._scheduler_original[pid]
+                (params.cmdline, params.starttime) = identities[pid]
+                self._scheduler_original[pid] = params
 
     # Returns 0 on success, -2 if changing the affinity is not
     # supported, -1 if some other error occurs.
@@ -1414,23 +1540,28 @@ class SchedulerPlugin(base.Plugin):
             log.error("Failed to set default SMP IRQ affinity to '%s': %s"
                       % (affinity_hex, e))
 
+    # Returns dictionary of IRQ number -> Irq, empty if the interrupts cannot be read
+    def _read_irqs(self):
+        try:
+            return self._irq_placement.read()
+        except (OSError, IOError) as e:
+            log.error("Failed to read the interrupts: %s" % e)
+            return {}
+
     def _set_all_irq_affinity(self, affinity):
         irq_original = IRQAffinities()
-        irqs = procfs.interrupts()
-        for irq in irqs.keys():
-            try:
-                prev_affinity = irqs[irq]["affinity"]
-                log.debug(
-                    "Read affinity of IRQ '%s': '%s'"
-                    % (irq, prev_affinity))
-            except KeyError:
-                continue
-            _affinity = SchedulerPlugin._get_intersect_affinity(prev_affinity, affinity, affinity)
-            if set(_affinity) == set(prev_affinity):
+        irqs = self._read_irqs()
+        targets = IrqPlacement.plan(irqs, affinity, self._irq_placement_value)
+        for irq in sorted(targets):
+            prev_affinity = irqs[irq].affinity
+            log.debug("Read affinity of IRQ '%s': '%s'" % (irq, prev_affinity))
+            if targets[irq] == prev_affinity:
                 continue
-            res = self._set_irq_affinity(irq, _affinity, False)
+            res = self._set_irq_affinity(irq, targets[irq].to_list(), False)
             if res == 0:
-                irq_original.irqs[irq] = prev_affinity
+                irq_original.irqs[irq] = prev_affinity.to_list()
+                if self._irq_placement_value != PLACEMENT_INTERSECT:
+                    irq_original.targets[irq] = targets[irq].to_list()
             elif res == -2:
                 irq_original.unchangeable.append(irq)
 
@@ -1451,7 +1582,12 @@ class SchedulerPlugin(base.Plugin):
         irq_original = self._storage.get(self._irq_storage_key, None)
         if irq_original is None:
             return
+        irqs = self._read_irqs()
         for irq, affinity in irq_original.irqs.items():
+            # older versions stored the IRQ numbers as strings
+            current = irqs.get(int(irq))
+            if current is not None and current.affinity == CpuSet(affinity):
+                continue
             self._set_irq_affinity(irq, affinity, True)
         if self._default_irq_smp_affinity_value != "ignore":
             affinity = irq_original.default
@@ -1473,25 +1609,30 @@ class SchedulerPlugin(base.Plugin):
 
     def _verify_all_irq_affinity(self, correct_affinity, ignore_missing):
         irq_original = self._storage.get(self._irq_storage_key, None)
-        irqs = procfs.interrupts()
+        unchangeable = set()
+        targets = {}
+        if irq_original is not None:
+            unchangeable = set(int(irq) for irq in irq_original.unchangeable)
+            targets = getattr(irq_original, "targets", {})
+        irqs = self._read_irqs()
         res = True
-        for irq in irqs.keys():
-            if irq in irq_original.unchangeable and ignore_missing:
+        for irq in sorted(irqs):
+            if irq in unchangeable and ignore_missing:
                 description = "IRQ %s does not support changing SMP affinity" % irq
                 log.info(consts.STR_VERIFY_PROFILE_VALUE_MISSING % description)
                 continue
-            try:
-                current_affinity = irqs[irq]["affinity"]
-                log.debug("Read SMP affinity of IRQ '%s': '%s'"
-                          % (irq, current_affinity))
-                irq_description = "SMP affinity of IRQ %s" % irq
-                if not SchedulerPlugin._verify_irq_affinity(
-                        irq_description,
-                        correct_affinity,
-                        current_affinity):
-                    res = False
-            except KeyError:
+            current_affinity = irqs[irq].affinity
+            if current_affinity is None:
                 continue
+            current_affinity = current_affinity.to_list()
+            log.debug("Read SMP affinity of IRQ '%s': '%s'"
+                      % (irq, current_affinity))
+            irq_description = "SMP affinity of IRQ %s" % irq
+            if not SchedulerPlugin._verify_irq_affinity(
+                    irq_description,
+                    targets.get(irq, correct_affinity),
+                    current_affinity):
+                res = False
 
         current_affinity_hex = self._cmd.read_file(
             "/proc/irq/default_smp_affinity")
@@ -74,6 +74,10 @@ class SCSIHostPlugin(hotplug.Plugin):
     def _removed_device_unapply_tuning(self, instance, device_name):
         super(SCSIHostPlugin, self)._removed_device_unapply_tuning(instance, device_name)
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
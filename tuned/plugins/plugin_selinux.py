@@ -57,6 +57,10 @@ class SelinuxPlugin(base.Plugin):
         self._cache_threshold_path = os.path.join(self._selinux_path, "avc", "cache_threshold")
         super(SelinuxPlugin, self).__init__(*args, **kwargs)
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
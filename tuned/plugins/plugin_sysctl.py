@@ -49,6 +49,10 @@ class SysctlPlugin(base.Plugin):
         self._has_dynamic_options = True
         self._cmd = commands()
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return ["sysctl"]
+
     def _instance_init(self, instance):
         instance._has_dynamic_tuning = False
         instance._has_static_tuning = True
@@ -69,21 +73,21 @@ class SysctlPlugin(base.Plugin):
         storage_key = self._storage_key(instance.name)
         self._storage.unset(storage_key)
 
-    def _instance_apply_static(self, instance):
-        for option, value in list(instance._sysctl.items()):
-            original_value = _read_sysctl(option)
-            if original_value is None:
-                log.error("sysctl option %s will not be set, failed to read the original value."
-                          % option)
-            else:
-                new_value = self._variables.expand(
-                    self._cmd.unquote(value))
-                new_value = self._process_assignment_modifiers(
-                    new_value, original_value)
-                if new_value is not None:
-                    instance._sysctl_original[option] = original_value
-                    _write_sysctl(option, new_value)
-
+    def _apply_sysctl(self, instance, option, value):
+        original_value = _read_sysctl(option)
+        if original_value is None:
+            log.error("sysctl option %s will not be set, failed to read the original value."
+                      % option)
+        else:
+            new_value = self._variables.expand(
+                self._cmd.unquote(value))
+            new_value = self._process_assignment_modifiers(
+                new_value, original_value)
+            if new_value is not None:
+                instance._sysctl_original[option] = original_value
+                _write_sysctl(option, new_value)
+
+    def _save_sysctl_original(self, instance):
         storage_key = self._storage_key(instance.name)
         self._storage.set(storage_key, instance._sysctl_original)
 
@@ -91,6 +95,23 @@ class SysctlPlugin(base.Plugin):
             log.info("reapplying system sysctl")
             _apply_system_sysctl()
 
+    def _instance_apply_static(self, instance):
+        for option, value in list(instance._sysctl.items()):
+            self._apply_sysctl(instance, option, value)
+        self._save_sysctl_original(instance)
+
+    def _instance_update_static(self, instance, options, changed):
+        for option in reversed(list(instance._sysctl_original.keys())):
+            if option in changed:
+                _write_sysctl(option, instance._sysctl_original.pop(option))
+        instance._options = options
+        instance._sysctl = options
+        for option, value in list(instance._sysctl.items()):
+            if option in changed:
+                self._apply_sysctl(instance, option, value)
+        self._save_sysctl_original(instance)
+        return True
+
     def _instance_verify_static(self, instance, ignore_missing, devices):
         ret = True
         # override, so always skip missing
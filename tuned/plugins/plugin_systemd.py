@@ -54,6 +54,10 @@ class SystemdPlugin(base.Plugin):
     def _instance_cleanup(self, instance):
         pass
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -46,6 +46,10 @@ class USBPlugin(base.Plugin):
     def _get_device_objects(self, devices):
         return [self._hardware_inventory.get_device("usb", x) for x in devices]
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -38,6 +38,10 @@ class VMPlugin(base.Plugin):
     def _instance_update_dynamic(self, instance, device):
         pass
 
+    @classmethod
+    def _get_tuning_resources(cls):
+        return []
+
     @classmethod
     def _get_config_options(cls):
         return {
@@ -0,0 +1,92 @@
+import sys
+
+from tuned.storage import TrackedDict
+from tuned.utils.commands import commands
+
+__all__ = ["SchedulerParams", "SchedulerRollback"]
+
+
+class SchedulerParams(object):
+    """
+    Original scheduling parameters of a tuned task.
+
+    The records have no instance dictionary, the affinity is kept as an
+    integer bitmask and the command lines are interned, so the threads
+    of a process share one string. The start time of the task tells
+    apart tasks with the same reused PID.
+    """
+
+    __slots__ = ["_cmdline", "starttime", "scheduler", "priority",
+                 "_affinity", "cgroup"]
+
+    def __init__(self, cmdline=None, scheduler=None, priority=None,
+                 affinity=None, cgroup=None, starttime=None):
+        self.cmdline = cmdline
+        self.starttime = starttime
+        self.scheduler = scheduler
+        self.priority = priority
+        self.affinity = affinity
+        self.cgroup = cgroup
+
+    @property
+    def cmdline(self):
+        return self._cmdline
+
+    @cmdline.setter
+    def cmdline(self, value):
+        self._cmdline = sys.intern(value) if isinstance(value, str) else value
+
+    @property
+    def affinity(self):
+        if self._affinity is None:
+            return None
+        else:
+            return commands.bitmask2cpulist(self._affinity)
+
+    @affinity.setter
+    def affinity(self, value):
+        if value is None:
+            self._affinity = None
+        else:
+            self._affinity = commands.cpulist2bitmask(value)
+
+    # the same keys as the instance dictionary of older versions had
+    _state = ["cmdline", "starttime", "scheduler", "priority", "_affinity", "cgroup"]
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self._state)
+
+    def __setstate__(self, state):
+        # older versions also stored a reference to the commands
+        # object and had no start time
+        for name in self._state:
+            setattr(self, name, state.get(name))
+
+
+class SchedulerRollback(TrackedDict):
+    """
+    Rollback database of the scheduler plugin, maps PIDs to SchedulerParams.
+
+    The changed PIDs are recorded for the storage, the records modified in
+    place are set again with the lock held.
+
+    The exit events of the tasks can be lost (e.g. on a buffer overflow),
+    so the records of the exited tasks and of the tasks replaced by ones
+    with reused PIDs are periodically dropped by cleanup().
+    """
+
+    def cleanup(self, get_starttime):
+        """
+        Drop the records of the exited tasks, get_starttime(pid) returns
+        the start time of the running task or None if there is no such
+        task. Returns the number of dropped records.
+        """
+        stale = []
+        for pid, params in self.items():
+            starttime = get_starttime(pid)
+            if starttime is None or (params.starttime is not None
+                                     and params.starttime != starttime):
+                stale.append(pid)
+        for pid in stale:
+            del self[pid]
+        return len(stale)
@@ -0,0 +1,40 @@
+import os
+import threading
+
+class FileCache(object):
+	"""
+	Cache of data parsed from files.
+
+	An entry is valid while the file keeps its inode, size and
+	modification time, so only one stat() is needed for a cache hit.
+	"""
+
+	def __init__(self):
+		self._entries = {}
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def stamp(file_name):
+		st = os.stat(file_name)
+		return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+	def get(self, file_name, parse):
+		"""
+		Return (stamp, data) for the file, the data are parsed
+		by parse(file_name) if the file is not cached or changed.
+		"""
+		# stat before reading, a change done during the parsing
+		# invalidates the entry the next time
+		stamp = self.stamp(file_name)
+		with self._lock:
+			entry = self._entries.get(file_name)
+		if entry is not None and entry[0] == stamp:
+			return entry
+		entry = (stamp, parse(file_name))
+		with self._lock:
+			self._entries[file_name] = entry
+		return entry
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
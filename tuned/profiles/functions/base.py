@@ -8,6 +8,10 @@ class Function(object):
 	"""
 	Built-in function
 	"""
+	# pure functions depend only on their arguments, their results
+	# can be cached
+	pure = False
+
 	def __init__(self, name, nargs_max, nargs_min = None):
 		self._name = name
 		self._nargs_max = nargs_max
@@ -2,6 +2,7 @@ import os
 import tuned.logs
 from . import base
 from tuned.utils.commands import commands
+from tuned.utils.cpuset import CpuSet
 
 log = tuned.logs.get()
 
@@ -17,6 +18,6 @@ class cpulist_online(base.Function):
 	def execute(self, args):
 		if not super(cpulist_online, self).execute(args):
 			return None
-		cpus = self._cmd.cpulist_unpack(",".join(args))
-		online = self._cmd.cpulist_unpack(self._cmd.read_file("/sys/devices/system/cpu/online"))
-		return ",".join(str(v) for v in cpus if v in online)
+		cpus = CpuSet.parse(",".join(args))
+		online = CpuSet.parse(self._cmd.read_file("/sys/devices/system/cpu/online"))
+		return ",".join(str(v) for v in cpus & online)
@@ -11,6 +11,8 @@ class cpulist_pack(base.Function):
 	The cpulist_unpack is used as a preprocessor, so it always returns
 	optimal results. For details about input syntax see cpulist_unpack.
 	"""
+	pure = True
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist_pack, self).__init__("cpulist_pack", 0)
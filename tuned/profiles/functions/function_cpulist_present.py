@@ -2,6 +2,7 @@ import os
 import tuned.logs
 from . import base
 from tuned.utils.commands import commands
+from tuned.utils.cpuset import CpuSet
 
 log = tuned.logs.get()
 
@@ -17,6 +18,6 @@ class cpulist_present(base.Function):
 	def execute(self, args):
 		if not super(cpulist_present, self).execute(args):
 			return None
-		cpus = self._cmd.cpulist_unpack(",,".join(args))
-		present = self._cmd.cpulist_unpack(self._cmd.read_file("/sys/devices/system/cpu/present"))
-		return ",".join(str(v) for v in sorted(list(set(cpus).intersection(set(present)))))
+		cpus = CpuSet.parse(",,".join(args))
+		present = CpuSet.parse(self._cmd.read_file("/sys/devices/system/cpu/present"))
+		return ",".join(str(v) for v in cpus & present)
@@ -9,6 +9,8 @@ class cpulist_unpack(base.Function):
 	"""
 	Conversion function: unpacks CPU list in form 1-3,4 to 1,2,3,4
 	"""
+	pure = True
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist_unpack, self).__init__("cpulist_unpack", 0)
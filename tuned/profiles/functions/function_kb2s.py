@@ -7,6 +7,8 @@ class kb2s(base.Function):
 	"""
 	Conversion function: kbytes to sectors
 	"""
+	pure = True
+
 	def __init__(self):
 		# 1 argument
 		super(kb2s, self).__init__("kb2s", 1, 1)
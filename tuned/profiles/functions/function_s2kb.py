@@ -7,6 +7,8 @@ class s2kb(base.Function):
 	"""
 	Conversion function: sectors to kbytes
 	"""
+	pure = True
+
 	def __init__(self):
 		# 1 argument
 		super(s2kb, self).__init__("s2kb", 1, 1)
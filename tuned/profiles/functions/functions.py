@@ -1,6 +1,7 @@
 import os
 import re
 import glob
+import threading
 from . import repository
 import tuned.logs
 import tuned.consts as consts
@@ -10,81 +11,124 @@ log = tuned.logs.get()
 
 cmd = commands()
 
+class _Call(object):
+	"""
+	Parsed ${...} construct, parts are strings and nested calls
+	"""
+	__slots__ = ["esc", "parts"]
+
+	def __init__(self, esc, parts):
+		self.esc = esc
+		self.parts = parts
+
 class Functions():
 	"""
 	Built-in functions
+
+	Strings are parsed into a tree of literal parts and calls only once,
+	the parsed templates are cached. Results of pure functions (functions
+	that depend only on their arguments) are cached by the arguments.
 	"""
 
-	def __init__(self):
+	def __init__(self, cache_size = consts.FUNCTIONS_CACHE_SIZE):
 		self._repository = repository.Repository()
-		self._parse_init()
+		self._cache_size = cache_size
+		self._templates = {}
+		self._results = {}
+		# functions can be expanded from plugin instances tuned in parallel
+		self._lock = threading.Lock()
 
-	def _parse_init(self, s = ""):
-		self._cnt = 0
-		self._str = s
-		self._len = len(s)
-		self._stack = []
-		self._esc = False
+	def _cache_put(self, cache, key, value):
+		if len(cache) >= self._cache_size:
+			cache.clear()
+		cache[key] = value
 
-	def _curr_char(self):
-		return self._str[self._cnt] if self._cnt < self._len else ""
+	def _parse(self, s):
+		root = []
+		parts = root
+		stack = []
+		esc = False
+		start = 0
+		i = 0
+		l = len(s)
+		while i < l:
+			c = s[i]
+			if c == "}":
+				if not stack:
+					log.error("invalid variable syntax, non pair '}' in: '%s'" % s)
+					break
+				parts.append(s[start:i + 1])
+				start = i + 1
+				(call_esc, parent) = stack.pop()
+				parent.append(_Call(call_esc, parts))
+				parts = parent
+			elif s.startswith("${", i):
+				parts.append(s[start:i])
+				start = i
+				stack.append((esc, parts))
+				parts = []
+			esc = c == "\\"
+			i += 1
+		parts.append(s[start:])
+		if len(stack):
+			log.error("invalid varialbe syntax, non pair '{' in: '%s'" % s)
+			# unpaired calls are left unexpanded
+			while stack:
+				(call_esc, parent) = stack.pop()
+				parent.extend(parts)
+				parts = parent
+		return [p for p in root if not isinstance(p, str) or p != ""]
 
-	def _curr_substr(self, _len):
-		return self._str[self._cnt:self._cnt + _len]
+	def _template(self, s):
+		parts = self._templates.get(s)
+		if parts is None:
+			parts = self._parse(s)
+			self._cache_put(self._templates, s, parts)
+		return parts
 
-	def _push_pos(self, esc):
-		self._stack.append((esc, self._cnt))
+	def _evaluate(self, parts):
+		return "".join(p if isinstance(p, str) else self._evaluate_call(p) for p in parts)
 
-	def _sub(self, a, b, s):
-		self._str = self._str[:a] + s + self._str[b + 1:]
-		self._len = len(self._str)
-		self._cnt += len(s) - (b - a + 1)
-		if self._cnt < 0:
-			self._cnt = 0
+	def _evaluate_call(self, call):
+		s = self._evaluate(call.parts)
+		if call.esc:
+			return s
+		# the call string without the trailing '}'
+		v = self._process_func(s[:-1])
+		return s if v is None else v
+
+	def _execute(self, name, f, args):
+		if not getattr(f, "pure", False):
+			return f.execute(args)
+		key = (name, tuple(args))
+		try:
+			return self._results[key]
+		except KeyError:
+			pass
+		v = f.execute(args)
+		if v is not None:
+			self._cache_put(self._results, key, v)
+		return v
 
-	def _process_func(self, _from):
-		sl = re.split(r'(?<!\\):', self._str[_from:self._cnt])
+	def _process_func(self, s):
+		sl = re.split(r'(?<!\\):', s)
 		if sl[0] != "${f":
-			return
+			return None
 		sl = [str(v).replace("\:", ":") for v in sl]
 		if not re.match(r'\w+$', sl[1]):
 			log.error("invalid function name '%s'" % sl[1])
-			return
+			return None
 		try:
 			f = self._repository.load_func(sl[1])
 		except ImportError:
 			log.error("function '%s' not implemented" % sl[1])
-			return
-		s = f.execute(sl[2:])
-		if s is None:
-			return
-		self._sub(_from, self._cnt, s)
-
-	def _process(self, s):
-		self._parse_init(s)
-		while self._cnt < self._len:
-			if self._curr_char() == "}":
-				try:
-					si = self._stack.pop()
-				except IndexError:
-					log.error("invalid variable syntax, non pair '}' in: '%s'" % s)
-					return self._str
-				# if not escaped
-				if not si[0]:
-					self._process_func(si[1])
-			elif self._curr_substr(2) == "${":
-				self._push_pos(self._esc)
-			if self._curr_char() == "\\":
-				self._esc = True
-			else:
-				self._esc = False
-			self._cnt += 1
-		if len(self._stack):
-			log.error("invalid varialbe syntax, non pair '{' in: '%s'" % s)
-		return self._str
+			return None
+		return self._execute(sl[1], f, sl[2:])
 
 	def expand(self, s):
 		if s is None or s == "":
 			return s
 		# expand functions and convert all \${f:*} to ${f:*} (unescape)
-		return re.sub(r'\\(\${f:.*})', r'\1', self._process(s))
+		with self._lock:
+			s = self._evaluate(self._template(s))
+		return re.sub(r'\\(\${f:.*})', r'\1', s)
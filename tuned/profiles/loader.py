@@ -4,18 +4,24 @@ from tuned.utils.config_parser import ConfigParser, Error
 import tuned.consts as consts
 import os.path
 import collections
+import copy
 import tuned.logs
 import re
 from tuned.profiles.exceptions import InvalidProfileException
+from tuned.profiles.file_cache import FileCache
 
 log = tuned.logs.get()
 
 class Loader(object):
 	"""
 	Profiles loader.
+
+	Parsed configuration files are cached while the files do not change,
+	merged profiles are cached for the include chain they were built from.
 	"""
 
-	__slots__ = ["_profile_locator", "_profile_merger", "_profile_factory", "_global_config", "_variables"]
+	__slots__ = ["_profile_locator", "_profile_merger", "_profile_factory", "_global_config", "_variables",
+		"_config_cache", "_profiles_cache"]
 
 	def __init__(self, profile_locator, profile_factory, profile_merger, global_config, variables):
 		self._profile_locator = profile_locator
@@ -23,6 +29,8 @@ class Loader(object):
 		self._profile_merger = profile_merger
 		self._global_config = global_config
 		self._variables = variables
+		self._config_cache = FileCache()
+		self._profiles_cache = {}
 
 	def _create_profile(self, profile_name, config):
 		return tuned.profiles.profile.Profile(profile_name, config)
@@ -47,14 +55,26 @@ class Loader(object):
 			log.info("loading profiles: %s" % ", ".join(profile_names))
 		else:
 			log.info("loading profile: %s" % profile_names[0])
-		profiles = []
+		chain = []
 		processed_files = []
-		self._load_profile(profile_names, profiles, processed_files)
-
-		if len(profiles) > 1:
-			final_profile = self._profile_merger.merge(profiles)
+		self._load_profile(profile_names, chain, processed_files)
+
+		# the chain consists of the names, files and file stamps of all
+		# loaded profiles, so a change of a file or of an include
+		# invalidates the cached merged profile
+		chain_key = tuple((name, filename, stamp) for (name, filename, stamp, config) in chain)
+		cache_key = tuple(profile_names)
+		cached = self._profiles_cache.get(cache_key)
+		if cached is not None and cached[0] == chain_key:
+			merged_profile = cached[1]
 		else:
-			final_profile = profiles[0]
+			profiles = [self._create_chain_profile(name, config) for (name, filename, stamp, config) in chain]
+			if len(profiles) > 1:
+				merged_profile = self._profile_merger.merge(profiles)
+			else:
+				merged_profile = profiles[0]
+			self._profiles_cache[cache_key] = (chain_key, merged_profile)
+		final_profile = copy.deepcopy(merged_profile)
 
 		final_profile.name = " ".join(profile_names)
 		if "variables" in final_profile.units:
@@ -74,7 +94,14 @@ class Loader(object):
 			profile.units[unit].cpuinfo_regex = self._variables.expand(profile.units[unit].cpuinfo_regex)
 			profile.units[unit].uname_regex = self._variables.expand(profile.units[unit].uname_regex)
 
-	def _load_profile(self, profile_names, profiles, processed_files):
+	def _create_chain_profile(self, name, config):
+		# units take their options from the config, the cached one
+		# must stay intact
+		profile = self._profile_factory.create(name, copy.deepcopy(config))
+		profile.options.pop("include", None)
+		return profile
+
+	def _load_profile(self, profile_names, chain, processed_files):
 		for name in profile_names:
 			filename = self._profile_locator.get_config(name, processed_files)
 			if filename == "":
@@ -83,13 +110,13 @@ class Loader(object):
 				raise InvalidProfileException("Cannot find profile '%s' in '%s'." % (name, list(reversed(self._profile_locator._load_directories))))
 			processed_files.append(filename)
 
-			config = self._load_config_data(filename)
-			profile = self._profile_factory.create(name, config)
-			if "include" in profile.options:
-				include_names = re.split(r"\s*[,;]\s*", self._variables.expand(profile.options.pop("include")))
-				self._load_profile(include_names, profiles, processed_files)
+			(stamp, config) = self._config_cache.get(filename, self._load_config_data)
+			include = config.get(consts.PLUGIN_MAIN_UNIT_NAME, {}).get("include")
+			if include is not None:
+				include_names = re.split(r"\s*[,;]\s*", self._variables.expand(include))
+				self._load_profile(include_names, chain, processed_files)
 
-			profiles.append(profile)
+			chain.append((name, filename, stamp, config))
 
 	def _expand_profile_dir(self, profile_dir, string):
 		return re.sub(r'(?<!\\)\$\{i:PROFILE_DIR\}', profile_dir, string)
@@ -1,18 +1,20 @@
 import os
 import tuned.consts as consts
 from tuned.utils.config_parser import ConfigParser, Error
+from tuned.profiles.file_cache import FileCache
 
 class Locator(object):
 	"""
 	Profiles locator and enumerator.
 	"""
 
-	__slots__ = ["_load_directories"]
+	__slots__ = ["_load_directories", "_config_cache"]
 
 	def __init__(self, load_directories):
 		if type(load_directories) is not list:
 			raise TypeError("load_directories parameter is not a list")
 		self._load_directories = load_directories
+		self._config_cache = FileCache()
 
 	@property
 	def load_directories(self):
@@ -55,14 +57,18 @@ class Locator(object):
 		if config_file is None:
 			return None
 		try:
-			config = ConfigParser(delimiters=('='), inline_comment_prefixes=('#'), allow_no_value=True)
-			config.optionxform = str
-			with open(config_file) as f:
-				config.read_string("[" + consts.MAGIC_HEADER_NAME + "]\n" + f.read())
-			return config
+			# the parsed config is shared by all callers, it must not be modified
+			return self._config_cache.get(config_file, self._parse_config_file)[1]
 		except (IOError, OSError, Error) as e:
 			return None
 
+	def _parse_config_file(self, config_file):
+		config = ConfigParser(delimiters=('='), inline_comment_prefixes=('#'), allow_no_value=True)
+		config.optionxform = str
+		with open(config_file) as f:
+			config.read_string("[" + consts.MAGIC_HEADER_NAME + "]\n" + f.read())
+		return config
+
 	# Get profile attributes (e.g. summary, description), attrs is list of requested attributes,
 	# if it is not list it is converted to list, defvals is list of default values to return if
 	# attribute is not found, it is also converted to list if it is not list.
@@ -11,12 +11,20 @@ log = tuned.logs.get()
 class Variables():
 	"""
 	Storage and processing of variables used in profiles
+
+	Variables are resolved by a single regex and a dictionary lookup,
+	results of static expansion are memoized until a variable changes.
 	"""
 
+	# variables referenced by ${VAR}, $ can be escaped by backslash,
+	# i.e. the following will not expand: \${VAR}
+	_variable_re = re.compile(r'(?<!\\)\${(\w+)}')
+
 	def __init__(self):
 		self._cmd = commands()
-		self._lookup_re = {}
+		self._lookup = {}
 		self._lookup_env = {}
+		self._expand_cache = {}
 		self._functions = functions.Functions()
 
 	def _add_env_prefix(self, s, prefix):
@@ -35,9 +43,8 @@ class Variables():
 			log.error("variable definition '%s' contains unallowed characters" % variable)
 			return
 		v = self.expand(value)
-		# variables referenced by ${VAR}, $ can be escaped by two $,
-		# i.e. the following will not expand: $${VAR}
-		self._lookup_re[r'(?<!\\)\${' + re.escape(s) + r'}'] = v
+		self._lookup[s] = v
+		self._expand_cache.clear()
 		self._lookup_env[self._add_env_prefix(s, consts.ENV_PREFIX)] = v
 
 	def add_from_file(self, filename):
@@ -65,7 +72,18 @@ class Variables():
 
 	# expand static variables (no functions)
 	def expand_static(self, value):
-		return re.sub(r'\\(\${\w+})', r'\1', self._cmd.multiple_re_replace(self._lookup_re, value))
+		try:
+			return self._expand_cache[value]
+		except KeyError:
+			pass
+		s = value
+		if self._lookup:
+			s = self._variable_re.sub(lambda mo: self._lookup.get(mo.group(1), mo.group(0)), s)
+		s = re.sub(r'\\(\${\w+})', r'\1', s)
+		if len(self._expand_cache) >= consts.FUNCTIONS_CACHE_SIZE:
+			self._expand_cache.clear()
+		self._expand_cache[value] = s
+		return s
 
 	def expand(self, value):
 		if value is None:
@@ -1,3 +1,6 @@
 from tuned.storage.storage import Storage
 from tuned.storage.factory import Factory
 from tuned.storage.pickle_provider import PickleProvider
+from tuned.storage.write_behind_provider import WriteBehindProvider
+from tuned.storage.journal_provider import JournalProvider
+from tuned.storage.tracked_dict import TrackedDict
@@ -3,6 +3,10 @@ class Factory(object):
 		raise NotImplementedError()
 
 class Provider(object):
+	# the data survive the restart of the daemon, they are loaded at
+	# startup and saved on shutdown
+	persistent = False
+
 	def set(self, namespace, option, value):
 		raise NotImplementedError()
 
@@ -20,3 +24,7 @@ class Provider(object):
 
 	def save(self):
 		raise NotImplementedError()
+
+	def shutdown(self):
+		if self.persistent:
+			self.save()
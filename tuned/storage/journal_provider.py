@@ -0,0 +1,256 @@
+from . import interfaces
+from .tracked_dict import TrackedDict
+import tuned.logs
+import collections
+import pickle
+import os
+import struct
+import threading
+import tuned.consts as consts
+
+log = tuned.logs.get()
+
+class JournalProvider(interfaces.Provider):
+	"""
+	Storage provider recording the changes to an append-only journal.
+
+	Every record is a pickled tuple prefixed by its length. Changed
+	options are appended by a timer flush_interval seconds after the first
+	change, or by save(). For TrackedDict values (e.g. the per-process roll
+	back map) set again only the items of the keys recorded by the
+	dictionary are written, so the journal grows by O(change) instead of
+	O(total state). Other values are written as a whole. When the journal
+	grows much larger than the live data, it is compacted into a snapshot
+	written to a temporary file and renamed.
+	load() replays the journal, a truncated last record is ignored.
+	"""
+
+	persistent = True
+
+	__slots__ = ["_path", "_flush_interval", "_data", "_dirty", "_tracked",
+		"_timer", "_lock", "_file", "_records", "_live"]
+
+	_length = struct.Struct("=I")
+	# compact when the journal has more than this many records and at
+	# least twice as many records as live values
+	_compact_min_records = 1024
+
+	def __init__(self, path=None, flush_interval=None):
+		if path is None:
+			path = consts.DEFAULT_STORAGE_JOURNAL
+		if flush_interval is None:
+			flush_interval = consts.CFG_DEF_STORAGE_FLUSH_INTERVAL
+		self._path = path
+		self._flush_interval = flush_interval
+		self._data = {}
+		# (namespace, option) changed since the last flush
+		self._dirty = collections.OrderedDict()
+		# (namespace, option) -> TrackedDict recorded as a whole, its later
+		# changes are recorded per item
+		self._tracked = {}
+		self._timer = None
+		self._lock = threading.Lock()
+		self._file = None
+		self._records = 0
+		self._live = 0
+
+	def _mark_dirty(self, namespace, option):
+		self._dirty[(namespace, option)] = None
+		if self._flush_interval <= 0:
+			self._flush()
+		elif self._timer is None:
+			self._timer = threading.Timer(self._flush_interval, self._flush_timer)
+			self._timer.daemon = True
+			self._timer.start()
+
+	def _cancel_flush(self):
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+
+	def _flush_timer(self):
+		with self._lock:
+			self._timer = None
+			self._flush()
+
+	def _close_file(self):
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+
+	def _open_file(self):
+		if self._file is None:
+			directory = os.path.dirname(self._path)
+			if directory and not os.path.isdir(directory):
+				os.makedirs(directory)
+			self._file = open(self._path, "ab")
+		return self._file
+
+	def _pack(self, record):
+		data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+		return self._length.pack(len(data)) + data
+
+	def _pack_set(self, namespace, option, value):
+		if isinstance(value, TrackedDict):
+			with value.lock:
+				return self._pack(("set", namespace, option, value))
+		return self._pack(("set", namespace, option, value))
+
+	def _delta(self, namespace, option):
+		options = self._data.get(namespace, {})
+		key = (namespace, option)
+		if option not in options:
+			self._tracked.pop(key, None)
+			return [self._pack(("unset", namespace, option))]
+		value = options[option]
+		if not isinstance(value, TrackedDict):
+			self._tracked.pop(key, None)
+			return [self._pack(("set", namespace, option, value))]
+		with value.lock:
+			(reset, keys) = value.take_changes()
+			if reset or self._tracked.get(key) is not value:
+				self._tracked[key] = value
+				return [self._pack(("set", namespace, option, value))]
+			return [self._pack(("set_item", namespace, option, k, value[k])) if k in value
+				else self._pack(("unset_item", namespace, option, k)) for k in keys]
+
+	def _flush(self):
+		dirty = self._dirty
+		self._dirty = collections.OrderedDict()
+		chunks = []
+		for (namespace, option) in dirty:
+			try:
+				chunks.extend(self._delta(namespace, option))
+			except RuntimeError:
+				# dictionary changed size during iteration
+				self._dirty[(namespace, option)] = None
+			except (pickle.PicklingError, TypeError, AttributeError) as e:
+				# the taken changes are lost, record the value as a whole next time
+				self._tracked.pop((namespace, option), None)
+				log.error("Error saving value of '%s' in namespace '%s': %s" % (option, namespace, e))
+		if len(chunks) > 0:
+			try:
+				f = self._open_file()
+				f.write(b"".join(chunks))
+				f.flush()
+			except (OSError, IOError) as e:
+				log.error("Error writing storage journal '%s': %s" % (self._path, e))
+			self._records += len(chunks)
+		if len(self._dirty) > 0 and self._flush_interval > 0:
+			self._timer = threading.Timer(self._flush_interval, self._flush_timer)
+			self._timer.daemon = True
+			self._timer.start()
+		self._live = self._count_live()
+		if self._records > max(self._compact_min_records, 2 * self._live):
+			self._compact()
+
+	def _count_live(self):
+		return sum(len(value) if isinstance(value, dict) else 1
+			for options in self._data.values() for value in options.values())
+
+	def _compact(self):
+		self._close_file()
+		tmp_path = self._path + ".tmp"
+		records = 0
+		try:
+			with open(tmp_path, "wb") as f:
+				for namespace, options in self._data.items():
+					for option, value in options.items():
+						f.write(self._pack_set(namespace, option, value))
+						records += 1
+			os.rename(tmp_path, self._path)
+		except (OSError, IOError, pickle.PicklingError, RuntimeError) as e:
+			log.error("Error compacting storage journal '%s': %s" % (self._path, e))
+			return
+		self._records = records
+
+	def _replay(self, record):
+		op = record[0]
+		if op == "set":
+			self._data.setdefault(record[1], {})[record[2]] = record[3]
+		elif op == "unset":
+			self._data.get(record[1], {}).pop(record[2], None)
+		elif op == "set_item":
+			options = self._data.setdefault(record[1], {})
+			if not isinstance(options.get(record[2]), dict):
+				options[record[2]] = {}
+			options[record[2]][record[3]] = record[4]
+		elif op == "unset_item":
+			value = self._data.get(record[1], {}).get(record[2])
+			if isinstance(value, dict):
+				value.pop(record[3], None)
+
+	def set(self, namespace, option, value):
+		with self._lock:
+			self._data.setdefault(namespace, {})
+			self._data[namespace][option] = value
+			self._mark_dirty(namespace, option)
+
+	def get(self, namespace, option, default=None):
+		with self._lock:
+			return self._data.get(namespace, {}).get(option, default)
+
+	def unset(self, namespace, option):
+		with self._lock:
+			if option in self._data.get(namespace, {}):
+				del self._data[namespace][option]
+				self._mark_dirty(namespace, option)
+
+	def save(self):
+		with self._lock:
+			self._cancel_flush()
+			self._flush()
+			self._cancel_flush()
+			self._dirty.clear()
+			self._close_file()
+
+	def load(self):
+		with self._lock:
+			self._cancel_flush()
+			self._close_file()
+			self._data = {}
+			self._dirty = collections.OrderedDict()
+			self._tracked = {}
+			self._records = 0
+			try:
+				with open(self._path, "rb") as f:
+					buf = f.read()
+			except (OSError, IOError) as e:
+				log.debug("Error loading storage journal '%s': %s" % (self._path, e))
+				buf = b""
+			offset = 0
+			while offset + self._length.size <= len(buf):
+				(length,) = self._length.unpack_from(buf, offset)
+				end = offset + self._length.size + length
+				if end > len(buf):
+					break
+				try:
+					record = pickle.loads(buf[offset + self._length.size:end])
+				except Exception as e:
+					log.error("Error loading storage journal '%s': %s" % (self._path, e))
+					break
+				self._replay(record)
+				self._records += 1
+				offset = end
+			if offset < len(buf):
+				log.info("ignoring %d trailing byte(s) of the storage journal '%s'"
+					% (len(buf) - offset, self._path))
+			self._data = dict((namespace, options) for namespace, options in self._data.items()
+				if len(options) > 0)
+			live = self._count_live()
+			if offset < len(buf) or self._records > max(self._compact_min_records, 2 * live):
+				# start from a clean snapshot, drops also a truncated record
+				self._compact()
+
+	def clear(self):
+		with self._lock:
+			self._cancel_flush()
+			self._close_file()
+			self._data.clear()
+			self._dirty.clear()
+			self._tracked.clear()
+			self._records = 0
+			try:
+				os.unlink(self._path)
+			except (OSError, IOError) as e:
+				log.debug("Error removing storage journal '%s': %s" % (self._path, e))
@@ -0,0 +1,88 @@
+import threading
+
+class TrackedDict(dict):
+	"""
+	Dictionary recording which keys were set or deleted, so the storage
+	providers can persist only the changed items of large roll back maps.
+
+	The keys are recorded once a provider started to take the changes by
+	take_changes(), before that the whole dictionary is considered changed.
+	Values modified in place are not seen, their key has to be set again.
+	The owner holds the lock while modifying the values in place, the
+	providers hold it while taking the changes and pickling the values, so
+	they never see a half-updated value. The storage must not be called
+	with the lock held.
+	"""
+
+	__slots__ = ["lock", "_changed", "_reset"]
+
+	def __new__(cls, *args, **kwargs):
+		# the pickled dictionaries are restored without calling __init__
+		self = super(TrackedDict, cls).__new__(cls, *args, **kwargs)
+		self.lock = threading.RLock()
+		self._changed = None
+		self._reset = True
+		return self
+
+	def __reduce__(self):
+		with self.lock:
+			return (self.__class__, (dict(self),))
+
+	def _record(self, key):
+		if self._changed is not None:
+			self._changed.add(key)
+
+	def __setitem__(self, key, value):
+		with self.lock:
+			super(TrackedDict, self).__setitem__(key, value)
+			self._record(key)
+
+	def __delitem__(self, key):
+		with self.lock:
+			super(TrackedDict, self).__delitem__(key)
+			self._record(key)
+
+	def pop(self, key, *args):
+		with self.lock:
+			self._record(key)
+			return super(TrackedDict, self).pop(key, *args)
+
+	def popitem(self):
+		with self.lock:
+			(key, value) = super(TrackedDict, self).popitem()
+			self._record(key)
+			return (key, value)
+
+	def setdefault(self, key, default=None):
+		with self.lock:
+			if key not in self:
+				self._record(key)
+			return super(TrackedDict, self).setdefault(key, default)
+
+	def update(self, *args, **kwargs):
+		with self.lock:
+			for (key, value) in dict(*args, **kwargs).items():
+				self[key] = value
+
+	def __ior__(self, other):
+		self.update(other)
+		return self
+
+	def clear(self):
+		with self.lock:
+			super(TrackedDict, self).clear()
+			self._reset = True
+			if self._changed is not None:
+				self._changed = set()
+
+	def take_changes(self):
+		"""
+		Return tuple (reset, keys), reset is True if the whole dictionary
+		changed, keys is the set of the keys set or deleted since the last
+		call. Starts recording the changed keys.
+		"""
+		with self.lock:
+			changes = (self._reset, self._changed or set())
+			self._reset = False
+			self._changed = set()
+			return changes
@@ -0,0 +1,155 @@
+from . import interfaces
+from .tracked_dict import TrackedDict
+import tuned.logs
+import contextlib
+import pickle
+import os
+import threading
+import tuned.consts as consts
+from urllib.parse import quote, unquote
+
+log = tuned.logs.get()
+
+class WriteBehindProvider(interfaces.Provider):
+	"""
+	Storage provider persisting each namespace to its own pickle file.
+
+	Changes are kept in memory and only mark their namespace dirty. The
+	dirty namespaces are written by a timer flush_interval seconds after
+	the first change, or by save(). Every file is written to a temporary
+	file first and renamed, so a crash never leaves a partially written
+	namespace behind. With flush_interval 0 every change is written
+	immediately. The namespaces are percent-encoded in the file names.
+
+	The namespaces are pickled with the locks of their TrackedDict values
+	held, so the roll back maps modified by the plugin threads are written
+	consistently. Every flush pickles the dirty namespaces as a whole, at
+	most once per flush_interval however many changes were made; the
+	JournalProvider writes only the changed items.
+	"""
+
+	persistent = True
+
+	__slots__ = ["_path", "_flush_interval", "_data", "_dirty", "_timer", "_lock"]
+
+	_suffix = ".pickle"
+
+	def __init__(self, path=None, flush_interval=None):
+		if path is None:
+			path = consts.DEFAULT_STORAGE_DIR
+		if flush_interval is None:
+			flush_interval = consts.CFG_DEF_STORAGE_FLUSH_INTERVAL
+		self._path = path
+		self._flush_interval = flush_interval
+		self._data = {}
+		self._dirty = set()
+		self._timer = None
+		self._lock = threading.Lock()
+
+	def _namespace_path(self, namespace):
+		return os.path.join(self._path, quote(namespace, safe="") + self._suffix)
+
+	def _schedule_flush(self):
+		if self._flush_interval <= 0:
+			self._flush()
+		elif self._timer is None:
+			self._timer = threading.Timer(self._flush_interval, self._flush_timer)
+			self._timer.daemon = True
+			self._timer.start()
+
+	def _cancel_flush(self):
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+
+	def _flush_timer(self):
+		with self._lock:
+			self._timer = None
+			self._flush()
+
+	def _flush(self):
+		dirty = self._dirty
+		self._dirty = set()
+		for namespace in dirty:
+			self._write_namespace(namespace)
+		# untracked values changed by their owner while being written
+		if len(self._dirty) > 0 and self._flush_interval > 0:
+			self._schedule_flush()
+
+	def _write_namespace(self, namespace):
+		path = self._namespace_path(namespace)
+		data = self._data.get(namespace)
+		try:
+			if not data:
+				if os.path.exists(path):
+					os.unlink(path)
+				return
+			with contextlib.ExitStack() as locks:
+				for value in data.values():
+					if isinstance(value, TrackedDict):
+						locks.enter_context(value.lock)
+				dump = pickle.dumps(data)
+			if not os.path.isdir(self._path):
+				os.makedirs(self._path)
+			tmp_path = path + ".tmp"
+			with open(tmp_path, "wb") as f:
+				f.write(dump)
+			os.rename(tmp_path, path)
+		except RuntimeError:
+			# other dictionary changed size during iteration
+			self._dirty.add(namespace)
+		except (OSError, IOError, pickle.PicklingError) as e:
+			log.error("Error saving storage file '%s': %s" % (path, e))
+
+	def set(self, namespace, option, value):
+		with self._lock:
+			self._data.setdefault(namespace, {})
+			self._data[namespace][option] = value
+			self._dirty.add(namespace)
+			self._schedule_flush()
+
+	def get(self, namespace, option, default=None):
+		with self._lock:
+			return self._data.get(namespace, {}).get(option, default)
+
+	def unset(self, namespace, option):
+		with self._lock:
+			if option in self._data.get(namespace, {}):
+				del self._data[namespace][option]
+				self._dirty.add(namespace)
+				self._schedule_flush()
+
+	def save(self):
+		with self._lock:
+			self._cancel_flush()
+			self._flush()
+			# give up on values which keep changing
+			self._dirty.clear()
+			self._cancel_flush()
+
+	def load(self):
+		with self._lock:
+			self._cancel_flush()
+			self._data = {}
+			self._dirty = set()
+			try:
+				names = os.listdir(self._path)
+			except (OSError, IOError) as e:
+				log.debug("Error listing storage directory '%s': %s" % (self._path, e))
+				return
+			for name in names:
+				if not name.endswith(self._suffix):
+					continue
+				path = os.path.join(self._path, name)
+				try:
+					with open(path, "rb") as f:
+						self._data[unquote(name[:-len(self._suffix)])] = pickle.load(f)
+				except (OSError, IOError, EOFError, pickle.UnpicklingError) as e:
+					log.error("Error loading storage file '%s': %s" % (path, e))
+
+	def clear(self):
+		with self._lock:
+			self._cancel_flush()
+			self._dirty = set(self._data.keys())
+			self._data.clear()
+			self._flush()
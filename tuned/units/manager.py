@@ -1,6 +1,8 @@
 import collections
+import concurrent.futures
 import os
 import re
+import time
 import traceback
 import tuned.exceptions
 import tuned.logs
@@ -27,7 +29,21 @@ class Manager(object):
         self._instances = []
         self._plugins = []
         self._config = config or GlobalConfig()
+        # expanded options of the instances held during a profile switch
+        self._held_options = None
+        # next update times of the dynamic tuning of instances and monitors
+        self._next_updates = {}
         self._cmd = commands()
+        self._parallel_tuning = self._config.get_bool(
+            consts.CFG_PARALLEL_TUNING, consts.CFG_DEF_PARALLEL_TUNING)
+        self._parallel_tuning_workers = int(self._config.get(
+            consts.CFG_PARALLEL_TUNING_WORKERS,
+            consts.CFG_DEF_PARALLEL_TUNING_WORKERS))
+        if self._parallel_tuning_workers <= 1:
+            self._parallel_tuning = False
+        if self._parallel_tuning:
+            log.info("parallel tuning is enabled, using %d worker(s)"
+                     % self._parallel_tuning_workers)
 
     @property
     def plugins(self):
@@ -59,7 +75,7 @@ class Manager(object):
         return re.search(unit.uname_regex, uname_string,
                          re.MULTILINE) is not None
 
-    def create(self, instances_config):
+    def _get_instance_infos(self, instances_config):
         instance_info_list = []
         for instance_name, instance_info in list(instances_config.items()):
             if not instance_info.enabled:
@@ -77,12 +93,16 @@ class Manager(object):
             instance_info_list.append(instance_info)
 
         instance_info_list.sort(key=lambda x: x.options["priority"])
-        plugins_by_name = collections.OrderedDict()
         for instance_info in instance_info_list:
             instance_info.options.pop("priority")
-            plugins_by_name[instance_info.type] = None
+        return instance_info_list
 
-        for plugin_name, none in list(plugins_by_name.items()):
+    def _create_plugins(self, instance_info_list, plugins_by_name):
+        for instance_info in instance_info_list:
+            plugin_name = instance_info.type
+            if plugin_name in plugins_by_name:
+                continue
+            plugins_by_name[plugin_name] = None
             try:
                 plugin = self._plugins_repository.create(plugin_name)
                 plugins_by_name[plugin_name] = plugin
@@ -95,6 +115,7 @@ class Manager(object):
                 log.exception(e)
                 continue
 
+    def _create_instances(self, instance_info_list, plugins_by_name):
         instances = []
         for instance_info in instance_info_list:
             plugin = plugins_by_name[instance_info.type]
@@ -110,11 +131,118 @@ class Manager(object):
             instance.plugin.init_devices()
             instance.plugin.assign_free_devices(instance)
             instance.plugin.initialize_instance(instance)
+        return instances
+
+    def create(self, instances_config):
+        instance_info_list = self._get_instance_infos(instances_config)
+        plugins_by_name = collections.OrderedDict()
+        self._create_plugins(instance_info_list, plugins_by_name)
+        instances = self._create_instances(instance_info_list, plugins_by_name)
         # At this point we should be able to start the HW events
         # monitoring/processing thread, without risking race conditions
         self._hardware_inventory.start_processing_events()
         self._instances.extend(instances)
 
+    @property
+    def tuning_held(self):
+        return self._held_options is not None
+
+    def hold_tuning(self):
+        """Keep the tuning applied while the profile is being switched,
+        switch_tuning() then applies only the differences."""
+        self._hardware_inventory.stop_processing_events()
+        self._held_options = {}
+        for instance in self._instances:
+            self._held_options[instance.name] = self._try_call(
+                "hold_tuning", {}, instance.plugin.expand_options,
+                instance.options)
+
+    @staticmethod
+    def _same_instances(instances, instance_info_list):
+        if len(instances) != len(instance_info_list):
+            return False
+        for instance, instance_info in zip(instances, instance_info_list):
+            if (instance.name != instance_info.name
+                    or instance.devices_expression != instance_info.devices
+                    or instance.devices_udev_regex != instance_info.devices_udev_regex
+                    or instance.script_pre != instance_info.script_pre
+                    or instance.script_post != instance_info.script_post):
+                return False
+        return True
+
+    def _destroy_instances(self, instances):
+        for instance in instances:
+            log.debug("destroying instance %s" % instance.name)
+            self._try_call("switch_tuning", None,
+                           instance.plugin.destroy_instance,
+                           instance)
+
+    def switch_tuning(self, instances_config):
+        """Switch the held tuning to the new instances. Plugins whose
+        instances did not change keep them, only their changed options are
+        unapplied and applied again. Instances of other plugins are
+        recreated."""
+        held_options = self._held_options or {}
+        self._held_options = None
+        instance_info_list = self._get_instance_infos(instances_config)
+
+        old_by_plugin = collections.OrderedDict()
+        for instance in self._instances:
+            old_by_plugin.setdefault(instance.plugin, []).append(instance)
+        infos_by_type = collections.OrderedDict()
+        for instance_info in instance_info_list:
+            infos_by_type.setdefault(instance_info.type, []).append(instance_info)
+
+        kept_plugins = [plugin for plugin, instances in old_by_plugin.items()
+                        if self._same_instances(instances, infos_by_type.get(plugin.name, []))]
+        removed = [instance for instance in self._instances
+                   if instance.plugin not in kept_plugins]
+        self._call_all("switch_tuning", None, list(reversed(removed)),
+                       "unapply_tuning", True)
+        self._destroy_instances(removed)
+
+        kept = []
+        for plugin in kept_plugins:
+            instances = old_by_plugin[plugin]
+            infos = infos_by_type[plugin.name]
+            for instance, instance_info in zip(instances, infos):
+                if not self._try_call("switch_tuning", False, instance.update_options,
+                                      instance_info.options, held_options.get(instance.name, {})):
+                    log.info("recreating instances of plugin '%s'" % plugin.name)
+                    self._call_all("switch_tuning", None, list(reversed(instances)),
+                                   "unapply_tuning", True)
+                    self._destroy_instances(instances)
+                    break
+            else:
+                kept.extend(instances)
+
+        plugins_by_name = collections.OrderedDict()
+        for plugin in self._plugins:
+            if plugin.name in infos_by_type:
+                plugins_by_name[plugin.name] = plugin
+            else:
+                log.debug("cleaning plugin '%s'" % plugin.name)
+                self._try_call("switch_tuning", None, plugin.cleanup)
+        self._plugins = list(plugins_by_name.values())
+        self._create_plugins(instance_info_list, plugins_by_name)
+
+        kept_by_name = dict((instance.name, instance) for instance in kept)
+        created = self._create_instances(
+            [instance_info for instance_info in instance_info_list
+             if instance_info.name not in kept_by_name], plugins_by_name)
+        log.info("switching profile: kept %d instance(s), created %d instance(s)"
+                 % (len(kept), len(created)))
+        self._hardware_inventory.start_processing_events()
+        self._call_all("switch_tuning", None, created, "apply_tuning")
+
+        created_by_name = dict((instance.name, instance) for instance in created)
+        self._next_updates = {}
+        self._instances = []
+        for instance_info in instance_info_list:
+            instance = kept_by_name.get(instance_info.name, created_by_name.get(instance_info.name))
+            if instance is not None:
+                self._instances.append(instance)
+
     def _try_call(self, caller, exc_ret, f, *args, **kwargs):
         try:
             return f(*args, **kwargs)
@@ -137,30 +265,123 @@ class Manager(object):
 
         del self._plugins[:]
         del self._instances[:]
+        self._held_options = None
+        self._next_updates = {}
 
-    def update_monitors(self):
-        for monitor in self._monitors_repository.monitors:
-            log.debug("updating monitor %s" % monitor)
-            self._try_call("update_monitors", None, monitor.update)
+    # Returns for each instance indexes of instances which have to be
+    # processed before it. Instances sharing a plugin or other tuning
+    # resource keep the order of the list, other instances are independent.
+    @staticmethod
+    def _get_dependencies(instances):
+        last_by_resource = {}
+        last_any = None
+        all_since_barrier = []
+        dependencies = []
+        for i, instance in enumerate(instances):
+            resources = instance.plugin.get_tuning_resources(instance)
+            if "*" in resources:
+                deps = set(all_since_barrier)
+                if last_any is not None:
+                    deps.add(last_any)
+                last_any = i
+                last_by_resource.clear()
+                all_since_barrier = []
+            else:
+                deps = set(last_by_resource[r] for r in resources
+                           if r in last_by_resource)
+                if last_any is not None:
+                    deps.add(last_any)
+                for r in resources:
+                    last_by_resource[r] = i
+                all_since_barrier.append(i)
+            dependencies.append(deps)
+        return dependencies
+
+    def _call_all_parallel(self, caller, exc_ret, instances, method, *args):
+        dependencies = self._get_dependencies(instances)
+        dependents = [[] for i in instances]
+        waiting = [len(deps) for deps in dependencies]
+        for i, deps in enumerate(dependencies):
+            for dep in deps:
+                dependents[dep].append(i)
+        results = [exc_ret] * len(instances)
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._parallel_tuning_workers) as executor:
+            def submit(i):
+                return executor.submit(self._try_call, caller, exc_ret,
+                                       getattr(instances[i], method), *args)
+            futures = dict((submit(i), i) for i, cnt in enumerate(waiting)
+                           if cnt == 0)
+            while futures:
+                done, _ = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    i = futures.pop(future)
+                    results[i] = future.result()
+                    for dependent in dependents[i]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            futures[submit(dependent)] = dependent
+        return results
+
+    def _call_all(self, caller, exc_ret, instances, method, *args):
+        if self._parallel_tuning and len(instances) > 1:
+            return self._call_all_parallel(caller, exc_ret, instances,
+                                           method, *args)
+        return [self._try_call(caller, exc_ret, getattr(instance, method), *args)
+                for instance in instances]
 
     def start_tuning(self):
-        for instance in self._instances:
-            self._try_call("start_tuning", None,
-                           instance.apply_tuning)
+        self._call_all("start_tuning", None, self._instances, "apply_tuning")
 
     def verify_tuning(self, ignore_missing):
-        ret = True
-        for instance in self._instances:
-            res = self._try_call("verify_tuning", False,
-                                 instance.verify_tuning, ignore_missing)
-            if not res:
-                ret = False
-        return ret
+        res = self._call_all("verify_tuning", False, self._instances,
+                             "verify_tuning", ignore_missing)
+        return all(res)
+
+    def _is_due(self, key, interval, now):
+        next_update = self._next_updates.get(key)
+        if next_update is None:
+            self._next_updates[key] = now + interval
+            return False
+        if next_update > now:
+            return False
+        next_update += interval
+        if next_update <= now:
+            next_update = now + interval
+        self._next_updates[key] = next_update
+        return True
 
-    def update_tuning(self):
+    def update_due(self, default_interval, now=None):
+        """Update the monitors and the dynamic tuning of the instances whose
+        update interval elapsed. Instances and monitors without their own
+        interval use default_interval, monitors are updated at least as
+        often as the most frequently updated instance."""
+        if now is None:
+            now = time.monotonic()
+        intervals = collections.OrderedDict()
         for instance in self._instances:
-            self._try_call("update_tuning", None,
-                           instance.update_tuning)
+            if instance.has_dynamic_tuning:
+                intervals[instance] = instance.update_interval or default_interval
+        monitor_interval = min(intervals.values()) if intervals else default_interval
+        monitor_intervals = collections.OrderedDict()
+        for monitor in self._monitors_repository.monitors:
+            interval = monitor.update_interval or monitor_interval
+            monitor_class = type(monitor)
+            monitor_intervals[monitor_class] = min(interval,
+                                                   monitor_intervals.get(monitor_class, interval))
+        for monitor in self._monitors_repository.monitors:
+            monitor_class = type(monitor)
+            if monitor_class not in monitor_intervals:
+                continue
+            interval = monitor_intervals.pop(monitor_class)
+            if self._is_due(monitor_class, interval, now):
+                log.debug("updating monitor %s" % monitor)
+                self._try_call("update_monitors", None, monitor.update)
+        for instance, interval in intervals.items():
+            if self._is_due(instance, interval, now):
+                self._try_call("update_tuning", None,
+                               instance.update_tuning)
 
     # full_rollback is a helper telling plugins whether soft or full roll
     # back is needed, e.g. for bootloader plugin we need e.g grub.cfg
@@ -172,6 +393,5 @@ class Manager(object):
     # party config files, etc.
     def stop_tuning(self, full_rollback=False):
         self._hardware_inventory.stop_processing_events()
-        for instance in reversed(self._instances):
-            self._try_call("stop_tuning", None,
-                           instance.unapply_tuning, full_rollback)
+        self._call_all("stop_tuning", None, list(reversed(self._instances)),
+                       "unapply_tuning", full_rollback)
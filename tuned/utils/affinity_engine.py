@@ -0,0 +1,190 @@
+__all__ = ["AffinityEngine", "AffinityStats", "TaskFilter"]
+
+import errno
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import tuned.consts as consts
+
+
+class TaskFilter(object):
+    """
+    Filter of tasks by their comm (whitelist and blacklist) and by their
+    cgroups (cgroup blacklist).
+
+    The regular expressions are compiled once, an empty blacklist matches
+    nothing. Raises re.error for invalid expressions.
+    """
+
+    def __init__(self, whitelist=".*", blacklist="", cgroup_blacklist=""):
+        self._whitelist = re.compile(whitelist)
+        self._blacklist = re.compile(blacklist) if blacklist else None
+        self._cgroup_blacklist = re.compile(cgroup_blacklist) if cgroup_blacklist else None
+
+    @staticmethod
+    def _get(task, field):
+        try:
+            return getattr(task, field)
+        except (OSError, IOError):
+            return ""
+
+    def match(self, task):
+        comm = self._get(task, "comm")
+        if self._whitelist.search(comm) is None:
+            return False
+        if self._blacklist is not None and self._blacklist.search(comm) is not None:
+            return False
+        if self._cgroup_blacklist is not None \
+                and self._cgroup_blacklist.search(self._get(task, "cgroups")) is not None:
+            return False
+        return True
+
+    @staticmethod
+    def _readable(task, fields):
+        try:
+            for field in fields:
+                getattr(task, field)
+        except (OSError, IOError):
+            return False
+        return True
+
+    def select(self, scanner, fields=()):
+        """
+        Return list of the matching tasks found by the ProcScanner,
+        threads are considered only for the matching processes.
+
+        The task fields named in fields are read while selecting, the
+        tasks which fields cannot be read (e.g. they vanished) are skipped.
+        """
+        tasks = []
+        for process in scanner.processes():
+            if self.match(process):
+                if self._readable(process, fields):
+                    tasks.append(process)
+                tasks.extend([thread for thread in scanner.threads(process)
+                              if self.match(thread) and self._readable(thread, fields)])
+        return tasks
+
+
+class AffinityStats(object):
+    """
+    Counts of the tasks which affinity was changed, skipped (it was
+    already set) and which vanished. The errors are (pid, affinity,
+    exception) tuples, the affinity is None if reading of the original
+    affinity failed.
+    """
+
+    def __init__(self):
+        self.changed = 0
+        self.skipped = 0
+        self.vanished = 0
+        self.errors = []
+
+    def __str__(self):
+        return "%d changed, %d skipped, %d vanished, %d failed" \
+               % (self.changed, self.skipped, self.vanished, len(self.errors))
+
+
+class AffinityEngine(object):
+    """
+    Bulk setter of task affinities.
+
+    The original affinities of all tasks are read and the targets computed
+    first, only the tasks which affinity differs are then changed. The
+    changes are done in batches, which run on a pool of worker threads if
+    more than one worker is allowed. The affinity can be anything the
+    get_affinity and set_affinity callables understand, e.g. a list of
+    CPUs, the intersection is computed only for lists.
+    """
+
+    def __init__(self, get_affinity, set_affinity, workers=1,
+                 batch_size=consts.AFFINITY_BATCH_SIZE):
+        self._get_affinity = get_affinity
+        self._set_affinity = set_affinity
+        self._workers = max(1, workers)
+        self._batch_size = max(1, batch_size)
+
+    @staticmethod
+    def _vanished(e):
+        return getattr(e, "errno", None) == errno.ESRCH
+
+    @staticmethod
+    def _normalize(affinity):
+        return set(affinity) if isinstance(affinity, (list, set, tuple)) else affinity
+
+    def apply(self, pids, affinity, intersect=False):
+        """
+        Set the affinity of the tasks. If intersect is True, the tasks get
+        the intersection of their affinity with the given one (or the
+        given one if the intersection is empty). Returns (originals, stats),
+        originals maps the PIDs of the changed tasks to their original
+        affinities.
+        """
+        stats = AffinityStats()
+        originals = {}
+        plan = []
+        target = self._normalize(affinity)
+        for pid in pids:
+            try:
+                prev = self._get_affinity(pid)
+            # old python-schedutils (pre-0.4) raise SystemError instead of OSError
+            except (SystemError, OSError) as e:
+                if self._vanished(e):
+                    stats.vanished += 1
+                else:
+                    stats.errors.append((pid, None, e))
+                continue
+            new = affinity
+            if intersect and isinstance(target, set):
+                common = target.intersection(prev)
+                if common:
+                    new = sorted(common)
+            if self._normalize(new) == self._normalize(prev):
+                stats.skipped += 1
+                continue
+            originals[pid] = prev
+            plan.append((pid, new))
+        for pid in self._run(plan, stats):
+            del originals[pid]
+        return (originals, stats)
+
+    def restore(self, originals):
+        """
+        Set the affinities from the dictionary of PIDs and affinities
+        (as returned by apply()), returns the stats.
+        """
+        stats = AffinityStats()
+        self._run(list(originals.items()), stats)
+        return stats
+
+    def _apply_batch(self, batch):
+        results = []
+        for (pid, affinity) in batch:
+            try:
+                self._set_affinity(pid, affinity)
+                results.append((pid, affinity, None))
+            except (SystemError, OSError) as e:
+                results.append((pid, affinity, e))
+        return results
+
+    # Returns list of PIDs which affinity was not set
+    def _run(self, plan, stats):
+        batches = [plan[i:i + self._batch_size]
+                   for i in range(0, len(plan), self._batch_size)]
+        if self._workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                results = list(executor.map(self._apply_batch, batches))
+        else:
+            results = [self._apply_batch(batch) for batch in batches]
+        failed = []
+        for batch in results:
+            for (pid, affinity, e) in batch:
+                if e is None:
+                    stats.changed += 1
+                    continue
+                if self._vanished(e):
+                    stats.vanished += 1
+                else:
+                    stats.errors.append((pid, affinity, e))
+                failed.append(pid)
+        return failed
@@ -0,0 +1,215 @@
+__all__ = ["CpuSet"]
+
+import tuned.logs
+
+log = tuned.logs.get()
+
+
+def _range_mask(first, last):
+    if last < first:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+class CpuSet(object):
+    """
+    Immutable set of CPUs backed by an integer bitmask.
+
+    Supports the set operators (|, &, -, ^), comparison by the subset
+    relation, len() (the number of CPUs) and iteration in the ascending
+    order. parse() understands the syntax of the CPU lists in profiles,
+    see commands.cpulist_unpack().
+    """
+
+    __slots__ = ["_mask"]
+
+    def __init__(self, cpus=None):
+        mask = 0
+        if isinstance(cpus, CpuSet):
+            mask = cpus._mask
+        elif cpus is not None:
+            for cpu in cpus:
+                mask |= 1 << int(cpu)
+        object.__setattr__(self, "_mask", mask)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CpuSet is immutable")
+
+    @classmethod
+    def from_mask(cls, mask):
+        if mask < 0:
+            raise ValueError("negative CPU mask")
+        cpuset = cls.__new__(cls)
+        object.__setattr__(cpuset, "_mask", mask)
+        return cpuset
+
+    @classmethod
+    def from_hex(cls, mask):
+        """
+        Create the set from a hexadecimal mask, optionally prefixed
+        by "0x" and with commas. Raises ValueError for invalid masks.
+        """
+        return cls.from_mask(int(str(mask).replace(",", ""), 16))
+
+    @classmethod
+    def parse(cls, l, strip_chars='\'"'):
+        """
+        Parse a CPU list, e.g. "0-3, ^2, 0xf0,, 8", see
+        commands.cpulist_unpack() for the syntax. Returns empty set
+        if the list is invalid.
+        """
+        if type(l) is not list:
+            if strip_chars is not None:
+                l = str(l).strip(strip_chars)
+            l = str(l).split(",")
+        mask = 0
+        negated = 0
+        hexmask = None
+        items = []
+        # join the comma separated parts of hexmasks
+        for v in l:
+            sv = str(v)
+            if hexmask is not None:
+                if len(sv) == 0:
+                    items.append(hexmask)
+                    hexmask = None
+                else:
+                    hexmask += sv
+            elif sv[0:2].lower() == "0x":
+                hexmask = sv
+            elif sv and (sv[0] == "^" or sv[0] == "!"):
+                nl = sv[1:].split("-")
+                try:
+                    if len(nl) > 1:
+                        negated |= _range_mask(int(nl[0]), int(nl[1]))
+                    else:
+                        negated |= 1 << int(sv[1:])
+                except ValueError:
+                    return cls()
+            elif len(sv) > 0:
+                items.append(sv)
+        if hexmask:
+            items.append(hexmask)
+        for v in items:
+            if v[0:2].lower() == "0x":
+                try:
+                    mask |= cls.from_hex(v)._mask
+                except ValueError:
+                    log.error("invalid hexadecimal mask '%s'" % v.replace(",", ""))
+                continue
+            vl = v.split("-")
+            try:
+                if len(vl) > 1:
+                    mask |= _range_mask(int(vl[0]), int(vl[1]))
+                else:
+                    mask |= 1 << int(vl[0])
+            except ValueError:
+                return cls()
+        return cls.from_mask(mask & ~negated)
+
+    @property
+    def mask(self):
+        return self._mask
+
+    def to_list(self):
+        bits = bin(self._mask)[:1:-1]
+        return [cpu for cpu, bit in enumerate(bits) if bit == "1"]
+
+    def pack(self):
+        """Return list of the ranges, e.g. ["0-3", "8"]."""
+        ranges = []
+        bits = bin(self._mask)[:1:-1]
+        start = bits.find("1")
+        while start >= 0:
+            end = bits.find("0", start)
+            if end < 0:
+                end = len(bits)
+            if end - start > 1:
+                ranges.append("%d-%d" % (start, end - 1))
+            else:
+                ranges.append(str(start))
+            start = bits.find("1", end)
+        return ranges
+
+    def to_hex(self):
+        """Return the mask in the sysfs format, e.g. "00000001,0000002e"."""
+        s = "%x" % self._mask
+        ls = len(s)
+        if ls % 8 != 0:
+            ls += 8 - ls % 8
+        s = s.zfill(ls)
+        return ",".join(s[i:i + 8] for i in range(0, len(s), 8))
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __len__(self):
+        return bin(self._mask).count("1")
+
+    def __bool__(self):
+        return self._mask != 0
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, cpu):
+        return cpu >= 0 and (self._mask >> cpu) & 1 == 1
+
+    def __hash__(self):
+        return hash(self._mask)
+
+    def __eq__(self, other):
+        if not isinstance(other, CpuSet):
+            return NotImplemented
+        return self._mask == other._mask
+
+    def __ne__(self, other):
+        if not isinstance(other, CpuSet):
+            return NotImplemented
+        return self._mask != other._mask
+
+    def __le__(self, other):
+        return self._mask & ~CpuSet(other)._mask == 0
+
+    def __ge__(self, other):
+        return CpuSet(other) <= self
+
+    def __lt__(self, other):
+        return self <= other and self != CpuSet(other)
+
+    def __gt__(self, other):
+        return self >= other and self != CpuSet(other)
+
+    def issubset(self, other):
+        return self <= other
+
+    def issuperset(self, other):
+        return self >= other
+
+    def isdisjoint(self, other):
+        return self._mask & CpuSet(other)._mask == 0
+
+    def __or__(self, other):
+        return CpuSet.from_mask(self._mask | CpuSet(other)._mask)
+
+    def __and__(self, other):
+        return CpuSet.from_mask(self._mask & CpuSet(other)._mask)
+
+    def __sub__(self, other):
+        return CpuSet.from_mask(self._mask & ~CpuSet(other)._mask)
+
+    def __xor__(self, other):
+        return CpuSet.from_mask(self._mask ^ CpuSet(other)._mask)
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+    symmetric_difference = __xor__
+
+    def __str__(self):
+        return ",".join(self.pack())
+
+    def __repr__(self):
+        return "CpuSet('%s')" % self
+
+    def __reduce__(self):
+        return (CpuSet.from_mask, (self._mask,))
@@ -0,0 +1,412 @@
+__all__ = ["Ethtool", "EthtoolUnavailable", "FEATURE_ALIASES"]
+
+import ctypes
+import errno
+import fcntl
+import fnmatch
+import socket
+import struct
+
+import tuned.exceptions
+import tuned.logs
+
+log = tuned.logs.get()
+
+SIOCETHTOOL = 0x8946
+IFNAMSIZ = 16
+# size of struct ifreq on 64-bit architectures, it is smaller on 32-bit ones
+IFREQ_SIZE = 40
+ETH_GSTRING_LEN = 32
+ETH_SS_FEATURES = 4
+
+ETHTOOL_GSET = 0x00000001
+ETHTOOL_SSET = 0x00000002
+ETHTOOL_GWOL = 0x00000005
+ETHTOOL_SWOL = 0x00000006
+ETHTOOL_GLINK = 0x0000000a
+ETHTOOL_GCOALESCE = 0x0000000e
+ETHTOOL_SCOALESCE = 0x0000000f
+ETHTOOL_GRINGPARAM = 0x00000010
+ETHTOOL_SRINGPARAM = 0x00000011
+ETHTOOL_GPAUSEPARAM = 0x00000012
+ETHTOOL_SPAUSEPARAM = 0x00000013
+ETHTOOL_GSTRINGS = 0x0000001b
+ETHTOOL_GSSET_INFO = 0x00000037
+ETHTOOL_GFEATURES = 0x0000003a
+ETHTOOL_SFEATURES = 0x0000003b
+ETHTOOL_GCHANNELS = 0x0000003c
+ETHTOOL_SCHANNELS = 0x0000003d
+
+# struct ethtool_cmd
+_LINK_FORMAT = "=IIIHBBBBBBIIHBBI8x"
+DUPLEX_FULL = 0x01
+SPEED_UNKNOWN = 0xffffffff
+ADVERTISED_AUTONEG = 1 << 6
+# bits of the baseT link modes in the supported and advertising masks
+LINK_MODES = {
+    0: (10, False),
+    1: (10, True),
+    2: (100, False),
+    3: (100, True),
+    4: (1000, False),
+    5: (1000, True),
+    12: (10000, True),
+}
+
+# struct ethtool_wolinfo, the wake-on-lan modes in the order of their bits
+_WOL_FORMAT = "=III6s2x"
+WOL_MODES = "pumbagsf"
+
+# the fields of the parameter structures in the names used by the ethtool
+# utility, on/off fields are marked with True
+_COALESCE = [
+    ("rx-usecs", False),
+    ("rx-frames", False),
+    ("rx-usecs-irq", False),
+    ("rx-frames-irq", False),
+    ("tx-usecs", False),
+    ("tx-frames", False),
+    ("tx-usecs-irq", False),
+    ("tx-frames-irq", False),
+    ("stats-block-usecs", False),
+    ("adaptive-rx", True),
+    ("adaptive-tx", True),
+    ("pkt-rate-low", False),
+    ("rx-usecs-low", False),
+    ("rx-frames-low", False),
+    ("tx-usecs-low", False),
+    ("tx-frames-low", False),
+    ("pkt-rate-high", False),
+    ("rx-usecs-high", False),
+    ("rx-frames-high", False),
+    ("tx-usecs-high", False),
+    ("tx-frames-high", False),
+    ("sample-interval", False),
+]
+_PAUSE = [("autoneg", True), ("rx", True), ("tx", True)]
+# the current values follow the maximums, the parameters with zero maximum
+# are not supported by the device
+_RING = ["rx", "rx-mini", "rx-jumbo", "tx"]
+_CHANNELS = ["rx", "tx", "other", "combined"]
+
+# the legacy names of the features understood by the ethtool utility
+# (its off_flag_def table), they cover the kernel features matching
+# the patterns
+FEATURE_ALIASES = {
+    "rx": "rx-checksum",
+    "tx": "tx-checksum-*",
+    "sg": "tx-scatter-gather*",
+    "tso": "tx-tcp*-segmentation",
+    "ufo": "tx-udp-fragmentation",
+    "gso": "tx-generic-segmentation",
+    "gro": "rx-gro",
+    "lro": "rx-lro",
+    "rxvlan": "rx-vlan-hw-parse",
+    "txvlan": "tx-vlan-hw-insert",
+    "ntuple": "rx-ntuple-filter",
+    "rxhash": "rx-hashing",
+}
+
+# errors of the operations the driver does not implement
+_UNSUPPORTED_ERRNOS = [errno.EOPNOTSUPP, errno.ENODEV, errno.ENXIO]
+# errors of kernels (or sandboxes) without the ioctl
+_UNAVAILABLE_ERRNOS = [errno.ENOTTY, errno.ENOSYS, errno.EAFNOSUPPORT]
+
+
+class EthtoolUnavailable(tuned.exceptions.TunedException):
+    """The SIOCETHTOOL ioctl cannot be used, the ethtool utility is needed."""
+
+
+class Ethtool(object):
+    """
+    Ethtool settings of the network devices through the SIOCETHTOOL ioctl.
+
+    get() returns the features, coalesce, pause, ring and channels
+    parameters in the same form as the plugins parse them from the output
+    of the ethtool utility, i.e. dictionary of the option names to strings,
+    and set() takes the same dictionaries. The getters return None if the
+    device does not support the operation, other errors are raised as
+    OSError (IOError). EthtoolUnavailable is raised if the ioctl cannot be
+    used at all.
+
+    The ioctl argument replaces the system call for testing, it is called
+    with the device name and bytearray with the ethtool command structure,
+    which it updates in place, and returns the ioctl return value.
+    """
+
+    def __init__(self, ioctl=None):
+        self._ioctl_func = ioctl if ioctl is not None else self._sioc_ethtool
+        self._sock = None
+        # the feature names are the same for all the devices
+        self._feature_names = None
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _sioc_ethtool(self, device, data):
+        if self._sock is None:
+            try:
+                self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            except (OSError, IOError) as e:
+                raise EthtoolUnavailable("cannot create socket for ethtool ioctl: %s" % e)
+        buf = ctypes.create_string_buffer(bytes(data), len(data))
+        ifr = bytearray(struct.pack("%dsP" % IFNAMSIZ, device.encode(), ctypes.addressof(buf)))
+        ifr.extend(b"\0" * (IFREQ_SIZE - len(ifr)))
+        ret = fcntl.ioctl(self._sock.fileno(), SIOCETHTOOL, ifr, True)
+        data[:] = buf.raw
+        return ret
+
+    def _ioctl(self, device, data):
+        try:
+            return self._ioctl_func(device, data)
+        except (OSError, IOError) as e:
+            if e.errno in _UNAVAILABLE_ERRNOS:
+                raise EthtoolUnavailable("ethtool ioctl is not available: %s" % e)
+            raise
+
+    def _query(self, device, fmt, cmd, *args):
+        """Return the unpacked structure, None if not supported."""
+        data = bytearray(struct.pack(fmt, cmd, *args))
+        try:
+            self._ioctl(device, data)
+        except (OSError, IOError) as e:
+            if e.errno in _UNSUPPORTED_ERRNOS:
+                return None
+            raise
+        return struct.unpack(fmt, bytes(data))
+
+    def _update(self, device, fmt, cmd, values):
+        self._ioctl(device, bytearray(struct.pack(fmt, cmd, *values)))
+
+    @staticmethod
+    def _on_off(value):
+        return "on" if value else "off"
+
+    @staticmethod
+    def _parse_on_off(name, value):
+        value = str(value).lower()
+        if value in ["on", "1"]:
+            return 1
+        if value in ["off", "0"]:
+            return 0
+        raise ValueError("invalid value '%s' of '%s', expected 'on' or 'off'" % (value, name))
+
+    @staticmethod
+    def _parse_int(name, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError("invalid value '%s' of '%s', expected integer" % (value, name))
+
+    def get(self, context, device):
+        return getattr(self, "get_" + context)(device)
+
+    def set(self, context, device, params):
+        """Set the parameters, raises ValueError for invalid values."""
+        getattr(self, "set_" + context)(device, params)
+
+    def _get_fields(self, device, fields, fmt, cmd):
+        values = self._query(device, fmt, cmd, *([0] * len(fields)))
+        if values is None:
+            return None
+        return dict((name, self._on_off(value) if on_off else str(value))
+                    for ((name, on_off), value) in zip(fields, values[1:]))
+
+    def _set_fields(self, device, params, fields, fmt, get_cmd, set_cmd):
+        values = self._query(device, fmt, get_cmd, *([0] * len(fields)))
+        if values is None:
+            raise OSError(errno.EOPNOTSUPP, "operation not supported")
+        values = list(values[1:])
+        for (i, (name, on_off)) in enumerate(fields):
+            if name in params:
+                if on_off:
+                    values[i] = self._parse_on_off(name, params[name])
+                else:
+                    values[i] = self._parse_int(name, params[name])
+        self._update(device, fmt, set_cmd, values)
+
+    def get_coalesce(self, device):
+        return self._get_fields(device, _COALESCE, "=%dI" % (len(_COALESCE) + 1), ETHTOOL_GCOALESCE)
+
+    def set_coalesce(self, device, params):
+        self._set_fields(device, params, _COALESCE, "=%dI" % (len(_COALESCE) + 1),
+                         ETHTOOL_GCOALESCE, ETHTOOL_SCOALESCE)
+
+    def get_pause(self, device):
+        return self._get_fields(device, _PAUSE, "=4I", ETHTOOL_GPAUSEPARAM)
+
+    def set_pause(self, device, params):
+        self._set_fields(device, params, _PAUSE, "=4I", ETHTOOL_GPAUSEPARAM, ETHTOOL_SPAUSEPARAM)
+
+    def _get_limited(self, device, names, cmd):
+        values = self._query(device, "=%dI" % (2 * len(names) + 1), cmd, *([0] * (2 * len(names))))
+        if values is None:
+            return None
+        maximums = values[1:len(names) + 1]
+        current = values[len(names) + 1:]
+        return dict((name, str(value) if maximum else "n/a")
+                    for (name, maximum, value) in zip(names, maximums, current))
+
+    def _set_limited(self, device, params, names, get_cmd, set_cmd):
+        fmt = "=%dI" % (2 * len(names) + 1)
+        values = self._query(device, fmt, get_cmd, *([0] * (2 * len(names))))
+        if values is None:
+            raise OSError(errno.EOPNOTSUPP, "operation not supported")
+        values = list(values[1:])
+        for (i, name) in enumerate(names):
+            if name in params:
+                values[len(names) + i] = self._parse_int(name, params[name])
+        self._update(device, fmt, set_cmd, values)
+
+    def get_ring(self, device):
+        return self._get_limited(device, _RING, ETHTOOL_GRINGPARAM)
+
+    def set_ring(self, device, params):
+        self._set_limited(device, params, _RING, ETHTOOL_GRINGPARAM, ETHTOOL_SRINGPARAM)
+
+    def get_channels(self, device):
+        return self._get_limited(device, _CHANNELS, ETHTOOL_GCHANNELS)
+
+    def set_channels(self, device, params):
+        self._set_limited(device, params, _CHANNELS, ETHTOOL_GCHANNELS, ETHTOOL_SCHANNELS)
+
+    def _get_feature_names(self, device):
+        if self._feature_names is None:
+            data = bytearray(struct.pack("=IIQI", ETHTOOL_GSSET_INFO, 0, 1 << ETH_SS_FEATURES, 0))
+            self._ioctl(device, data)
+            (_, _, mask, count) = struct.unpack("=IIQI", bytes(data))
+            if not mask & (1 << ETH_SS_FEATURES):
+                raise OSError(errno.EOPNOTSUPP, "feature names not available")
+            data = bytearray(struct.pack("=III", ETHTOOL_GSTRINGS, ETH_SS_FEATURES, count)
+                             + b"\0" * (count * ETH_GSTRING_LEN))
+            self._ioctl(device, data)
+            strings = bytes(data[12:])
+            self._feature_names = [
+                strings[i:i + ETH_GSTRING_LEN].split(b"\0", 1)[0].decode()
+                for i in range(0, count * ETH_GSTRING_LEN, ETH_GSTRING_LEN)]
+        return self._feature_names
+
+    def _feature_blocks(self, device, names):
+        """Return list of (available, requested, active, never_changed) blocks."""
+        blocks = (len(names) + 31) // 32
+        fmt = "=II%dI" % (4 * blocks)
+        values = self._query(device, fmt, ETHTOOL_GFEATURES, blocks, *([0] * (4 * blocks)))
+        if values is None:
+            return None
+        return [values[2 + 4 * i:6 + 4 * i] for i in range(blocks)]
+
+    @staticmethod
+    def _feature_bits(names, patterns):
+        return [i for (i, name) in enumerate(names)
+                if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+    def get_features(self, device):
+        """
+        Return the features which can be changed, both under the kernel
+        names and the legacy names (e.g. "gro" for "rx-gro").
+        """
+        try:
+            names = self._get_feature_names(device)
+        except (OSError, IOError) as e:
+            if e.errno in _UNSUPPORTED_ERRNOS:
+                return None
+            raise
+        blocks = self._feature_blocks(device, names)
+        if blocks is None:
+            return None
+
+        def bit(i, field):
+            return (blocks[i // 32][field] >> (i % 32)) & 1
+
+        def changeable(i):
+            return bit(i, 0) and not bit(i, 3)
+
+        features = {}
+        for (i, name) in enumerate(names):
+            if name and changeable(i):
+                features[name] = self._on_off(bit(i, 2))
+        for (alias, pattern) in FEATURE_ALIASES.items():
+            bits = self._feature_bits(names, [pattern])
+            if any(changeable(i) for i in bits):
+                features[alias] = self._on_off(any(bit(i, 2) for i in bits))
+        return features
+
+    def set_features(self, device, params):
+        names = self._get_feature_names(device)
+        blocks = (len(names) + 31) // 32
+        valid = [0] * blocks
+        requested = [0] * blocks
+        for (name, value) in params.items():
+            on = self._parse_on_off(name, value)
+            bits = self._feature_bits(names, [FEATURE_ALIASES.get(name, name)])
+            if not bits:
+                raise ValueError("unknown feature '%s'" % name)
+            for i in bits:
+                valid[i // 32] |= 1 << (i % 32)
+                if on:
+                    requested[i // 32] |= 1 << (i % 32)
+        values = []
+        for (v, r) in zip(valid, requested):
+            values.extend([v, r])
+        # the positive return value only informs that some features were
+        # not changed because they depend on others, same as the utility
+        self._ioctl(device, bytearray(struct.pack("=II%dI" % (2 * blocks), ETHTOOL_SFEATURES,
+                                                  blocks, *values)))
+
+    def get_wol(self, device):
+        """Return the wake-on-lan modes as string, e.g. "g" ("d" for disabled)."""
+        values = self._query(device, _WOL_FORMAT, ETHTOOL_GWOL, 0, 0, b"")
+        if values is None:
+            return None
+        modes = "".join(mode for (i, mode) in enumerate(WOL_MODES) if values[2] & (1 << i))
+        return modes or "d"
+
+    def set_wol(self, device, value):
+        wolopts = 0
+        for mode in str(value):
+            if mode == "d":
+                wolopts = 0
+            elif mode in WOL_MODES:
+                wolopts |= 1 << WOL_MODES.index(mode)
+            else:
+                raise ValueError("invalid wake-on-lan mode '%s'" % mode)
+        self._update(device, _WOL_FORMAT, ETHTOOL_SWOL, [0, wolopts, b""])
+
+    def get_link(self, device):
+        """
+        Return dictionary with the link "speed" (in Mb/s, None if unknown),
+        "full_duplex", "autoneg", "link" (detected), the "supported_modes" and
+        "advertised_modes" as lists of (speed, full duplex) tuples and the
+        "supported_autoneg" and "advertised_autoneg" flags.
+        """
+        values = self._query(device, _LINK_FORMAT, ETHTOOL_GSET, *([0] * 15))
+        if values is None:
+            return None
+        (_, supported, advertising, speed, duplex, _, _, _, autoneg, _, _, _,
+         speed_hi, _, _, _) = values
+        speed |= speed_hi << 16
+        link = self._query(device, "=II", ETHTOOL_GLINK, 0)
+        return {
+            "speed": None if speed in [0, SPEED_UNKNOWN] else speed,
+            "full_duplex": duplex == DUPLEX_FULL,
+            "autoneg": bool(autoneg),
+            "link": link is not None and bool(link[1]),
+            "supported_modes": [mode for (b, mode) in sorted(LINK_MODES.items()) if supported & (1 << b)],
+            "supported_autoneg": bool(supported & ADVERTISED_AUTONEG),
+            "advertised_modes": [mode for (b, mode) in sorted(LINK_MODES.items()) if advertising & (1 << b)],
+            "advertised_autoneg": bool(advertising & ADVERTISED_AUTONEG),
+        }
+
+    def set_link(self, device, autoneg=None, advertising=None):
+        """Enable or disable autonegotiation and set the advertised modes mask."""
+        values = self._query(device, _LINK_FORMAT, ETHTOOL_GSET, *([0] * 15))
+        if values is None:
+            raise OSError(errno.EOPNOTSUPP, "operation not supported")
+        values = list(values[1:])
+        if advertising is not None:
+            values[1] = advertising
+        if autoneg is not None:
+            values[7] = 1 if autoneg else 0
+        self._update(device, _LINK_FORMAT, ETHTOOL_SSET, values)
@@ -0,0 +1,139 @@
+__all__ = ["FileReader"]
+
+import collections
+import errno
+import os
+import threading
+import time
+
+import tuned.consts as consts
+import tuned.logs
+
+log = tuned.logs.get()
+
+
+class _Entry(object):
+    __slots__ = ["fd", "buf", "reads", "read_time"]
+
+    def __init__(self, fd, size):
+        self.fd = fd
+        self.buf = bytearray(size)
+        self.reads = 0
+        self.read_time = 0.0
+
+
+class FileReader(object):
+    """
+    Reader of frequently read sysfs and procfs files.
+
+    The files are kept open and re-read from the offset 0 by pread, which
+    saves the open() and close() calls on every read. The buffers are
+    preallocated and grown when a file does not fit. The least recently
+    read files are closed when more than max_files are open. If a read
+    fails (e.g. the device was removed), the file is reopened once, files
+    of removed devices can also be closed by close_prefix().
+    """
+
+    def __init__(self, max_files=consts.FILE_READER_MAX_FILES, buffer_size=4096):
+        self._max_files = max_files
+        self._buffer_size = buffer_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # the buffers are shared, serialize the reads
+        self._read_lock = threading.Lock()
+
+    def _open(self, path):
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        entry = _Entry(fd, self._buffer_size)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            self._entries[path] = entry
+            evicted = []
+            while len(self._entries) > self._max_files:
+                evicted.append(self._entries.popitem(last=False)[1])
+        for e in [old] + evicted:
+            if e is not None:
+                os.close(e.fd)
+        return entry
+
+    def _get(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+        if entry is None:
+            entry = self._open(path)
+        return entry
+
+    @staticmethod
+    def _pread(entry):
+        # procfs files can return short reads, read until the end of file
+        length = 0
+        while True:
+            if length == len(entry.buf):
+                entry.buf.extend(bytearray(len(entry.buf)))
+            view = memoryview(entry.buf)[length:]
+            if hasattr(os, "preadv"):
+                n = os.preadv(entry.fd, [view], length)
+            else:
+                data = os.pread(entry.fd, len(view), length)
+                n = len(data)
+                view[:n] = data
+            view.release()
+            if n == 0:
+                return bytes(entry.buf[:length])
+            length += n
+
+    def read(self, path):
+        """
+        Return the content of the file as a string, raises OSError
+        (IOError) if the file cannot be read.
+        """
+        with self._read_lock:
+            start = time.monotonic()
+            entry = self._get(path)
+            try:
+                data = self._pread(entry)
+            except (OSError, IOError) as e:
+                self.close(path)
+                if e.errno not in [errno.ENODEV, errno.ENOENT, errno.ESTALE, errno.EBADF]:
+                    raise
+                # the file might have been replaced, e.g. by the device re-plug
+                entry = self._open(path)
+                try:
+                    data = self._pread(entry)
+                except (OSError, IOError):
+                    self.close(path)
+                    raise
+            entry.reads += 1
+            entry.read_time += time.monotonic() - start
+        return data.decode(errors="replace")
+
+    def close(self, path):
+        with self._lock:
+            entry = self._entries.pop(path, None)
+        if entry is not None:
+            os.close(entry.fd)
+
+    def close_prefix(self, prefix):
+        """Close all files which paths start with the prefix."""
+        with self._lock:
+            paths = [path for path in self._entries if path.startswith(prefix)]
+        for path in paths:
+            self.close(path)
+
+    def close_all(self):
+        self.close_prefix("")
+
+    def stats(self):
+        """
+        Return dictionary of the open files with the number of reads
+        and the total time spent by reading them (in seconds).
+        """
+        with self._lock:
+            return dict((path, (entry.reads, entry.read_time))
+                        for path, entry in self._entries.items())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,180 @@
+__all__ = ["Irq", "IrqPlacement", "PLACEMENT_INTERSECT", "PLACEMENT_NUMA",
+           "PLACEMENT_SPREAD", "PLACEMENTS"]
+
+import errno
+import os
+
+import tuned.consts as consts
+import tuned.logs
+from tuned.utils.cpuset import CpuSet
+
+log = tuned.logs.get()
+
+# keep the IRQs on the intersection of their affinity and the housekeeping CPUs
+PLACEMENT_INTERSECT = "intersect"
+# move the IRQs of the PCI devices to the housekeeping CPUs local to the device
+PLACEMENT_NUMA = "numa"
+# like numa, the vectors of multi-queue devices get one CPU each
+PLACEMENT_SPREAD = "spread"
+PLACEMENTS = [PLACEMENT_INTERSECT, PLACEMENT_NUMA, PLACEMENT_SPREAD]
+
+
+class Irq(object):
+    """
+    Interrupt with its current affinity and the PCI device it belongs
+    to (None if it is not a PCI device interrupt) with the name of its
+    driver. The affinity is None if it cannot be read.
+    """
+
+    __slots__ = ["irq", "description", "affinity", "device", "numa_node",
+                 "local_cpus", "driver"]
+
+    def __init__(self, irq, description="", affinity=None, device=None,
+                 numa_node=None, local_cpus=None, driver=None):
+        self.irq = irq
+        self.description = description
+        self.affinity = affinity
+        self.device = device
+        self.numa_node = numa_node
+        self.local_cpus = local_cpus
+        self.driver = driver
+
+
+class IrqPlacement(object):
+    """
+    Placement of interrupts on the housekeeping CPUs.
+
+    read() takes one snapshot of /proc/interrupts, the smp_affinity_list
+    files and the MSI and legacy IRQs of the PCI devices with their
+    numa_node and local_cpulist. plan() computes the target affinities
+    for one of the PLACEMENTS, the same snapshot serves for applying,
+    verifying and restoring the affinities.
+    """
+
+    def __init__(self, proc_dir=consts.PROCFS_MOUNT_POINT, sys_dir="/sys"):
+        self._proc_dir = proc_dir
+        self._pci_dir = os.path.join(sys_dir, "bus", "pci", "devices")
+
+    @staticmethod
+    def _read(path):
+        with open(path, "r") as f:
+            return f.read().strip()
+
+    def _read_interrupts(self):
+        irqs = {}
+        with open(os.path.join(self._proc_dir, "interrupts"), "r") as f:
+            lines = f.read().splitlines()
+        if not lines:
+            return irqs
+        ncpus = len(lines[0].split())
+        for line in lines[1:]:
+            (name, sep, rest) = line.partition(":")
+            name = name.strip()
+            if not sep or not name.isdigit():
+                continue
+            irqs[int(name)] = " ".join(rest.split()[ncpus:])
+        return irqs
+
+    def read_affinity(self, irq):
+        """Return the affinity of the IRQ, None if it cannot be read."""
+        try:
+            return CpuSet.parse(self._read(os.path.join(
+                self._proc_dir, "irq", str(irq), "smp_affinity_list")))
+        except (OSError, IOError) as e:
+            if e.errno != errno.ENOENT:
+                log.debug("Failed to read SMP affinity of IRQ %d: %s" % (irq, e))
+            return None
+
+    def write_affinity(self, irq, cpus):
+        """Set the affinity of the IRQ, raises OSError (IOError)."""
+        with open(os.path.join(self._proc_dir, "irq", str(irq), "smp_affinity"), "w") as f:
+            f.write(CpuSet(cpus).to_hex())
+
+    def _read_devices(self):
+        """Return dictionary of IRQ -> (device, numa_node, local_cpus, driver)."""
+        devices = {}
+        try:
+            with os.scandir(self._pci_dir) as it:
+                names = sorted(entry.name for entry in it)
+        except (OSError, IOError):
+            return devices
+        for name in names:
+            path = os.path.join(self._pci_dir, name)
+            try:
+                with os.scandir(os.path.join(path, "msi_irqs")) as it:
+                    vectors = [int(entry.name) for entry in it if entry.name.isdigit()]
+            except (OSError, IOError):
+                vectors = []
+            if not vectors:
+                try:
+                    vectors = [int(self._read(os.path.join(path, "irq")))]
+                except (OSError, IOError, ValueError):
+                    continue
+                if vectors[0] <= 0:
+                    continue
+            try:
+                numa_node = int(self._read(os.path.join(path, "numa_node")))
+            except (OSError, IOError, ValueError):
+                numa_node = -1
+            try:
+                local_cpus = CpuSet.parse(self._read(os.path.join(path, "local_cpulist")))
+            except (OSError, IOError):
+                local_cpus = None
+            try:
+                driver = os.path.basename(os.readlink(os.path.join(path, "driver")))
+            except (OSError, IOError):
+                driver = None
+            for vector in vectors:
+                # legacy interrupts can be shared, the first device wins
+                devices.setdefault(vector, (name, numa_node if numa_node >= 0 else None,
+                                            local_cpus or None, driver))
+        return devices
+
+    def read(self):
+        """
+        Return dictionary of IRQ number -> Irq, raises OSError (IOError)
+        if /proc/interrupts cannot be read.
+        """
+        devices = self._read_devices()
+        irqs = {}
+        for irq, description in self._read_interrupts().items():
+            (device, numa_node, local_cpus, driver) = devices.get(irq, (None, None, None, None))
+            irqs[irq] = Irq(irq, description, self.read_affinity(irq),
+                            device, numa_node, local_cpus, driver)
+        return irqs
+
+    @staticmethod
+    def plan(irqs, housekeeping, placement=PLACEMENT_INTERSECT):
+        """
+        Return dictionary of IRQ number -> target CpuSet for the IRQs with
+        known affinity. The targets are subsets of the housekeeping CPUs.
+        """
+        housekeeping = CpuSet(housekeeping)
+        vectors = {}
+        targets = {}
+        for irq in sorted(irqs):
+            info = irqs[irq]
+            if info.affinity is None:
+                continue
+            if placement == PLACEMENT_INTERSECT or info.device is None:
+                targets[irq] = (info.affinity & housekeeping) or housekeeping
+                continue
+            local = housekeeping
+            if info.local_cpus is not None:
+                local = (info.local_cpus & housekeeping) or housekeeping
+            targets[irq] = local
+            vectors.setdefault(info.device, []).append(irq)
+        if placement == PLACEMENT_SPREAD:
+            # continue where the previous device on the same CPUs ended,
+            # so the queues of several devices do not pile on the first CPUs
+            next_cpu = {}
+            for device in sorted(vectors):
+                device_irqs = vectors[device]
+                if len(device_irqs) < 2:
+                    continue
+                for irq in device_irqs:
+                    cpus = targets[irq].to_list()
+                    index = next_cpu.get(targets[irq], 0)
+                    next_cpu[targets[irq]] = index + 1
+                    targets[irq] = CpuSet([cpus[index % len(cpus)]])
+        return targets
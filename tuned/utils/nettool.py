@@ -1,6 +1,7 @@
 __all__ = ["ethcard"]
 
 import tuned.logs
+from tuned.utils.ethtool_ioctl import Ethtool, EthtoolUnavailable
 from subprocess import *
 import re
 
@@ -18,6 +19,8 @@ class Nettool:
 	}
 
 	_disabled = False
+	# shared by all the cards, None if the ioctl cannot be used
+	_ethtool = Ethtool()
 
 	def __init__(self, interface):
 		self._interface = interface;
@@ -50,6 +53,23 @@ class Nettool:
 
 		return mode
 
+	@classmethod
+	def _disable_ethtool_ioctl(cls, e):
+		log.info("%s, using the ethtool utility" % e)
+		cls._ethtool = None
+
+	def _set_link(self, args, **kwargs):
+		if Nettool._ethtool is not None:
+			try:
+				Nettool._ethtool.set_link(self._interface, **kwargs)
+				return True
+			except EthtoolUnavailable as e:
+				self._disable_ethtool_ioctl(e)
+			except (OSError, IOError) as e:
+				log.debug("%s: cannot change link settings: %s" % (self._interface, e))
+				return False
+		return 0 == call(["ethtool", "-s", self._interface] + args, close_fds=True)
+
 	def _set_autonegotiation(self, enable):
 		if self.autoneg == enable:
 			return True
@@ -57,13 +77,13 @@ class Nettool:
 		if not self.supported_autoneg:
 			return False
 
-		return 0 == call(["ethtool", "-s", self._interface, "autoneg", "on" if enable else "off"], close_fds=True)
+		return self._set_link(["autoneg", "on" if enable else "off"], autoneg = enable)
 
 	def _set_advertise(self, value):
 		if not self._set_autonegotiation(True):
 			return False
 
-		return 0 == call(["ethtool", "-s", self._interface, "advertise", "0x%03x" % value], close_fds=True)
+		return self._set_link(["advertise", "0x%03x" % value], advertising = value)
 
 	def get_max_speed(self):
 		max = 0
@@ -107,10 +127,41 @@ class Nettool:
 		else:
 			return False
 
+	def _update_ioctl(self):
+		"""Update the status by the ioctl, returns False if it cannot be used."""
+		try:
+			link = Nettool._ethtool.get_link(self._interface)
+		except EthtoolUnavailable as e:
+			self._disable_ethtool_ioctl(e)
+			return False
+		except (OSError, IOError) as e:
+			link = None
+			log.debug("%s: %s" % (self._interface, e))
+
+		self._clean_status()
+		if link is None:
+			log.warning("%s: cannot get the link settings" % self._interface)
+			self._disabled = True
+			return True
+
+		# assume 1gbit ethernet if the speed is unknown, as for the utility
+		self.speed = link["speed"] or 1000
+		self.full_duplex = link["full_duplex"]
+		self.autoneg = link["autoneg"]
+		self.link = link["link"]
+		self.supported_modes = link["supported_modes"]
+		self.supported_autoneg = link["supported_autoneg"]
+		self.advertised_modes = link["advertised_modes"]
+		self.advertised_autoneg = link["advertised_autoneg"]
+		return True
+
 	def update(self):
 		if self._disabled:
 			return
 
+		if Nettool._ethtool is not None and self._update_ioctl():
+			return
+
 		# run ethtool and preprocess output
 
 		p_ethtool = Popen(["ethtool", self._interface], \
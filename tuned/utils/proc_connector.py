@@ -0,0 +1,156 @@
+__all__ = ["ProcConnector", "PROC_EVENT_FORK", "PROC_EVENT_EXEC",
+           "PROC_EVENT_COMM", "PROC_EVENT_EXIT"]
+
+import errno
+import os
+import socket
+import struct
+import tuned.logs
+
+log = tuned.logs.get()
+
+NETLINK_CONNECTOR = 11
+NLMSG_NOOP = 1
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+
+# enum proc_event.what from linux/cn_proc.h
+PROC_EVENT_NONE = 0x00000000
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_COMM = 0x00000200
+PROC_EVENT_EXIT = 0x80000000
+
+# struct nlmsghdr
+_NLMSGHDR = struct.Struct("=IHHII")
+# struct cn_msg
+_CN_MSG = struct.Struct("=IIIIHH")
+# struct proc_event without the event_data union
+_PROC_EVENT = struct.Struct("=IIQ")
+# event_data.fork: parent_pid, parent_tgid, child_pid, child_tgid
+_FORK_EVENT = struct.Struct("=iiii")
+# event_data.exec, event_data.comm and event_data.exit start with
+# process_pid, process_tgid
+_PROCESS_EVENT = struct.Struct("=ii")
+
+
+def _nlmsg_align(length):
+    return (length + 3) & ~3
+
+
+class ProcConnector(object):
+    """
+    Source of process events from the kernel proc connector.
+
+    All fork, exec, comm and exit events of the system are delivered
+    through a single netlink socket, so no per-CPU buffers have to be polled.
+    The events are returned as (what, pid) tuples where what is one of
+    the PROC_EVENT_* constants and pid is the PID of the task (thread).
+    Listening requires the CAP_NET_ADMIN capability and a kernel with
+    CONFIG_PROC_EVENTS. A socket can be passed instead of the netlink one,
+    e.g. one end of a datagram socketpair fed with events by tests.
+    """
+
+    def __init__(self, sock=None, rcvbuf=None):
+        self._subscribed = False
+        if sock is None:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                 NETLINK_CONNECTOR)
+            try:
+                if rcvbuf is not None:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+                sock.bind((0, CN_IDX_PROC))
+                self._sock = sock
+                self._send_op(PROC_CN_MCAST_LISTEN)
+            except (OSError, IOError):
+                sock.close()
+                raise
+            self._subscribed = True
+        self._sock = sock
+        self._sock.setblocking(False)
+
+    def _send_op(self, op):
+        payload = struct.pack("=I", op)
+        cn_msg = _CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0)
+        length = _NLMSGHDR.size + len(cn_msg) + len(payload)
+        nlmsghdr = _NLMSGHDR.pack(length, NLMSG_DONE, 0, 0, os.getpid())
+        self._sock.send(nlmsghdr + cn_msg + payload)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def get_pollfd(self):
+        return [self._sock]
+
+    @staticmethod
+    def parse(data):
+        """Parse one netlink datagram, returns list of (what, pid)."""
+        events = []
+        offset = 0
+        while offset + _NLMSGHDR.size <= len(data):
+            (length, msg_type, flags, seq, port) = _NLMSGHDR.unpack_from(data, offset)
+            if length < _NLMSGHDR.size or offset + length > len(data):
+                break
+            if msg_type == NLMSG_ERROR:
+                log.debug("proc connector: received netlink error message")
+            elif msg_type != NLMSG_NOOP:
+                events.extend(ProcConnector._parse_cn_msg(data, offset + _NLMSGHDR.size,
+                                                          offset + length))
+            offset += _nlmsg_align(length)
+        return events
+
+    @staticmethod
+    def _parse_cn_msg(data, offset, end):
+        if offset + _CN_MSG.size + _PROC_EVENT.size > end:
+            return []
+        (idx, val, seq, ack, length, flags) = _CN_MSG.unpack_from(data, offset)
+        if idx != CN_IDX_PROC or val != CN_VAL_PROC:
+            return []
+        offset += _CN_MSG.size
+        (what, cpu, timestamp) = _PROC_EVENT.unpack_from(data, offset)
+        offset += _PROC_EVENT.size
+        if what == PROC_EVENT_FORK:
+            if offset + _FORK_EVENT.size > end:
+                return []
+            pid = _FORK_EVENT.unpack_from(data, offset)[2]
+        elif what in [PROC_EVENT_EXEC, PROC_EVENT_COMM, PROC_EVENT_EXIT]:
+            if offset + _PROCESS_EVENT.size > end:
+                return []
+            pid = _PROCESS_EVENT.unpack_from(data, offset)[0]
+        else:
+            return []
+        return [(what, pid)]
+
+    def read_events(self):
+        """Read all pending events without blocking."""
+        events = []
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except (OSError, IOError) as e:
+                if e.errno in [errno.EAGAIN, errno.EWOULDBLOCK]:
+                    break
+                if e.errno == errno.ENOBUFS:
+                    log.warning("proc connector: socket buffer overflow, some process events were lost")
+                    continue
+                raise
+            if not data:
+                break
+            events.extend(self.parse(data))
+        return events
+
+    def close(self):
+        if self._sock is None:
+            return
+        if self._subscribed:
+            try:
+                self._sock.setblocking(True)
+                self._send_op(PROC_CN_MCAST_IGNORE)
+            except (OSError, IOError) as e:
+                log.debug("proc connector: unable to unsubscribe: %s" % e)
+        self._sock.close()
+        self._sock = None
@@ -0,0 +1,153 @@
+__all__ = ["ProcScanner", "Task", "PF_KTHREAD", "PF_NO_SETAFFINITY"]
+
+import os
+
+import tuned.consts as consts
+
+# task flags from linux/sched.h
+PF_KTHREAD = 0x00200000
+PF_NO_SETAFFINITY = 0x04000000
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read().decode(errors="replace")
+
+
+class Task(object):
+    """
+    Task (thread) in procfs.
+
+    The fields are read lazily on the first access and cached: comm,
+    state, flags and starttime from the stat file, the command line once
+    per thread group (it is shared by all threads of the group) and the
+    cgroups only when asked for. The starttime (in clock ticks since boot)
+    tells apart tasks with the same reused PID. Accessing the fields of
+    a vanished task raises OSError (IOError).
+    """
+
+    __slots__ = ["pid", "_path", "_leader", "_stat", "_args", "_cgroups"]
+
+    def __init__(self, pid, proc_dir=consts.PROCFS_MOUNT_POINT, leader=None):
+        self.pid = pid
+        if leader is None:
+            self._path = os.path.join(proc_dir, str(pid))
+        else:
+            self._path = os.path.join(leader._path, "task", str(pid))
+        self._leader = leader
+        self._stat = None
+        self._args = None
+        self._cgroups = None
+
+    def __repr__(self):
+        return "Task(%d)" % self.pid
+
+    def _get_stat(self):
+        if self._stat is None:
+            data = _read(os.path.join(self._path, "stat"))
+            # the comm can contain spaces and parentheses
+            start = data.index("(")
+            end = data.rindex(")")
+            fields = data[end + 2:].split()
+            # fields 3 (state), 9 (flags) and 22 (starttime) of proc(5)
+            self._stat = (data[start + 1:end], fields[0], int(fields[6]), int(fields[19]))
+        return self._stat
+
+    @property
+    def comm(self):
+        return self._get_stat()[0]
+
+    @property
+    def state(self):
+        return self._get_stat()[1]
+
+    @property
+    def flags(self):
+        return self._get_stat()[2]
+
+    @property
+    def starttime(self):
+        return self._get_stat()[3]
+
+    @property
+    def is_kthread(self):
+        return self.flags & PF_KTHREAD != 0
+
+    @property
+    def is_bound_to_cpu(self):
+        return self.flags & PF_NO_SETAFFINITY != 0
+
+    def _get_args(self):
+        if self._leader is not None:
+            return self._leader._get_args()
+        if self._args is None:
+            data = _read(os.path.join(self._path, "cmdline"))
+            # the same parsing as python-linux-procfs does
+            line = data.split("\n", 1)[0]
+            self._args = line.strip().split("\0")[:-1]
+        return self._args
+
+    @property
+    def cmdline(self):
+        """
+        Command line with the arguments separated by spaces, the comm
+        for tasks without a command line (e.g. kernel threads).
+        """
+        args = self._get_args()
+        if args:
+            return " ".join(args).strip()
+        return self.comm
+
+    @property
+    def cgroups(self):
+        """
+        The lines of the cgroup file in the reversed order joined by
+        commas, as python-linux-procfs returns them.
+        """
+        if self._cgroups is None:
+            lines = _read(os.path.join(self._path, "cgroup")).splitlines()
+            self._cgroups = ",".join(reversed(lines))
+        return self._cgroups
+
+
+class ProcScanner(object):
+    """
+    Scanner of the tasks in procfs.
+
+    Only the directory entries are listed when scanning, the files of
+    the tasks are read on demand by the Task objects, see Task.
+    """
+
+    def __init__(self, proc_dir=consts.PROCFS_MOUNT_POINT):
+        self._proc_dir = proc_dir
+
+    @staticmethod
+    def _pids(path):
+        with os.scandir(path) as it:
+            return [int(entry.name) for entry in it if entry.name.isdigit()]
+
+    def task(self, pid):
+        return Task(pid, self._proc_dir)
+
+    def processes(self):
+        """Return list of the thread group leaders."""
+        return [Task(pid, self._proc_dir) for pid in self._pids(self._proc_dir)]
+
+    def threads(self, process):
+        """
+        Return list of the other threads in the thread group of
+        the process, the list is empty if the process vanished.
+        """
+        try:
+            tids = self._pids(os.path.join(process._path, "task"))
+        except (OSError, IOError):
+            return []
+        return [Task(tid, self._proc_dir, process) for tid in tids if tid != process.pid]
+
+    def tasks(self):
+        """Return list of all tasks, the threads follow their leaders."""
+        tasks = []
+        for process in self.processes():
+            tasks.append(process)
+            tasks.extend(self.threads(process))
+        return tasks
@@ -0,0 +1,65 @@
+import re
+import tuned.logs
+
+__all__ = ["RuleMatcher"]
+
+log = tuned.logs.get()
+
+
+class RuleMatcher(object):
+    """
+    Matches strings against a list of (regex, value) rules given in the
+    priority order. The value of the last matching rule is returned, the
+    same as if all the rules were applied one after another.
+
+    All the rules are compiled into a single regular expression, so each
+    string is classified by one regex call. Every rule is a lookahead
+    followed by an empty marker group, the rules are tried from the last
+    one and the index of the marker group of the first successful rule
+    selects the value. If the rules cannot be combined (e.g. a rule uses
+    global inline flags or backreferences), they are searched one by one.
+    """
+
+    # group numbers are shifted in the combined regex
+    _backreference_re = re.compile(r"\\[1-9]|\(\?P=")
+
+    def __init__(self, rules):
+        self._rules = []
+        for regex, value in rules:
+            try:
+                self._rules.append((re.compile(regex), value))
+            except re.error as _:
+                log.error("error compiling regular expression: '%s'" % str(regex))
+        self._values = {}
+        self._combined = None
+        if len(self._rules) == 0:
+            return
+        if any(self._backreference_re.search(r.pattern) for r, value in self._rules):
+            return
+        parts = []
+        group = 0
+        for r, value in reversed(self._rules):
+            parts.append("(?=(?s:.*?)(?:%s))()" % r.pattern)
+            group += r.groups + 1
+            self._values[group] = value
+        try:
+            self._combined = re.compile("|".join(parts))
+        except re.error as _:
+            log.debug("unable to combine the regular expressions, matching them one by one")
+            self._values = {}
+
+    def __len__(self):
+        return len(self._rules)
+
+    def match(self, s):
+        if s is None or len(self._rules) == 0:
+            return None
+        if self._combined is not None:
+            mo = self._combined.match(s)
+            if mo is None:
+                return None
+            return self._values[mo.lastindex]
+        for r, value in reversed(self._rules):
+            if r.search(s) is not None:
+                return value
+        return None